@@ -1,17 +1,57 @@
 import os
-import uvicorn
+import traceback
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from dotenv import load_dotenv
 from mangum import Mangum
+from server.configs.settings import load_settings
+from server.configs.db import db_manager
 from server.api.login import router as login_router
 from server.api.projects import router as projects_router
 from server.api.tasks import router as tasks_router
 from server.api.users import router as users_router
+from server.configs.indexes import ensure_indexes_on_startup
+from server.dependencies.email_outbox import email_outbox
+from server.dependencies.smtp_pool import smtp_pool
+from server.dependencies.crypto_executor import crypto_executor
+from server.dependencies.session_binding import reissue_session_cookie, binding_keys
+from server.dependencies.serialization import MongoJSONResponse
+from server.dependencies.events import change_feed
+from server.dependencies.project_deletion import project_deletions
 from fastapi.middleware.cors import CORSMiddleware
 
-load_dotenv()
+load_settings()
 
-app = FastAPI(title="Coseb Project Management")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Refuse to start without a secret to sign session cookies with
+    binding_keys()
+    # Open the first pooled connection before serving requests
+    try:
+        await db_manager.connect()
+    except Exception:
+        traceback.print_exc()
+    # Make sure the indexes the API queries rely on exist
+    await ensure_indexes_on_startup()
+    # Deliver queued notification emails in the background
+    email_outbox.start()
+    # Resume unfinished project deletions and run new ones in the background
+    project_deletions.start()
+    yield
+    await change_feed.stop()
+    await project_deletions.stop()
+    await email_outbox.stop()
+    await smtp_pool.close()
+    crypto_executor.shutdown()
+    db_manager.close()
+
+
+app = FastAPI(
+    title="Coseb Project Management",
+    lifespan=lifespan,
+    default_response_class=MongoJSONResponse
+)
 
 # More explicit CORS configuration
 app.add_middleware(
@@ -23,6 +63,9 @@ app.add_middleware(
     max_age=3600
 )
 
+# Re-issue outdated sessionID cookies in the current binding format
+app.middleware("http")(reissue_session_cookie)
+
 handler = Mangum(app)
 app.include_router(login_router, prefix="/api/v1")
 app.include_router(projects_router, prefix="/api/v1")
@@ -30,6 +73,9 @@ app.include_router(tasks_router, prefix="/api/v1")
 app.include_router(users_router, prefix="/api/v1")
 
 if __name__ == "__main__":
+    # Only needed for local runs, Lambda serves the app through Mangum
+    import uvicorn
+
     print("The server runing with database=", os.getenv('server_port'))
     uvicorn.run(
         "main:app",
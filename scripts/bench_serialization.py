@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server.dependencies.serialization import dumps  # noqa: E402
+
+
+def build_tasks(count: int) -> list:
+    """Build ``count`` task documents shaped like the task list projection."""
+    now = datetime.now()
+    project_id = str(uuid.uuid4())
+    tasks = []
+    for i in range(count):
+        start = now + timedelta(days=i % 365)
+        end = start + timedelta(days=5)
+        tasks.append({
+            "_id": str(uuid.uuid4()),
+            "text": f"Task {i}",
+            "task_description": "レビュー対応と仕様確認 " * 3,
+            "start": start,
+            "end": end,
+            "base_start": start,
+            "base_end": end,
+            "parent": 0 if i % 10 == 0 else i - i % 10,
+            "assignee": f"user{i % 50}@example.com",
+            "progress": (i % 100) / 100,
+            "created_at": now,
+            "created_by": "admin@example.com",
+            "type": "task",
+            "classification": "development",
+            "status": "in_progress",
+            "open": True,
+            "project_id": project_id,
+            "project_name": "Benchmark project",
+        })
+    return tasks
+
+
+def stdlib_encode(tasks: list) -> bytes:
+    """The previous path: ISO strings built field by field, then the stdlib encoder."""
+    formatted = []
+    for task in tasks:
+        task = dict(task)
+        task["start"] = task["start"].date().isoformat()
+        task["end"] = datetime.combine(task["end"].date(), datetime.max.time()).isoformat()
+        task["base_start"] = task["base_start"].date().isoformat()
+        task["base_end"] = datetime.combine(task["base_end"].date(), datetime.max.time()).isoformat()
+        task["created_at"] = task["created_at"].date().isoformat()
+        formatted.append(task)
+    # Same settings as starlette's JSONResponse
+    return json.dumps({"tasks": formatted}, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def shared_encode(tasks: list) -> bytes:
+    """The current path: dates truncated by format_task, encoded by the shared serializer."""
+    formatted = []
+    for task in tasks:
+        task = dict(task)
+        task["start"] = task["start"].date()
+        task["end"] = datetime.combine(task["end"].date(), datetime.max.time())
+        task["base_start"] = task["base_start"].date()
+        task["base_end"] = datetime.combine(task["base_end"].date(), datetime.max.time())
+        task["created_at"] = task["created_at"].date()
+        formatted.append(task)
+    return dumps({"tasks": formatted})
+
+
+def measure(encode, tasks: list, repeat: int) -> dict:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(encode(tasks))
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    return {
+        "median_ms": median * 1000,
+        "min_ms": min(timings) * 1000,
+        "tasks_per_s": len(tasks) / median,
+        "mb_per_s": size / median / 1e6,
+        "bytes": size,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare task list encoding throughput.")
+    parser.add_argument("--tasks", type=int, default=10000, help="Number of tasks in the payload")
+    parser.add_argument("--repeat", type=int, default=20, help="Encodes per encoder")
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.tasks)
+    # The encoders must agree on the payload before their speed is compared
+    assert json.loads(stdlib_encode(tasks[:100])) == json.loads(shared_encode(tasks[:100]))
+
+    results = {
+        "stdlib json + isoformat": measure(stdlib_encode, tasks, args.repeat),
+        "shared orjson serializer": measure(shared_encode, tasks, args.repeat),
+    }
+    print(f"{args.tasks} tasks, {args.repeat} runs")
+    for name, result in results.items():
+        print(f"  {name:<26} {result['median_ms']:>8.1f} ms  (min {result['min_ms']:.1f} ms)  "
+              f"{result['tasks_per_s']:>10.0f} tasks/s  {result['mb_per_s']:>6.1f} MB/s  "
+              f"{result['bytes']} bytes")
+    speedup = results["stdlib json + isoformat"]["median_ms"] / results["shared orjson serializer"]["median_ms"]
+    print(f"  speedup: {speedup:.1f}x")
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_HISTORY = os.path.join(ROOT_DIR, "benchmarks", "startup_history.jsonl")
+
+# Runs in a fresh interpreter, like a Lambda cold start importing the handler
+CHILD_CODE = """
+import json, resource, time
+started = time.perf_counter()
+import {module}
+elapsed_ms = (time.perf_counter() - started) * 1000
+from server.dependencies.lazy_imports import lazy_import_timings
+print(json.dumps({{
+    "import_ms": elapsed_ms,
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "lazy_loaded": sorted(lazy_import_timings),
+}}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """Parse ``-X importtime`` output into the import time of each package.
+
+    The self time of every imported module is added to its top-level package,
+    so heavy dependencies show up whichever module pulled them in.
+
+    Args:
+        stderr (str): The stderr of the child interpreter.
+
+    Returns:
+        list: (self time in us, package) pairs, slowest first.
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_part, _, name = line.split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_part.split(":")[1])
+    return sorted(((us, package) for package, us in packages.items()), reverse=True)
+
+
+def run_once(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter and measure it.
+
+    Returns:
+        dict: Wall time of the whole process, import time, peak RSS and the slowest packages.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE.format(module=module)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    measured["wall_ms"] = wall_ms
+    measured["slowest_imports"] = [
+        {"package": package, "import_ms": self_us / 1000}
+        for self_us, package in parse_importtime(result.stderr)[:15]
+    ]
+    return measured
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+            capture_output=True, text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def benchmark(module: str, runs: int) -> dict:
+    """Measure ``runs`` cold imports of ``module``.
+
+    Returns:
+        dict: Median and worst wall time, import time and peak RSS, with the
+        slowest packages of the median run.
+    """
+    samples = [run_once(module) for _ in range(runs)]
+    samples.sort(key=lambda sample: sample["wall_ms"])
+    median_sample = samples[len(samples) // 2]
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "module": module,
+        "runs": runs,
+        "wall_ms_median": statistics.median(s["wall_ms"] for s in samples),
+        "wall_ms_max": max(s["wall_ms"] for s in samples),
+        "import_ms_median": statistics.median(s["import_ms"] for s in samples),
+        "peak_rss_kb_max": max(s["peak_rss_kb"] for s in samples),
+        "lazy_loaded": median_sample["lazy_loaded"],
+        "slowest_imports": median_sample["slowest_imports"],
+    }
+
+
+def load_history(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as history:
+        return [json.loads(line) for line in history if line.strip()]
+
+
+def print_report(result: dict, previous: dict = None):
+    print(f"{result['module']} @ {result['revision']} ({result['runs']} runs)")
+    for key, unit in (("wall_ms_median", "ms"), ("import_ms_median", "ms"), ("peak_rss_kb_max", "KB")):
+        line = f"  {key:<18} {result[key]:>10.1f} {unit}"
+        if previous and previous.get(key):
+            change = (result[key] - previous[key]) / previous[key] * 100
+            line += f"  ({change:+.1f}% vs {previous['revision']})"
+        print(line)
+    if result["lazy_loaded"]:
+        print("  loaded eagerly through lazy_import:", ", ".join(result["lazy_loaded"]))
+    print("  slowest packages:")
+    for entry in result["slowest_imports"]:
+        print(f"    {entry['import_ms']:>8.1f} ms  {entry['package']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the cold start (import time and peak RSS) of the Lambda handler.")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters")
+    parser.add_argument("--history", default=DEFAULT_HISTORY,
+                        help="JSONL file the results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="Do not append to the history")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    result = benchmark(args.module, args.runs)
+    print_report(result, history[-1] if history else None)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        with open(args.history, "a") as history_file:
+            history_file.write(json.dumps(result) + "\n")
@@ -1,17 +1,22 @@
 import os
 import traceback
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import uuid
 from fastapi import APIRouter, HTTPException, status, Response, Request
 from server.modals.login import LoginInputDataModel, ForgotPasswordInputDataModel, ResetPasswordInputDataModel
-from dotenv import load_dotenv
-from server.dependencies.auth import get_user, get_password_hash, authenticate_user, create_csrf_token, create_session_id_hash, send_forgot_password_email
+from server.dependencies.auth import get_user, get_password_hash, authenticate_user, create_csrf_token, create_session_id_hash, send_forgot_password_email, invalidate_session, invalidate_user_sessions
 from server.configs.db import users_collection, reset_tokens_collection
 from server.dependencies.rate_limiter import check_rate_limit
+from server.dependencies.crypto_executor import CryptoExecutorBusy
+from server.dependencies.session_binding import set_session_cookie
+from server.dependencies.versions import bump_versions, USERS_VERSION
+from server.dependencies.lazy_imports import lazy_import
 from fastapi.responses import JSONResponse
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad
-from jose import jwt, JWTError
+
+# Loaded on first use to keep them off the cold start path
+jwt = lazy_import("jose.jwt")
+AES = lazy_import("Crypto.Cipher.AES")
+padding = lazy_import("Crypto.Util.Padding")
 
 
 # oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -43,7 +48,7 @@ async def register(login_data: LoginInputDataModel):
     try:
         user = await get_user(login_data.email)
         if not user:
-            password_hash = get_password_hash(login_data.password)
+            password_hash = await get_password_hash(login_data.password)
             credentials = {
                 "_id": str(uuid.uuid4()),
                 "email": login_data.email,
@@ -52,6 +57,7 @@ async def register(login_data: LoginInputDataModel):
                 "role": "admin"
             }
             await users_collection.insert_one(credentials)
+            await bump_versions(USERS_VERSION)
             content = {"message": "Registered successfully!!"}
             response = JSONResponse(
                 status_code=status.HTTP_201_CREATED, content=content)
@@ -61,6 +67,9 @@ async def register(login_data: LoginInputDataModel):
             response = {"message": "Email address already exists!!"}
             return JSONResponse(status_code=status.HTTP_409_CONFLICT, content=response)
 
+    except CryptoExecutorBusy as e:
+        # Hashing is saturated, tell the client to retry instead of failing
+        raise e
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(
@@ -110,21 +119,12 @@ async def login(loginData: LoginInputDataModel, request: Request):
         cipherText = AES.new(KEY, AES.MODE_CBC, IV)
 
         cipher_cookie = cipherText.encrypt(
-            pad(csrf_token.encode("utf-8"), AES.block_size))
+            padding.pad(csrf_token.encode("utf-8"), AES.block_size))
         response = JSONResponse(
             status_code=status.HTTP_200_OK, content=content)
 
         # Set session cookie
-        response.set_cookie(
-            key="sessionID",
-            value=session_hash,
-            max_age=7776000,  # 90 days
-            httponly=True,
-            samesite="Strict",
-            secure=True,
-            domain=".cosbe.inc",
-            path="/"
-        )
+        set_session_cookie(response, session_hash)
 
         # Set CSRF token cookie
         response.set_cookie(
@@ -141,7 +141,7 @@ async def login(loginData: LoginInputDataModel, request: Request):
     except Exception as e:
 
         traceback.print_exc()
-        if e.status_code == 401 or e.status_code == 404:
+        if getattr(e, "status_code", None) in (401, 404, 429, 503):
             raise e
         else:
             raise HTTPException(
@@ -245,7 +245,7 @@ async def reset_password(reset_password_data: ResetPasswordInputDataModel, reque
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Token has expired")
-        except JWTError:
+        except jwt.JWTError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
 
@@ -256,19 +256,23 @@ async def reset_password(reset_password_data: ResetPasswordInputDataModel, reque
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
         # Update the user with the new password
-        password_hash = get_password_hash(reset_password_data.password)
+        password_hash = await get_password_hash(reset_password_data.password)
         await users_collection.update_one(
             {"email": email},
             {"$set": {"password": password_hash}}
         )
+        await bump_versions(USERS_VERSION)
 
-        # Mark the token as used
+        # Mark the token as used, in UTC as the TTL index expects
         await reset_tokens_collection.insert_one({
             "token": token,
             "email": email,
-            "used_at": datetime.now()
+            "used_at": datetime.now(timezone.utc)
         })
 
+        # Force every session of the user through full verification again
+        invalidate_user_sessions(email)
+
         content = {"message": "パスワードをリセットしました。"}
         return JSONResponse(status_code=status.HTTP_200_OK, content=content)
 
@@ -282,9 +286,14 @@ async def reset_password(reset_password_data: ResetPasswordInputDataModel, reque
 
 
 @router.get("/auth/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response):
 
     try:
+        # Forget the verified session before the cookies are cleared
+        invalidate_session(
+            request.cookies.get("__HOST_csrf_token"),
+            request.cookies.get("sessionID"),
+        )
         response.delete_cookie(
             key="__HOST_csrf_token",
             path="/",
@@ -1,10 +1,22 @@
 import uuid
+import asyncio
 import traceback
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, status, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from server.dependencies.auth import OAuth2PasswordBearerWithCookie
+from server.constants.auth import ORIGINS
 from server.configs.db import projects_collection
+from server.dependencies.projects import invalidate_project_name, get_critical_path
+from server.dependencies.scheduling import ScheduleCycleError
+from server.dependencies.summaries import get_summary
+from server.dependencies.versions import bump_versions, project_version_key, PROJECTS_VERSION, TASKS_VERSION
+from server.dependencies.etags import check_etag, etag_headers
+from server.dependencies.serialization import MongoJSONResponse, dumps
+from server.dependencies.events import change_feed
+from server.dependencies.concurrency import INCREMENT_VERSION, version_filter, version_conflict
+from server.dependencies.project_deletion import project_deletions, deletion_progress
+from pymongo import ReturnDocument
 from pydantic import BaseModel
 from typing import Optional
 
@@ -22,6 +34,8 @@ class ProjectInputDataModel(BaseModel):
     description: Optional[str] = None
     start_date: datetime
     end_date: datetime
+    # Version of the project an update is based on, rejected with 409 if outdated
+    version: Optional[int] = None
 
 # Create a new project
 
@@ -56,38 +70,22 @@ async def create_project(project_data: ProjectInputDataModel, current_user: str
             "start_date": project_data.start_date,
             "end_date": project_data.end_date,
             "created_at": datetime.now(),
-            "created_by": current_user["email"]
+            "created_by": current_user["email"],
+            "version": 0
         }
 
         # Insert the project into the database
         await projects_collection.insert_one(new_project)
+        await bump_versions(PROJECTS_VERSION)
 
         # Get all projects for the user
         projects = await projects_collection.find(
             {"created_by": current_user["email"]}
         ).to_list(length=None)
 
-        # Format dates for response
-        formatted_projects = []
-        for project in projects:
-            formatted_project = project.copy()
-            if "created_at" in formatted_project and formatted_project["created_at"]:
-                formatted_project["created_at"] = formatted_project["created_at"].isoformat(
-                )
-            if "updated_at" in formatted_project and formatted_project["updated_at"]:
-                formatted_project["updated_at"] = formatted_project["updated_at"].isoformat(
-                )
-            if "start_date" in formatted_project and formatted_project["start_date"]:
-                formatted_project["start_date"] = formatted_project["start_date"].isoformat(
-                )
-            if "end_date" in formatted_project and formatted_project["end_date"]:
-                formatted_project["end_date"] = formatted_project["end_date"].isoformat(
-                )
-            formatted_projects.append(formatted_project)
-
         content = {"message": "Project created successfully",
-                   "projects": formatted_projects}
-        return JSONResponse(status_code=status.HTTP_201_CREATED, content=content)
+                   "projects": projects}
+        return MongoJSONResponse(status_code=status.HTTP_201_CREATED, content=content)
 
     except HTTPException as e:
         raise e
@@ -101,10 +99,13 @@ async def create_project(project_data: ProjectInputDataModel, current_user: str
 
 
 @router.get("/projects")
-async def get_all_projects(current_user: str = Depends(oauth2_scheme)):
+async def get_all_projects(request: Request, current_user: str = Depends(oauth2_scheme)):
     """Get all projects for the current user.
 
+    Requests whose ``If-None-Match`` matches the current ETag get a 304.
+
     Args:
+        request (Request): The incoming request.
         current_user (str): The current authenticated user.
 
     Returns:
@@ -122,29 +123,16 @@ async def get_all_projects(current_user: str = Depends(oauth2_scheme)):
                 detail="You do not have permission to perform this action.",
             )
 
+        # Answer conditional requests before touching the projects
+        etag, not_modified = await check_etag(request, [PROJECTS_VERSION])
+        if not_modified:
+            return not_modified
+
         # Retrieve the user's projects from the database
         projects = await projects_collection.find({}).to_list(length=None)
 
-        # Format dates for response
-        formatted_projects = []
-        for project in projects:
-            formatted_project = project.copy()
-            if "created_at" in formatted_project and formatted_project["created_at"]:
-                formatted_project["created_at"] = formatted_project["created_at"].isoformat(
-                )
-            if "updated_at" in formatted_project and formatted_project["updated_at"]:
-                formatted_project["updated_at"] = formatted_project["updated_at"].isoformat(
-                )
-            if "start_date" in formatted_project and formatted_project["start_date"]:
-                formatted_project["start_date"] = formatted_project["start_date"].isoformat(
-                )
-            if "end_date" in formatted_project and formatted_project["end_date"]:
-                formatted_project["end_date"] = formatted_project["end_date"].isoformat(
-                )
-            formatted_projects.append(formatted_project)
-
-        content = {"projects": formatted_projects}
-        return JSONResponse(status_code=status.HTTP_200_OK, content=content)
+        content = {"projects": projects}
+        return MongoJSONResponse(status_code=status.HTTP_200_OK, content=content, headers=etag_headers(etag))
 
     except HTTPException as e:
         raise e
@@ -180,21 +168,6 @@ async def update_project(project_id: str, project_data: ProjectInputDataModel, c
                 detail="You do not have permission to perform this action.",
             )
 
-        # Find the project to update
-        project = await projects_collection.find_one({"_id": project_id})
-        if not project:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Project not found.",
-            )
-
-        # Check if the user is the creator of the project
-        if project["created_by"] != current_user["email"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have permission to update this project.",
-            )
-
         # Update the project
         update_data = {
             "project_name": project_data.project_name,
@@ -205,26 +178,35 @@ async def update_project(project_id: str, project_data: ProjectInputDataModel, c
             "updated_by": current_user["email"]
         }
 
-        # Update the project document
-        await projects_collection.update_one(
-            {"_id": project_id},
-            {"$set": update_data}
+        # Only the creator may update the project, checked in the same write
+        updated_project = await projects_collection.find_one_and_update(
+            {"_id": project_id, "created_by": current_user["email"],
+             **version_filter(project_data.version)},
+            {"$set": update_data, "$inc": INCREMENT_VERSION},
+            return_document=ReturnDocument.AFTER
         )
+        if not updated_project:
+            project = await projects_collection.find_one(
+                {"_id": project_id}, {"created_by": 1, "version": 1})
+            if not project:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Project not found.",
+                )
 
-        # Get the updated project
-        updated_project = await projects_collection.find_one({"_id": project_id})
+            # Check if the user is the creator of the project
+            if project["created_by"] != current_user["email"]:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="You do not have permission to update this project.",
+                )
+            raise version_conflict(project)
 
-        # Format dates for response
-        if "created_at" in updated_project and updated_project["created_at"]:
-            updated_project["created_at"] = updated_project["created_at"].isoformat()
-        if "updated_at" in updated_project and updated_project["updated_at"]:
-            updated_project["updated_at"] = updated_project["updated_at"].isoformat()
-        if "start_date" in updated_project and updated_project["start_date"]:
-            updated_project["start_date"] = updated_project["start_date"].isoformat()
-        if "end_date" in updated_project and updated_project["end_date"]:
-            updated_project["end_date"] = updated_project["end_date"].isoformat()
+        invalidate_project_name(project_id)
+        # Task lists carry the project name
+        await bump_versions(PROJECTS_VERSION, project_version_key(project_id))
 
-        return JSONResponse(
+        return MongoJSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "message": "Project updated successfully",
@@ -248,12 +230,17 @@ async def update_project(project_id: str, project_data: ProjectInputDataModel, c
 async def delete_project(project_id: str, current_user: str = Depends(oauth2_scheme)):
     """Delete a project.
 
+    The project is removed right away; its tasks, links, comments and
+    summary are removed by a background job, whose progress is served by
+    ``GET /projects/{project_id}/deletion``. On Lambda the job is advanced by
+    the scheduled ``project_deletion.scheduled_handler``.
+
     Args:
         project_id (str): The ID of the project to delete.
         current_user (str): The current authenticated user.
 
     Returns:
-        JSONResponse: A response indicating the deletion status.
+        MongoJSONResponse: A 202 response with the deletion job.
 
     Raises:
         HTTPException: If the user is not authorized or the project is not found.
@@ -281,13 +268,19 @@ async def delete_project(project_id: str, current_user: str = Depends(oauth2_sch
                 detail="You do not have permission to delete this project.",
             )
 
+        # Queue the cascade before removing the project, so its data is never orphaned
+        job = await project_deletions.enqueue(project_id, current_user["email"])
+
         # Delete the project
         await projects_collection.delete_one({"_id": project_id})
+        invalidate_project_name(project_id)
+        await bump_versions(PROJECTS_VERSION, TASKS_VERSION, project_version_key(project_id))
 
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
+        return MongoJSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
             content={
-                "message": "Project deleted successfully"
+                "message": "Project deleted successfully, its tasks are being removed",
+                "deletion": deletion_progress(job)
             }
         )
 
@@ -299,3 +292,294 @@ async def delete_project(project_id: str, current_user: str = Depends(oauth2_sch
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         ) from e
+
+
+@router.get("/projects/{project_id}/deletion")
+async def get_project_deletion(project_id: str, current_user: str = Depends(oauth2_scheme)):
+    """Get the progress of a project deletion.
+
+    Args:
+        project_id (str): The ID of the deleted project.
+        current_user (str): The current authenticated user.
+
+    Returns:
+        MongoJSONResponse: The job status, the current step and the number of
+        documents to delete and deleted per collection.
+
+    Raises:
+        HTTPException: If the user is not authorized or no deletion exists.
+    """
+    try:
+        # Check if the current user is an admin
+        if current_user["role"] != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You do not have permission to perform this action.",
+            )
+
+        job = await project_deletions.get(project_id)
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project deletion not found.",
+            )
+
+        return MongoJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=deletion_progress(job)
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
+@router.get("/projects/{project_id}/critical-path")
+async def get_project_critical_path(
+    project_id: str,
+    critical_only: bool = False,
+    current_user: dict = Depends(oauth2_scheme),
+):
+    """Get the critical path of a project's schedule.
+
+    Early and late dates and the slack of every task are computed from the
+    task dates and the FS/SS/FF/SF links between them. Results are cached
+    until a task or link of the project changes.
+
+    Args:
+        project_id (str): The ID of the project.
+        critical_only (bool, optional): Only return the schedule of the critical tasks.
+        current_user (dict): The current authenticated user.
+
+    Returns:
+        MongoJSONResponse: The project start and finish, the task schedule,
+        the critical path and the critical links.
+
+    Raises:
+        HTTPException: If the project is not found, its links contain a cycle or an error occurs.
+    """
+    try:
+        # Check that the request is authenticated as a user or an admin
+        if not current_user or current_user["role"] not in ["user", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to perform this action."
+            )
+
+        project = await projects_collection.find_one({"_id": project_id}, {"_id": 1})
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+
+        try:
+            analysis = await get_critical_path(project_id)
+        except ScheduleCycleError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": str(e), "task_ids": e.task_ids}
+            )
+
+        if critical_only:
+            analysis = {**analysis, "tasks": [
+                task for task in analysis["tasks"] if task["critical"]]}
+
+        return MongoJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"project_id": project_id, **analysis}
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
+@router.get("/projects/{project_id}/summary")
+async def get_project_summary(
+    project_id: str,
+    current_user: dict = Depends(oauth2_scheme),
+):
+    """Get the task rollup of a project.
+
+    The summary is kept up to date by the task write paths and served with a
+    single read.
+
+    Args:
+        project_id (str): The ID of the project.
+        current_user (dict): The current authenticated user.
+
+    Returns:
+        MongoJSONResponse: Task counts by status, type and priority, the
+        duration weighted progress and the number of overdue tasks.
+
+    Raises:
+        HTTPException: If the user is not authorized or an error occurs.
+    """
+    try:
+        # Check that the request is authenticated as a user or an admin
+        if not current_user or current_user["role"] not in ["user", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to perform this action."
+            )
+
+        summary = await get_summary(project_id)
+
+        return MongoJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"summary": summary}
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
+# Seconds between keep-alive messages on idle event streams
+EVENTS_KEEPALIVE_SECONDS = 15
+
+
+async def stream_project_events(request: Request, project_id: str):
+    """Stream a project's change events as server-sent events."""
+    subscription = change_feed.subscribe(project_id)
+    try:
+        yield b"retry: 3000\n\n"
+        while not await request.is_disconnected():
+            event = await subscription.get(EVENTS_KEEPALIVE_SECONDS)
+            if event is None:
+                yield b": keep-alive\n\n"
+                continue
+            yield b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+    finally:
+        change_feed.unsubscribe(subscription)
+
+
+@router.get("/projects/{project_id}/events")
+async def get_project_events(
+    request: Request,
+    project_id: str,
+    current_user: dict = Depends(oauth2_scheme),
+):
+    """Stream the task and link changes of a project as server-sent events.
+
+    Clients should fetch the project's tasks and links once connected, then
+    apply the deltas; a ``resync`` event asks them to fetch again.
+
+    Args:
+        request (Request): The incoming request.
+        project_id (str): The ID of the project.
+        current_user (dict): The current authenticated user.
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` of change events.
+
+    Raises:
+        HTTPException: If the user is not authorized, the project is not found or an error occurs.
+    """
+    try:
+        # Check that the request is authenticated as a user or an admin
+        if not current_user or current_user["role"] not in ["user", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to perform this action."
+            )
+
+        project = await projects_collection.find_one({"_id": project_id}, {"_id": 1})
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+
+        return StreamingResponse(
+            stream_project_events(request, project_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
+@router.websocket("/projects/{project_id}/events")
+async def project_events_websocket(websocket: WebSocket, project_id: str):
+    """Send the task and link changes of a project over a WebSocket.
+
+    The CSRF token is passed as the ``csrf_token`` query parameter since
+    browsers cannot set headers on the handshake. Handshakes from origins
+    outside ``ORIGINS`` are refused. Events are sent as JSON
+    text messages, see ``get_project_events``.
+
+    Args:
+        websocket (WebSocket): The client connection.
+        project_id (str): The ID of the project.
+    """
+    # CORS does not apply to WebSockets, so only accept handshakes from our own
+    # sites that carry the CSRF token
+    if websocket.headers.get("origin") not in ORIGINS or not websocket.query_params.get("csrf_token"):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    try:
+        current_user = await oauth2_scheme(websocket)
+    except (HTTPException, KeyError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not current_user or current_user["role"] not in ["user", "admin"]:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    project = await projects_collection.find_one({"_id": project_id}, {"_id": 1})
+    if not project:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Project not found")
+        return
+
+    await websocket.accept()
+    subscription = change_feed.subscribe(project_id)
+
+    async def wait_for_disconnect():
+        # Clients only listen, anything they send is ignored
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    disconnected = asyncio.create_task(wait_for_disconnect())
+    try:
+        while True:
+            next_event = asyncio.create_task(subscription.get(EVENTS_KEEPALIVE_SECONDS))
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_event.cancel()
+                break
+            event = next_event.result() or {"type": "keep-alive"}
+            await websocket.send_text(dumps(event).decode())
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        traceback.print_exc()
+    finally:
+        disconnected.cancel()
+        change_feed.unsubscribe(subscription)
@@ -1,17 +1,37 @@
 from os import link
+import os
 import uuid
 import traceback
+import orjson
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pymongo import ASCENDING, UpdateOne, ReturnDocument
 from server.modals.tasks import (
     CreateTaskInputDataModel,
     UpdateTaskModel,
-    CommentInputDataModel
+    CommentInputDataModel,
+    PatchLinksInputDataModel,
+    UpdateTaskDatesModel,
+    BulkUpdateTasksModel
 )
 from server.dependencies.auth import OAuth2PasswordBearerWithCookie
-from server.configs.db import tasks_collection, links_collection, projects_collection
-from server.dependencies.send_emails import send_task_creation_email, send_assignee_change_email, send_task_start_email, send_task_completion_email
+from server.configs.db import tasks_collection, projects_collection, comments_collection
+from server.dependencies.email_outbox import enqueue_email, email_task_data, EMAIL_TASK_FIELDS
+from server.dependencies.notifications import NotificationBatch
+from server.dependencies.projects import get_project_names
+from server.dependencies.pagination import encode_cursor, decode_cursor, keyset_filter
+from server.dependencies.links import link_store, edge_key, new_link
+from server.dependencies.serialization import MongoJSONResponse, dumps
+from server.dependencies.comments import migrate_task_comments
+from server.dependencies.versions import bump_project_version, bump_versions, project_version_key, TASKS_VERSION, PROJECTS_VERSION
+from server.dependencies.etags import check_etag, etag_headers
+from server.dependencies.scheduling import ScheduleCycleError, task_days
+from server.dependencies.tasks import TASK_LIST_PROJECTION, reschedule_tasks
+from server.dependencies.task_import import TaskImport, iter_csv_rows, iter_json_rows
+from server.dependencies.summaries import SUMMARY_TASK_FIELDS, update_summary, mark_summary_stale
+from server.dependencies.concurrency import INCREMENT_VERSION, version_filter, version_conflict, missing_or_conflict
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="/api/v1/auth/login")
@@ -67,20 +87,24 @@ async def create_task(
             "type": task_data.type,
             "open": task_data.open,
             "created_at": datetime.now(),
+            "updated_at": datetime.now(),
             "status": "not_started",
             "created_by": current_user["email"],
-            "priority": task_data.priority
+            "priority": task_data.priority,
+            "version": 0
         }
 
         await tasks_collection.insert_one(new_task)
+        await bump_project_version(task_data.project_id)
+        await update_summary(task_data.project_id, None, new_task)
 
-        # Send email notification to the assignee if email is provided
+        # Queue an email notification to the assignee if email is provided
         if task_data.assignee:
             try:
-                await send_task_creation_email(task_data.assignee, new_task)
+                await enqueue_email("task_creation", task_data.assignee, email_task_data(new_task))
             except Exception as e:
                 # Log the error but don't fail the task creation
-                print(f"Failed to send task creation email: {str(e)}")
+                print(f"Failed to queue task creation email: {str(e)}")
 
         return {"message": "Task created successfully", "unique_id": _id}
 
@@ -94,28 +118,232 @@ async def create_task(
         ) from e
 
 
+@router.post("/tasks/bulk")
+async def create_tasks_bulk(
+    request: Request,
+    project_id: str,
+    current_user: dict = Depends(oauth2_scheme),
+):
+    """Create many tasks of a project from a JSON array or a CSV file.
+
+    The body is either a JSON array of rows or, with a ``text/csv`` content
+    type, a CSV file with a header row, read as it is uploaded. Rows have the
+    fields of ``BulkTaskRowModel``; in CSV files ``predecessors`` are
+    separated by ``;``. A predecessor is the ``ref`` of another row or the ID
+    of an existing task of the project, optionally followed by ``:<link type>``
+    (finish to start by default).
+
+    Invalid rows are reported and skipped, the others are imported. Each
+    assignee gets one email listing all their new tasks.
+
+    Args:
+        request (Request): The incoming request.
+        project_id (str): The ID of the project to create the tasks in.
+        current_user (dict): The current authenticated user.
+
+    Returns:
+        MongoJSONResponse: The number of rows, imported tasks and links, the
+        ID of every imported row and the errors of the rejected rows.
+
+    Raises:
+        HTTPException: If the user is not authorized, the project is not
+        found, the body cannot be read or an error occurs.
+    """
+    try:
+        # Check if the current user is an admin
+        if current_user["role"] != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only admins can create tasks"
+            )
+
+        project = await projects_collection.find_one({"_id": project_id}, {"project_name": 1})
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type == "text/csv":
+            rows = iter_csv_rows(request.stream())
+        elif content_type in ("", "application/json"):
+            try:
+                payload = orjson.loads(await request.body())
+            except orjson.JSONDecodeError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid JSON: {str(e)}"
+                ) from e
+            if not isinstance(payload, list):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Expected a JSON array of tasks"
+                )
+            rows = iter_json_rows(payload)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send a JSON array or a text/csv file"
+            )
+
+        task_import = TaskImport(project_id, project.get("project_name"), current_user["email"])
+        try:
+            report = await task_import.run(rows)
+        finally:
+            # Rows inserted before a failure are kept, record them too
+            if task_import.created:
+                await bump_project_version(project_id)
+                await mark_summary_stale(project_id)
+
+        return MongoJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"message": f"Imported {report['inserted']} of {report['rows']} tasks", **report}
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
+# Fields of the previous task state read back by the single task updates
+TASK_UPDATE_FIELDS = {field: 1 for field in (
+    "project_id", "assignee", "created_by", "base_end", "version",
+    *SUMMARY_TASK_FIELDS, *EMAIL_TASK_FIELDS)}
+
+# Keyset order used for paginated and streamed task lists
+TASK_SORT = [("start", ASCENDING), ("_id", ASCENDING)]
+TASK_PAGE_MAX_LIMIT = 1000
+TASK_STREAM_BATCH_SIZE = 500
+
+# Keyset order of a task's comments, oldest first
+COMMENT_SORT = [("created_at", ASCENDING), ("_id", ASCENDING)]
+COMMENT_PAGE_MAX_LIMIT = 200
+
+
+def format_task(task: dict) -> dict:
+    """Convert a task document's dates into the API representation.
+
+    Args:
+        task (dict): The task document as stored in the database.
+
+    Returns:
+        dict: The same task with start and creation dates as dates, end dates
+        at the end of their day and ``_id`` renamed to ``id``.
+    """
+    if "created_at" in task and "start" in task and "end" in task:
+        task["start"] = task["start"].date()
+        task["end"] = datetime.combine(task["end"].date(), datetime.max.time())
+        task["base_start"] = task["base_start"].date()
+        task["base_end"] = datetime.combine(task["base_end"].date(), datetime.max.time())
+        task["created_at"] = task["created_at"].date()
+        task["id"] = task["_id"]
+        del task["_id"]
+    return task
+
+
+async def format_tasks(tasks: list) -> list:
+    """Format a batch of tasks and attach the name of their project.
+
+    Project names for the whole batch are resolved at once and joined in memory.
+    """
+    project_names = await get_project_names(
+        task["project_id"] for task in tasks if "project_id" in task)
+    for task in tasks:
+        format_task(task)
+        if task.get("project_id") in project_names:
+            task["project_name"] = project_names[task["project_id"]]
+    return tasks
+
+
+def task_cursor(task: dict) -> str:
+    """Build the pagination cursor pointing after ``task``."""
+    return encode_cursor([task.get(field) for field, _ in TASK_SORT])
+
+
+async def encode_task_lines(tasks: list) -> bytes:
+    """Format a batch of tasks as newline-delimited JSON."""
+    return b"".join(dumps(task) + b"\n" for task in await format_tasks(tasks))
+
+
+async def stream_tasks(query: dict, project_name: str, paginate: bool, limit: Optional[int]):
+    """Stream the tasks matching ``query`` as newline-delimited JSON.
+
+    The first line carries the project name, followed by one task per line.
+    When ``limit`` is set and more tasks remain, a final line carries the
+    ``next_cursor``. Only one batch of tasks is held in memory at a time.
+    """
+    yield dumps({"project_name": project_name}) + b"\n"
+
+    tasks_cursor = tasks_collection.find(
+        query, TASK_LIST_PROJECTION).batch_size(TASK_STREAM_BATCH_SIZE)
+    if paginate:
+        tasks_cursor = tasks_cursor.sort(TASK_SORT)
+    if limit:
+        tasks_cursor = tasks_cursor.limit(limit + 1)
+
+    count = 0
+    batch = []
+    last_key = None
+    has_more = False
+    async for task in tasks_cursor:
+        if limit and count == limit:
+            has_more = True
+            break
+        count += 1
+        last_key = [task.get(field) for field, _ in TASK_SORT]
+        batch.append(task)
+        if len(batch) >= TASK_STREAM_BATCH_SIZE:
+            yield await encode_task_lines(batch)
+            batch = []
+
+    if batch:
+        yield await encode_task_lines(batch)
+
+    if has_more:
+        await tasks_cursor.close()
+        yield dumps({"next_cursor": encode_cursor(last_key)}) + b"\n"
+
+
 @router.get("/tasks")
 async def get_tasks(
+    request: Request,
     project_id: str = None,
     email: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=TASK_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    stream: bool = False,
     current_user: dict = Depends(oauth2_scheme),
 ):
     """Get all tasks for a specific project or user.
 
+    Without ``limit`` or ``cursor`` every matching task is returned at once.
+    With them, tasks are ordered by start date and returned one page at a time
+    together with a ``next_cursor`` to fetch the following page. With
+    ``stream`` the tasks are streamed as newline-delimited JSON. Requests
+    whose ``If-None-Match`` matches the current ETag get a 304.
+
     Args:
+        request (Request): The incoming request.
         project_id (str, optional): The ID of the project to retrieve tasks for.
         email (str, optional): The email of the user to retrieve tasks for.
+        limit (int, optional): The maximum number of tasks to return.
+        cursor (str, optional): The ``next_cursor`` of the previous page.
+        stream (bool, optional): Whether to stream the tasks as NDJSON.
         current_user (dict): The current authenticated user.
 
     Returns:
-        dict: A dictionary containing the list of tasks and project name.
+        MongoJSONResponse: The list of tasks and project name.
 
     Raises:
         HTTPException: If the user is not authorized or an error occurs.
     """
     try:
-        # Build the query based on provided parameters
-        query = {}
         # Build the query based on provided parameters
         query = {}
         if project_id:
@@ -123,67 +351,58 @@ async def get_tasks(
         if email:
             query["assignee"] = email
 
+        paginate = limit is not None or cursor is not None
+        if cursor:
+            query.update(keyset_filter(
+                [field for field, _ in TASK_SORT], decode_cursor(cursor)))
+
+        # Answer conditional requests before touching the tasks
+        etag, not_modified = await check_etag(
+            request,
+            [project_version_key(project_id)] if project_id else [TASKS_VERSION, PROJECTS_VERSION]
+        )
+        if not_modified:
+            return not_modified
+
         # Get project details if project_id is provided
         project_name = "All Projects"
         if project_id:
-            project = await projects_collection.find_one(
-                {"_id": project_id},
-                {"project_name": 1}
+            project_names = await get_project_names([project_id])
+            project_name = project_names.get(project_id, project_name)
+
+        if stream:
+            return StreamingResponse(
+                stream_tasks(query, project_name, paginate, limit),
+                media_type="application/x-ndjson",
+                headers=etag_headers(etag)
             )
-            if project:
-                project_name = project.get("project_name", "Unknown Project")
 
-        # Retrieve all tasks matching the query
-        tasks = await tasks_collection.find(
-            query,
-            {
-                "_id": 1,
-                "text": 1,
-                "task_description": 1,
-                "start": 1,
-                "base_start": 1,
-                "end": 1,
-                "base_end": 1,
-                "parent": 1,
-                "assignee": 1,
-                "progress": 1,
-                "created_at": 1,
-                "created_by": 1,
-                "type": 1,
-                "classification": 1,
-                "status": 1,
-                "open": 1,
-                "project_id": 1
-            }
-        ).to_list(length=None)
-
-        # Convert datetime objects to date strings
-        for task in tasks:
-            if "created_at" in task and "start" in task and "end" in task:
-                task["start"] = task["start"].date().isoformat()
-                task["end"] = datetime.combine(
-                    task["end"].date(), datetime.max.time()).isoformat()
-                task["base_start"] = task["base_start"].date().isoformat()
-                task["base_end"] = datetime.combine(
-                    task["base_end"].date(), datetime.max.time()).isoformat()
-                task["created_at"] = task["created_at"].date().isoformat()
-                task["id"] = task["_id"]
-                del task["_id"]
-
-        # Get project names for each task
-        for task in tasks:
-            if "project_id" in task:
-                project = await projects_collection.find_one(
-                    {"_id": task["project_id"]},
-                    {"project_name": 1}
-                )
-                if project:
-                    task["project_name"] = project.get("project_name", "Unknown Project")
-
-        return {
+        if not paginate:
+            # Retrieve all tasks matching the query
+            tasks = await tasks_collection.find(
+                query, TASK_LIST_PROJECTION).to_list(length=None)
+            return MongoJSONResponse({
+                "project_name": project_name,
+                "tasks": await format_tasks(tasks)
+            }, headers=etag_headers(etag))
+
+        # Fetch one extra task to know whether another page follows
+        tasks_cursor = tasks_collection.find(
+            query, TASK_LIST_PROJECTION).sort(TASK_SORT)
+        if limit:
+            tasks_cursor = tasks_cursor.limit(limit + 1)
+        tasks = await tasks_cursor.to_list(length=None)
+
+        next_cursor = None
+        if limit and len(tasks) > limit:
+            tasks = tasks[:limit]
+            next_cursor = task_cursor(tasks[-1])
+
+        return MongoJSONResponse({
             "project_name": project_name,
-            "tasks": tasks
-        }
+            "tasks": await format_tasks(tasks),
+            "next_cursor": next_cursor
+        }, headers=etag_headers(etag))
 
     except HTTPException as e:
         raise e
@@ -264,12 +483,16 @@ async def get_task(
 
 @router.get("/tasks/links/{project_id}")
 async def get_links(
+    request: Request,
     project_id: str,
     current_user: dict = Depends(oauth2_scheme),
 ):
     """Get all links between tasks for a specific project.
 
+    Requests whose ``If-None-Match`` matches the current ETag get a 304.
+
     Args:
+        request (Request): The incoming request.
         project_id (str): The ID of the project to retrieve links for.
         current_user (dict): The current authenticated user.
 
@@ -287,8 +510,13 @@ async def get_links(
                 detail="You do not have permission to perform this action."
             )
 
+        # Answer conditional requests before touching the project
+        etag, not_modified = await check_etag(request, [project_version_key(project_id)])
+        if not_modified:
+            return not_modified
+
         # First check if project exists
-        project = await projects_collection.find_one({"_id": project_id})
+        project = await projects_collection.find_one({"_id": project_id}, {"_id": 1})
         if not project:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -296,21 +524,99 @@ async def get_links(
             )
 
         # Retrieve the links
-        links = await links_collection.find_one(
-            {"project_id": project_id},
-            {"_id": 1, "links": 1}
+        links = await link_store.get_links(project_id)
+
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"links": links},
+            headers=etag_headers(etag)
         )
 
-        # If no links document exists or no links array, return empty array
-        if not links or "links" not in links:
-            return JSONResponse(
-                status_code=status.HTTP_200_OK,
-                content={"links": []}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
+@router.patch("/tasks/links/{project_id}")
+async def patch_links(
+    project_id: str,
+    links_data: PatchLinksInputDataModel,
+    current_user: dict = Depends(oauth2_scheme),
+):
+    """Apply an incremental change to the links of a project.
+
+    Either send ``added`` and ``removed`` links, or send the complete set of
+    ``links`` and let the server compute the difference. Only the changed
+    links are written and unchanged links keep their IDs.
+
+    Args:
+        project_id (str): The ID of the project whose links change.
+        links_data (PatchLinksInputDataModel): The links to add and remove, or the full set.
+        current_user (dict): The current authenticated user.
+
+    Returns:
+        JSONResponse: A response containing the added links and the removed link IDs.
+
+    Raises:
+        HTTPException: If the user is not authorized or an error occurs.
+    """
+    try:
+        # Check that the request is authenticated as a user or an admin
+        if not current_user or current_user["role"] not in ["user", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to perform this action."
             )
 
+        if links_data.links is not None:
+            added, removed_ids = await link_store.sync_links(
+                project_id, [link.model_dump() for link in links_data.links])
+        else:
+            existing = await link_store.get_links(project_id)
+            existing_by_key = {edge_key(link): link for link in existing}
+            existing_ids = {link["id"] for link in existing}
+
+            # Resolve removals given either as link IDs or as edges
+            removed_ids = []
+            for link in links_data.removed or []:
+                if isinstance(link, str):
+                    link_id = link if link in existing_ids else None
+                else:
+                    match = existing_by_key.get(edge_key(link.model_dump()))
+                    link_id = match["id"] if match else None
+                if link_id and link_id not in removed_ids:
+                    removed_ids.append(link_id)
+
+            # Skip edges that already exist so repeated requests are idempotent
+            added = []
+            added_keys = set()
+            for link in links_data.added or []:
+                key = edge_key(link.model_dump())
+                if key in added_keys:
+                    continue
+                if key in existing_by_key and existing_by_key[key]["id"] not in removed_ids:
+                    continue
+                added_keys.add(key)
+                added.append(new_link(link.model_dump()))
+
+            if added or removed_ids:
+                await link_store.apply_diff(project_id, added, removed_ids)
+
+        if added or removed_ids:
+            await bump_project_version(project_id)
+
         return JSONResponse(
             status_code=status.HTTP_200_OK,
-            content={"links": links["links"]}
+            content={
+                "message": "Links updated successfully",
+                "added": added,
+                "removed": removed_ids
+            }
         )
 
     except HTTPException as e:
@@ -330,12 +636,15 @@ async def update_task(
 ):
     """Update a task.
 
+    When the task's dates move, its successors are shifted to keep every
+    link satisfied and returned in ``shifted_tasks``.
+
     Args:
         task_data (UpdateTaskModel): The updated task data containing only the fields to update.
         current_user (dict): The current authenticated user.
 
     Returns:
-        JSONResponse: A response indicating the update status.
+        MongoJSONResponse: The update status and the successors that were shifted.
 
     Raises:
         HTTPException: If the user is not authorized or an error occurs.
@@ -348,8 +657,10 @@ async def update_task(
                 detail="You do not have permission to perform this action."
             )
 
-        # Get the current task data
-        current_task = await tasks_collection.find_one({"_id": task_data.task_id})
+        current_task = None
+        moved_task = None
+        version = None
+        shifted_tasks = []
 
         # Handle task updates if task data is provided
         if task_data.task:
@@ -367,66 +678,78 @@ async def update_task(
                     task_update_data["end"] = datetime.combine(
                         task_update_data["end"], datetime.max.time())
 
+                # Update the task, getting its previous state back in the same round-trip
+                task_update_data["updated_at"] = datetime.now()
+                task_update_data["updated_by"] = current_user["email"]
+                current_task = await tasks_collection.find_one_and_update(
+                    {"_id": task_data.task_id, **version_filter(task_data.version)},
+                    {"$set": task_update_data, "$inc": INCREMENT_VERSION},
+                    projection=TASK_UPDATE_FIELDS,
+                    return_document=ReturnDocument.BEFORE
+                )
+                if not current_task:
+                    raise await missing_or_conflict(
+                        tasks_collection, task_data.task_id, "Task not found.")
+                version = current_task.get("version", 0) + 1
+                await update_summary(
+                    current_task.get("project_id"), current_task, {**current_task, **task_update_data})
+
                 # Check if assignee is being changed
-                if "assignee" in task_update_data and task_update_data["assignee"] != current_task["assignee"]:
-                    # Send email to both old and new assignee
+                if "assignee" in task_update_data and task_update_data["assignee"] != current_task.get("assignee"):
+                    # Queue emails to both old and new assignee
                     try:
                         # Send to old assignee
-                        await send_assignee_change_email(
+                        await enqueue_email(
+                            "assignee_change",
                             current_task["assignee"],
-                            current_task,
+                            email_task_data(current_task),
                             current_task["assignee"],
                             task_update_data["assignee"]
                         )
                         # Send to new assignee
-                        await send_assignee_change_email(
+                        await enqueue_email(
+                            "assignee_change",
                             task_update_data["assignee"],
-                            current_task,
+                            email_task_data(current_task),
                             current_task["assignee"],
                             task_update_data["assignee"]
                         )
                     except Exception as e:
                         # Log the error but don't fail the task update
                         print(
-                            f"Failed to send assignee change emails: {str(e)}")
+                            f"Failed to queue assignee change emails: {str(e)}")
 
-                # Update the task
-                await tasks_collection.update_one(
-                    {"_id": task_data.task_id},
-                    {"$set": task_update_data}
-                )
+                # Successors of a task whose dates moved are shifted once the links are saved
+                if "start" in task_update_data or "end" in task_update_data:
+                    moved_task = {**current_task, **task_update_data}
 
-        # Handle links updates if links data is provided
+        # Handle links updates if links data is provided, writing only the
+        # links that changed so unchanged links keep their IDs
         if task_data.links and task_data.project_id:
-            links = []
-            for link in task_data.links:
-                links.append({
-                    "id": str(uuid.uuid4()),
-                    "source": link["source"],
-                    "target": link["target"],
-                    "type": link["type"]
-                })
-
-            # Check if links document exists for the project
-            existing_links = await links_collection.find_one({"project_id": task_data.project_id})
-
-            if existing_links:
-                # Update existing links
-                await links_collection.update_one(
-                    {"project_id": task_data.project_id},
-                    {"$set": {"links": links}}
+            await link_store.sync_links(task_data.project_id, task_data.links)
+
+        # Shift the successors over the links just saved
+        if moved_task:
+            try:
+                shifted_tasks = await reschedule_tasks(
+                    moved_task["project_id"],
+                    {task_data.task_id: task_days(moved_task)},
+                    current_user["email"],
+                    write_moved=False
                 )
-            else:
-                # Create new links document
-                await links_collection.insert_one({
-                    "project_id": task_data.project_id,
-                    "links": links,
-                    "_id": str(uuid.uuid4())
-                })
+            except ScheduleCycleError as e:
+                print(f"Skipped schedule propagation: {str(e)}")
+            if shifted_tasks:
+                await mark_summary_stale(moved_task["project_id"])
 
-        return JSONResponse(
+        if task_data.task or task_data.links:
+            await bump_project_version(
+                task_data.project_id or (current_task or {}).get("project_id"))
+
+        return MongoJSONResponse(
             status_code=status.HTTP_200_OK,
-            content={"message": "Task updated successfully"}
+            content={"message": "Task updated successfully", "shifted_tasks": shifted_tasks,
+                     "version": version}
         )
 
     except HTTPException as e:
@@ -464,26 +787,41 @@ async def create_comment(
                 detail="You do not have permission to perform this action."
             )
 
-        # Create the comment object
+        # Count the comment on the task, which also checks the task exists
+        task = await tasks_collection.find_one_and_update(
+            {"_id": comment_data.task_id},
+            {"$inc": {"comment_count": 1}, "$set": {"updated_at": datetime.now()}},
+            projection={"project_id": 1, "comments": 1}
+        )
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+
+        # Store the comment in its own document
+        comment_id = str(uuid.uuid4())
         created_at = datetime.now()
+        await comments_collection.insert_one({
+            "_id": comment_id,
+            "task_id": comment_data.task_id,
+            "project_id": task.get("project_id"),
+            "content": comment_data.content,
+            "created_at": created_at,
+            "created_by": current_user["email"]
+        })
+        # Move comments still embedded in a task written before the comments collection
+        if "comments" in task:
+            await migrate_task_comments(task)
+        # Task lists carry the comment count
+        await bump_project_version(task.get("project_id"))
+
         comment = {
-            "id": str(uuid.uuid4()),
+            "id": comment_id,
             "content": comment_data.content,
-            "created_at": created_at.isoformat(),  # Convert datetime to ISO format string
+            "created_at": created_at.isoformat(),
             "created_by": current_user["email"]
         }
-
-        # Add the comment to the task's comments array
-        await tasks_collection.update_one(
-            {"_id": comment_data.task_id},
-            {"$push": {"comments": {
-                "id": comment["id"],
-                "content": comment["content"],
-                "created_at": created_at,  # Store as datetime in database
-                "created_by": comment["created_by"]
-            }}}
-        )
-
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={"message": "Comment added successfully", "comment": comment}
@@ -502,12 +840,20 @@ async def create_comment(
 @router.get("/tasks/comments/{task_id}")
 async def get_comments(
     task_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=COMMENT_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(oauth2_scheme),
 ):
-    """Get all comments for a specific task.
+    """Get the comments of a specific task, oldest first.
+
+    Without ``limit`` every comment is returned at once. With ``limit`` at
+    most that many comments are returned together with a ``next_cursor`` to
+    fetch the following page.
 
     Args:
         task_id (str): The ID of the task to retrieve comments for.
+        limit (int, optional): The maximum number of comments to return.
+        cursor (str, optional): The ``next_cursor`` of the previous page.
         current_user (dict): The current authenticated user.
 
     Returns:
@@ -524,22 +870,113 @@ async def get_comments(
                 detail="You do not have permission to perform this action."
             )
 
-        # Get the task with its comments
-        task = await tasks_collection.find_one(
-            {"_id": task_id},
-            {"comments": 1}
+        # Move comments still embedded in a task written before the comments collection
+        legacy_task = await tasks_collection.find_one(
+            {"_id": task_id, "comments": {"$exists": True}}, {"project_id": 1, "comments": 1})
+        if legacy_task:
+            await migrate_task_comments(legacy_task)
+            await bump_project_version(legacy_task.get("project_id"))
+
+        query = {"task_id": task_id}
+        if cursor:
+            query.update(keyset_filter(
+                [field for field, _ in COMMENT_SORT], decode_cursor(cursor)))
+
+        comments_cursor = comments_collection.find(
+            query, {"content": 1, "created_at": 1, "created_by": 1}).sort(COMMENT_SORT)
+        if limit:
+            comments_cursor = comments_cursor.limit(limit + 1)
+        comments = await comments_cursor.to_list(length=None)
+
+        next_cursor = None
+        if limit and len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = encode_cursor(
+                [comments[-1].get(field) for field, _ in COMMENT_SORT])
+
+        for comment in comments:
+            comment["id"] = comment.pop("_id")
+
+        return MongoJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"comments": comments, "next_cursor": next_cursor}
         )
 
-        comments = task.get("comments", []) if task else []
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
 
-        # Convert datetime objects to ISO format strings
-        for comment in comments:
-            if "created_at" in comment:
-                comment["created_at"] = comment["created_at"].isoformat()
+@router.put("/tasks/dates")
+async def update_task_dates(
+    task_data: UpdateTaskDatesModel,
+    current_user: dict = Depends(oauth2_scheme),
+):
+    """Move a task and shift its successors.
 
-        return JSONResponse(
+    The end date is taken from ``end``, or from ``duration`` (in days), or
+    keeps the task's current duration. Every successor whose link would be
+    broken is pushed later, and all changes are written in one bulk write.
+
+    Args:
+        task_data (UpdateTaskDatesModel): The task ID and its new dates.
+        current_user (dict): The current authenticated user.
+
+    Returns:
+        MongoJSONResponse: The ``id``, ``start`` and ``end`` of every task that changed.
+
+    Raises:
+        HTTPException: If the task is not found, the dates are invalid, the
+        links contain a cycle or an error occurs.
+    """
+    try:
+        # Check that the request is authenticated as a user or an admin
+        if not current_user or current_user["role"] not in ["user", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to perform this action."
+            )
+
+        task = await tasks_collection.find_one(
+            {"_id": task_data.id}, {"project_id": 1, "start": 1, "end": 1})
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+
+        start, days = task_days(task)
+        if task_data.start:
+            start = task_data.start.date()
+        if task_data.end:
+            days = (task_data.end.date() - start).days + 1
+        elif task_data.duration:
+            days = task_data.duration
+        if days < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The end date must not be before the start date"
+            )
+
+        try:
+            changed_tasks = await reschedule_tasks(
+                task["project_id"], {task_data.id: (start, days)}, current_user["email"])
+        except ScheduleCycleError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": str(e), "task_ids": e.task_ids}
+            )
+        await bump_project_version(task["project_id"])
+        await mark_summary_stale(task["project_id"])
+
+        return MongoJSONResponse(
             status_code=status.HTTP_200_OK,
-            content={"comments": comments}
+            content={"message": "Task dates updated successfully", "tasks": changed_tasks}
         )
 
     except HTTPException as e:
@@ -579,30 +1016,21 @@ async def delete_task(
                 detail="You do not have permission to perform this action."
             )
 
-        # Delete the task
-        result = await tasks_collection.delete_one({"_id": task_id})
-        
-        if result.deleted_count == 0:
+        # Delete the task, keeping the fields its project summary counted
+        deleted_task = await tasks_collection.find_one_and_delete(
+            {"_id": task_id}, projection=SUMMARY_TASK_FIELDS)
+
+        if not deleted_task:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Task not found"
             )
 
-        # Get the current links document
-        links_doc = await links_collection.find_one({"project_id": project_id})
-        
-        if links_doc and "links" in links_doc:
-            # Filter out links that reference the deleted task
-            updated_links = [
-                link for link in links_doc["links"]
-                if link["source"] != task_id and link["target"] != task_id
-            ]
-            
-            # Update the links document
-            await links_collection.update_one(
-                {"project_id": project_id},
-                {"$set": {"links": updated_links}}
-            )
+        # Remove links and comments that reference the deleted task
+        await link_store.remove_task_links(project_id, task_id)
+        await comments_collection.delete_many({"task_id": task_id})
+        await bump_project_version(project_id)
+        await update_summary(project_id, deleted_task, None)
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
@@ -619,6 +1047,159 @@ async def delete_task(
         ) from e
 
 
+# Most tasks one bulk update may change
+BULK_UPDATE_MAX_TASKS = int(os.getenv("bulk_update_max_tasks", "1000"))
+
+# Fields read for the permission checks and notifications of a bulk update
+BULK_UPDATE_TASK_FIELDS = {field: 1 for field in (
+    "project_id", "assignee", "created_by", "base_end", *EMAIL_TASK_FIELDS)}
+
+
+@router.put("/tasks/bulk")
+async def update_tasks_bulk(
+    task_data: BulkUpdateTasksModel,
+    current_user: dict = Depends(oauth2_scheme),
+):
+    """Apply the same status, progress or assignee change to many tasks.
+
+    Status and progress follow the rule of ``PUT /tasks/update-status``:
+    only the assignee of a task can change them, admins included. Admins
+    can reassign any task, users only the tasks assigned to them. The tasks
+    are read with one query, checked in memory and written with one
+    unordered ``bulk_write``; tasks that are missing or not allowed are
+    reported and skipped. Notifications are coalesced so every recipient
+    gets at most one email.
+
+    Args:
+        task_data (BulkUpdateTasksModel): The task IDs and the changes.
+        current_user (dict): The current authenticated user.
+
+    Returns:
+        MongoJSONResponse: The IDs of the updated tasks, the number of
+        queued emails and the tasks that could not be updated.
+
+    Raises:
+        HTTPException: If the user is not authorized, the request is invalid or an error occurs.
+    """
+    try:
+        # Check that the request is authenticated as a user or an admin
+        if not current_user or current_user["role"] not in ["user", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="You do not have permission to perform this action."
+            )
+
+        changes = {k: v for k, v in task_data.changes.model_dump().items() if v is not None}
+        if not changes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No changes given"
+            )
+        task_ids = list(dict.fromkeys(task_data.task_ids))
+        if len(task_ids) > BULK_UPDATE_MAX_TASKS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {BULK_UPDATE_MAX_TASKS} tasks can be updated at once"
+            )
+
+        user_email = current_user["email"]
+        # Status and progress are only changed by the assignee, as in update_task_status
+        assignee_only = current_user["role"] != "admin" or "status" in changes or "progress" in changes
+        tasks = {task["_id"]: task async for task in tasks_collection.find(
+            {"_id": {"$in": task_ids}}, BULK_UPDATE_TASK_FIELDS)}
+
+        # Check permissions and build every update in memory
+        now = datetime.now()
+        errors = []
+        operations = []
+        updated = []
+        for task_id in task_ids:
+            task = tasks.get(task_id)
+            if not task:
+                errors.append({"task_id": task_id, "error": "Task not found."})
+                continue
+            if assignee_only and task.get("assignee") != user_email:
+                errors.append({"task_id": task_id,
+                               "error": "You do not have permission to update this task."})
+                continue
+
+            update_data = {**changes, "updated_at": now, "updated_by": user_email}
+            if changes.get("status") == "completed" or changes.get("progress") == 100:
+                base_end = task.get("base_end")
+                update_data["type"] = "exceeded" if isinstance(base_end, datetime) and now > base_end else "completed"
+                update_data["end"] = now
+
+            # Keep the assignee condition, in case the task was reassigned meanwhile
+            query = {"_id": task_id, "assignee": user_email} if assignee_only else {"_id": task_id}
+            operations.append(UpdateOne(query, {"$set": update_data, "$inc": INCREMENT_VERSION}))
+            updated.append(task)
+
+        if operations:
+            result = await tasks_collection.bulk_write(operations, ordered=False)
+            if result.matched_count < len(operations):
+                # Some tasks were reassigned or deleted since they were read, keep the written ones
+                written = {task["_id"] async for task in tasks_collection.find(
+                    {"_id": {"$in": [task["_id"] for task in updated]},
+                     "updated_at": now, "updated_by": user_email}, {"_id": 1})}
+                for task in updated:
+                    if task["_id"] not in written:
+                        errors.append({"task_id": task["_id"],
+                                       "error": "The task was reassigned or deleted meanwhile."})
+                updated = [task for task in updated if task["_id"] in written]
+
+        project_ids = {task.get("project_id") for task in updated if task.get("project_id")}
+        if project_ids:
+            await bump_versions(TASKS_VERSION, *(project_version_key(project_id) for project_id in project_ids))
+            for project_id in project_ids:
+                await mark_summary_stale(project_id)
+
+        # Collect the notifications the single task endpoints would send
+        notifications = NotificationBatch()
+        completed = {}
+        for task in updated:
+            new_assignee = changes.get("assignee")
+            if new_assignee is not None and new_assignee != task.get("assignee"):
+                for recipient in (task.get("assignee"), new_assignee):
+                    notifications.add(recipient, "assignee_change", task, task.get("assignee"), new_assignee)
+            if changes.get("status") == "started" and changes.get("progress") == 0:
+                notifications.add(task.get("created_by"), "task_start", task)
+            if changes.get("status") == "completed":
+                notifications.add(task.get("created_by"), "task_completion", task, False)
+                completed.setdefault(task.get("project_id"), set()).add(task["_id"])
+
+        # Successors of the completed tasks, reading the links once per project
+        successor_ids = set()
+        for project_id, completed_ids in completed.items():
+            for link in await link_store.get_links(project_id):
+                if str(link["source"]) in completed_ids:
+                    successor_ids.add(str(link["target"]))
+        if successor_ids:
+            async for successor in tasks_collection.find(
+                    {"_id": {"$in": list(successor_ids)}}, {field: 1 for field in EMAIL_TASK_FIELDS}):
+                notifications.add(successor.get("assignee"), "task_completion", successor, True)
+
+        queued = await notifications.send()
+
+        return MongoJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={
+                "message": f"Updated {len(updated)} of {len(task_ids)} tasks",
+                "task_ids": [task["_id"] for task in updated],
+                "notifications": queued,
+                "errors": errors
+            }
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+
+
 @router.put("/tasks/update-status")
 async def update_task_status(
     task_data: UpdateTaskModel,
@@ -640,41 +1221,55 @@ async def update_task_status(
         # Get user's email from the token
         user_email = current_user["email"]
 
-        # Find the task
-        task = await tasks_collection.find_one({"_id": task_data.task_id})
-
-        if not task:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Task not found.",
-            )
-
-        # Check if the task is assigned to the current user
-        if task["assignee"] != user_email:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have permission to update this task.",
-            )
-
         # Update task status and progress
+        now = datetime.now()
         update_data = {
-            "status": task_data.task.status,
-            "progress": task_data.task.progress,
-            "updated_at": datetime.now(),
-            "updated_by": user_email,
+            "status": {"$literal": task_data.task.status},
+            "progress": {"$literal": task_data.task.progress},
+            "updated_at": now,
+            "updated_by": {"$literal": user_email},
         }
 
-        if task_data.task.status == "completed" or task_data.task.progress == 100:
-            update_data["type"] = "completed"
-            update_data["end"] = datetime.now()
-            if datetime.now() > task["base_end"]:
-                update_data["type"] = "exceeded"
-
-        await tasks_collection.update_one(
-            {"_id": task_data.task_id},
-            {"$set": update_data}
+        # Completed tasks end now, as exceeded if past their planned end
+        completes = task_data.task.status == "completed" or task_data.task.progress == 100
+        if completes:
+            update_data["type"] = {"$cond": [
+                {"$gt": [now, {"$ifNull": ["$base_end", now]}]}, "exceeded", "completed"]}
+            update_data["end"] = now
+
+        # The assignee check and the update run as one conditional write,
+        # returning the previous state of the task
+        task = await tasks_collection.find_one_and_update(
+            {"_id": task_data.task_id, "assignee": user_email, **version_filter(task_data.version)},
+            [{"$set": {**update_data, "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}}],
+            projection=TASK_UPDATE_FIELDS,
+            return_document=ReturnDocument.BEFORE
         )
 
+        if not task:
+            existing = await tasks_collection.find_one(
+                {"_id": task_data.task_id}, {"assignee": 1, "version": 1})
+            if not existing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Task not found.",
+                )
+            # Check if the task is assigned to the current user
+            if existing.get("assignee") != user_email:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="You do not have permission to update this task.",
+                )
+            raise version_conflict(existing)
+
+        new_task = {**task, "status": task_data.task.status, "progress": task_data.task.progress}
+        if completes:
+            base_end = task.get("base_end")
+            new_task["type"] = "exceeded" if isinstance(base_end, datetime) and now > base_end else "completed"
+            new_task["end"] = now
+        await bump_project_version(task.get("project_id"))
+        await update_summary(task.get("project_id"), task, new_task)
+
         print("task_data.task.status: ", task_data.task.status)
         print("task_data.task.progress: ", task_data.task.progress)
 
@@ -682,63 +1277,60 @@ async def update_task_status(
         if task_data.task.status == "started" and task_data.task.progress == 0:
             if task.get("created_by") and "@" in task["created_by"]:
                 try:
-                    # Prepare email data for task start notification
-                    await send_task_start_email(task["created_by"], task)
+                    # Queue the task start notification
+                    await enqueue_email("task_start", task["created_by"], email_task_data(task))
                 except Exception as e:
-                    print(f"Failed to send task start notification email: {str(e)}")
+                    print(f"Failed to queue task start notification email: {str(e)}")
 
         # If task is completed, send notifications
         if task_data.task.status == "completed":
-            # Get all links where this task is the source
-            links_doc = await links_collection.find_one({"project_id": task["project_id"]})
-            if links_doc and "links" in links_doc:
-                # Find all target tasks
-                target_task_ids = [
-                    link["target"]
-                    for link in links_doc["links"]
-                    if link["source"] == task_data.task_id
-                ]
-
-                if target_task_ids:
-                    # Get details of all target tasks
-                    target_tasks = await tasks_collection.find(
-                        {"_id": {"$in": target_task_ids}},
-                        {
-                            "_id": 1,
-                            "text": 1,
-                            "task_description": 1,
-                            "start": 1,
-                            "end": 1,
-                            "assignee": 1,
-                            "classification": 1,
-                            "created_by": 1
-                        }
-                    ).to_list(length=None)
-
-                    # Send notifications to target task assignees
-                    for target_task in target_tasks:
-                        if target_task.get("assignee") and "@" in target_task["assignee"]:
-                            try:
-                                # Prepare email data for next task notification
-                                await send_task_completion_email(target_task["assignee"], target_task, True)
-                            except Exception as e:
-                                print(f"Failed to send next task notification email: {str(e)}")
+            # Find all target tasks of links where this task is the source
+            target_task_ids = await link_store.get_successor_ids(
+                task["project_id"], task_data.task_id)
+            if target_task_ids:
+                # Get details of all target tasks
+                target_tasks = await tasks_collection.find(
+                    {"_id": {"$in": target_task_ids}},
+                    {
+                        "_id": 1,
+                        "text": 1,
+                        "task_description": 1,
+                        "start": 1,
+                        "end": 1,
+                        "assignee": 1,
+                        "progress": 1,
+                        "classification": 1,
+                        "created_by": 1
+                    }
+                ).to_list(length=None)
+
+                # Send notifications to target task assignees
+                for target_task in target_tasks:
+                    if target_task.get("assignee") and "@" in target_task["assignee"]:
+                        try:
+                            # Queue the next task notification
+                            await enqueue_email(
+                                "task_completion", target_task["assignee"], email_task_data(target_task), True)
+                        except Exception as e:
+                            print(f"Failed to queue next task notification email: {str(e)}")
 
             # Send notification to task creator
             if task.get("created_by") and "@" in task["created_by"]:
                 try:
-                    # Prepare email data for task completion notification
-                    await send_task_completion_email(
+                    # Queue the task completion notification
+                    await enqueue_email(
+                        "task_completion",
                         task["created_by"],
-                        task,
+                        email_task_data(task),
                         False
                     )
                 except Exception as e:
-                    print(f"Failed to send task completion notification email: {str(e)}")
+                    print(f"Failed to queue task completion notification email: {str(e)}")
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
-            content={"message": "Task status updated successfully"}
+            content={"message": "Task status updated successfully",
+                     "version": task.get("version", 0) + 1}
         )
 
     except HTTPException as e:
@@ -2,13 +2,22 @@ import uuid
 import traceback
 import os
 from datetime import datetime, timedelta
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from fastapi.responses import JSONResponse
 from server.dependencies.auth import OAuth2PasswordBearerWithCookie, create_csrf_token, get_password_hash, get_user
 from server.modals.users import AddUserInputDataModel, RegisterUserInputDataModel
 from server.configs.db import users_collection
-from jose import jwt, JWTError
 from server.dependencies.send_emails import send_invitation_email
+from server.dependencies.serialization import MongoJSONResponse
+from server.dependencies.versions import bump_versions, USERS_VERSION
+from server.dependencies.etags import check_etag, etag_headers
+from server.dependencies.concurrency import INCREMENT_VERSION, version_filter, missing_or_conflict, parse_version
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from server.dependencies.lazy_imports import lazy_import
+
+# Loaded on first use to keep it off the cold start path
+jwt = lazy_import("jose.jwt")
 
 # from app.dependencies.email import send_invitation_email
 
@@ -54,6 +63,7 @@ async def add_user(add_user_data: AddUserInputDataModel, current_user: str = Dep
             "role": add_user_data.role,
             "created_at": datetime.now(),
             "status": "pending",
+            "version": 0,
         }
         link_expiration = {"format": "days", "value": 1}  # 30 minutes
 
@@ -76,6 +86,7 @@ async def add_user(add_user_data: AddUserInputDataModel, current_user: str = Dep
         # Send an email to the new user to set up their password
         await send_invitation_email(add_user_data.email, setup_link, link_expiration)
         await users_collection.insert_one(new_user)
+        await bump_versions(USERS_VERSION)
         content = {
             "message": "User added successfully and email sent to set up password."
         }
@@ -96,10 +107,13 @@ async def add_user(add_user_data: AddUserInputDataModel, current_user: str = Dep
 
 
 @router.get("/auth/users")
-async def get_all_users(current_user: str = Depends(oauth2_scheme)):
+async def get_all_users(request: Request, current_user: str = Depends(oauth2_scheme)):
     """Get all users' email, role, and status.
 
+    Requests whose ``If-None-Match`` matches the current ETag get a 304.
+
     Args:
+        request (Request): The incoming request.
         current_user (str): The current authenticated user.
 
     Returns:
@@ -116,17 +130,24 @@ async def get_all_users(current_user: str = Depends(oauth2_scheme)):
                 detail="You do not have permission to perform this action.",
             )
 
-        # Retrieve all users from the database
-        users = await users_collection.find({}, {"email": 1, "role": 1, "status": 1, "created_at": 1}).to_list(length=None)
-
-        # Convert datetime objects to date strings
-        for user in users:
-            if "created_at" in user:
-                user["created_at"] = user["created_at"].date().isoformat()
+        # Answer conditional requests before touching the users
+        etag, not_modified = await check_etag(request, [USERS_VERSION])
+        if not_modified:
+            return not_modified
+
+        # Retrieve all users from the database, with the creation date as a date string
+        users = await users_collection.aggregate([{"$project": {
+            "email": 1,
+            "role": 1,
+            "status": 1,
+            # Omit the date of users stored without one, as before
+            "created_at": {"$ifNull": [
+                {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}, "$$REMOVE"]},
+            "version": {"$ifNull": ["$version", 0]}
+        }}]).to_list(length=None)
 
         content = {"users": users}
-        print(user)
-        return JSONResponse(status_code=status.HTTP_200_OK, content=content)
+        return MongoJSONResponse(status_code=status.HTTP_200_OK, content=content, headers=etag_headers(etag))
 
     except HTTPException as e:
         raise e
@@ -198,23 +219,18 @@ async def update_user(user_id: str, user_data: dict, current_user: str = Depends
                 detail="You do not have permission to perform this action.",
             )
 
-        # Find the existing user
-        existing_user = await users_collection.find_one({"_id": user_id})
-        if not existing_user:
+        expected_version = parse_version(user_data.get("version"))
+
+        # Check the email is free without relying on the unique index, which
+        # may be missing (e.g. index builds disabled or blocked by duplicates)
+        email_exists = await users_collection.find_one(
+            {"email": user_data["email"], "_id": {"$ne": user_id}}, {"_id": 1})
+        if email_exists:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found.",
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Email address already exists.",
             )
 
-        # Check if email is being changed and if it already exists
-        if user_data["email"] != existing_user["email"]:
-            email_exists = await users_collection.find_one({"email": user_data["email"], "_id": {"$ne": user_id}})
-            if email_exists:
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail="Email address already exists.",
-                )
-
         # Prepare update data
         update_data = {
             "email": user_data["email"],
@@ -223,17 +239,23 @@ async def update_user(user_id: str, user_data: dict, current_user: str = Depends
             "updated_by": current_user["email"]
         }
 
-        # Update the user
-        await users_collection.update_one(
-            {"_id": user_id},
-            {"$set": update_data}
-        )
-
-        # Get the updated user
-        updated_user = await users_collection.find_one(
-            {"_id": user_id},
-            {"_id": 1, "email": 1, "role": 1, "status": 1, "created_at": 1}
-        )
+        # Update the user and read it back in one round-trip; the unique
+        # email index also rejects an email taken since the check above
+        try:
+            updated_user = await users_collection.find_one_and_update(
+                {"_id": user_id, **version_filter(expected_version)},
+                {"$set": update_data, "$inc": INCREMENT_VERSION},
+                projection={"_id": 1, "email": 1, "role": 1, "status": 1, "created_at": 1, "version": 1},
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Email address already exists.",
+            ) from e
+        if not updated_user:
+            raise await missing_or_conflict(users_collection, user_id, "User not found.")
+        await bump_versions(USERS_VERSION)
 
         # Format dates for response
         if "created_at" in updated_user:
@@ -297,6 +319,7 @@ async def delete_user(user_id: str, current_user: str = Depends(oauth2_scheme)):
 
         # Delete the user
         await users_collection.delete_one({"_id": user_id})
+        await bump_versions(USERS_VERSION)
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
@@ -344,7 +367,7 @@ async def register_user(register_data: RegisterUserInputDataModel):
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Token has expired")
-        except JWTError:
+        except jwt.JWTError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
 
@@ -355,11 +378,12 @@ async def register_user(register_data: RegisterUserInputDataModel):
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found or already registered")
 
         # Update the user with the password and account status
-        password_hash = get_password_hash(register_data.password)
+        password_hash = await get_password_hash(register_data.password)
         await users_collection.update_one(
             {"email": email},
             {"$set": {"password": password_hash, "status": "active"}}
         )
+        await bump_versions(USERS_VERSION)
 
         content = {"message": "User registered successfully"}
         return JSONResponse(status_code=status.HTTP_200_OK, content=content)
@@ -1,13 +1,237 @@
 import os
+import time
+import asyncio
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Optional
+from pymongo import monitoring
 from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
+from server.configs.settings import load_settings
 
-load_dotenv()
+load_settings()
 
-client = AsyncIOMotorClient(os.getenv('db_url'))
-database = client[os.getenv('db_name')]
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool events of the Motor client.
+
+    Tracks connections checked out right now, time spent waiting for a
+    connection and connection churn (opened and closed connections). Events
+    are fired from Motor's worker threads, so counters are guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkout_started: Dict[tuple, deque] = defaultdict(deque)
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pools_cleared = 0
+
+    def _record_wait(self, event) -> None:
+        # Newer pymongo versions report the wait, otherwise match the start event
+        duration = getattr(event, "duration", None)
+        started = self._checkout_started[event.address]
+        started_at = started.popleft() if started else None
+        if duration is not None:
+            wait_ms = duration * 1000
+        elif started_at is not None:
+            wait_ms = (time.monotonic() - started_at) * 1000
+        else:
+            return
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._checkout_started[event.address].append(time.monotonic())
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+            self._record_wait(event)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self._record_wait(event)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the pool counters and wait times."""
+        with self._lock:
+            return {
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": self.total_wait_ms / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_ms,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "open_connections": self.connections_created - self.connections_closed,
+                "pools_cleared": self.pools_cleared,
+            }
+
+
+def pool_options() -> Dict[str, int]:
+    """Read the connection pool settings.
+
+    The defaults suit Lambda, where one container serves one request at a
+    time: a small pool, no idle connections kept open on purpose and a short
+    server selection timeout so a bad cluster fails fast.
+    """
+    return {
+        "maxPoolSize": int(os.getenv("db_max_pool_size", "10")),
+        "minPoolSize": int(os.getenv("db_min_pool_size", "0")),
+        "maxIdleTimeMS": int(os.getenv("db_max_idle_time_ms", "60000")),
+        "serverSelectionTimeoutMS": int(os.getenv("db_server_selection_timeout_ms", "5000")),
+        "connectTimeoutMS": int(os.getenv("db_connect_timeout_ms", "10000")),
+    }
+
+
+class DatabaseManager:
+    """Owns the process-wide Motor client.
+
+    The client is created on first use and kept for the life of the process,
+    so warm Lambda invocations reuse its pooled connections. Motor clients are
+    bound to the event loop they first ran on; if a later invocation runs on
+    a different loop the client is rebuilt instead of failing.
+
+    Args:
+        url (str): The MongoDB connection string.
+        db_name (str): The database name.
+        options (dict): Pool options passed to the client.
+    """
+
+    def __init__(self, url: str, db_name: str, options: Dict[str, int]):
+        self.url = url
+        self.db_name = db_name
+        self.options = options
+        self.metrics = PoolMetrics()
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.clients_created = 0
+
+    @staticmethod
+    def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        """The shared client, created or rebuilt for the running event loop."""
+        loop = self._running_loop()
+        if self._client is not None and loop is not None and self._loop not in (None, loop):
+            print("Event loop changed, recreating the MongoDB client")
+            self.close()
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                self.url, event_listeners=[self.metrics], **self.options)
+            self.clients_created += 1
+        if self._loop is None:
+            self._loop = loop
+        return self._client
+
+    @property
+    def database(self):
+        return self.client[self.db_name]
+
+    async def connect(self):
+        """Create the client and open its first connection."""
+        await self.client.admin.command("ping")
+
+    def close(self):
+        """Close the client and its pooled connections."""
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+        self._loop = None
+
+    def stats(self) -> Dict[str, float]:
+        """Return the pool settings and metrics."""
+        return {**self.options, "clients_created": self.clients_created, **self.metrics.snapshot()}
+
+
+class DatabaseProxy:
+    """The database of the current client, looked up on every use."""
+
+    def __init__(self, manager: DatabaseManager):
+        self._manager = manager
+
+    def __getitem__(self, name: str):
+        return CollectionProxy(self._manager, name)
+
+    def __getattr__(self, attr: str):
+        return getattr(self._manager.database, attr)
+
+
+class CollectionProxy:
+    """A collection of the current client, so importers survive a client rebuild."""
+
+    def __init__(self, manager: DatabaseManager, name: str):
+        self._manager = manager
+        self.name = name
+        self._client = None
+        self._collection = None
+
+    def __getattr__(self, attr: str):
+        client = self._manager.client
+        if client is not self._client:
+            self._collection = client[self._manager.db_name][self.name]
+            self._client = client
+        return getattr(self._collection, attr)
+
+    def __repr__(self):
+        return f"CollectionProxy({self._manager.db_name!r}, {self.name!r})"
+
+
+db_manager = DatabaseManager(os.getenv('db_url'), os.getenv('db_name'), pool_options())
+database = DatabaseProxy(db_manager)
 users_collection = database["users"]
 projects_collection = database["projects"]
 tasks_collection = database["tasks"]
 links_collection = database["links"]
+task_links_collection = database["task_links"]
 reset_tokens_collection = database["reset_tokens"]
+email_outbox_collection = database["email_outbox"]
+rate_limits_collection = database["rate_limits"]
+versions_collection = database["versions"]
+summaries_collection = database["summaries"]
+comments_collection = database["comments"]
+project_deletions_collection = database["project_deletions"]
@@ -0,0 +1,152 @@
+import os
+import sys
+import asyncio
+import traceback
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from server.configs.db import database
+
+# Used reset tokens only need to outlive the 30 minute reset link expiry
+RESET_TOKEN_RETENTION_SECONDS = int(
+    os.getenv("reset_token_retention_seconds", "86400"))
+
+# Delivered emails are kept for a week for troubleshooting
+SENT_EMAIL_RETENTION_SECONDS = int(
+    os.getenv("sent_email_retention_seconds", "604800"))
+
+# Every index the API's query shapes rely on, grouped by collection
+INDEXES = {
+    "users": [
+        # get_user / register_user / update_user look users up by email
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "projects": [
+        # create_project lists the projects of their creator
+        IndexModel([("created_by", ASCENDING)], name="created_by"),
+    ],
+    "tasks": [
+        # get_tasks filters by project and optionally assignee
+        IndexModel([("project_id", ASCENDING), ("assignee", ASCENDING)],
+                   name="project_id_assignee"),
+        # Keyset pagination of a project's tasks ordered by start date
+        IndexModel([("project_id", ASCENDING), ("start", ASCENDING), ("_id", ASCENDING)],
+                   name="project_id_start_id"),
+        # Polling fallback of the change feed
+        IndexModel([("project_id", ASCENDING), ("updated_at", ASCENDING)],
+                   name="project_id_updated_at"),
+        # get_tasks with only an email filter
+        IndexModel([("assignee", ASCENDING)], name="assignee"),
+    ],
+    "comments": [
+        # get_comments pages through a task's comments oldest first
+        IndexModel([("task_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+                   name="task_id_created_at_id"),
+        # Project deletion removes a project's comments in chunks
+        IndexModel([("project_id", ASCENDING)], name="project_id"),
+    ],
+    "links": [
+        IndexModel([("project_id", ASCENDING)],
+                   name="project_id_unique", unique=True),
+    ],
+    "task_links": [
+        # Edge-per-document link storage: successors and predecessors of a task
+        IndexModel([("project_id", ASCENDING), ("source", ASCENDING)],
+                   name="project_id_source"),
+        IndexModel([("project_id", ASCENDING), ("target", ASCENDING)],
+                   name="project_id_target"),
+    ],
+    "email_outbox": [
+        # Workers claim the oldest due job
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)],
+                   name="status_next_attempt_at"),
+        # Only delivered jobs have sent_at, pending and dead jobs are kept
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl",
+                   expireAfterSeconds=SENT_EMAIL_RETENTION_SECONDS),
+    ],
+    "project_deletions": [
+        # The deletion worker claims the oldest due job
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)],
+                   name="status_next_attempt_at"),
+    ],
+    "rate_limits": [
+        # Window counters are removed once they no longer affect the limit
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl",
+                   expireAfterSeconds=0),
+    ],
+    "reset_tokens": [
+        # reset_password checks whether a token was already used
+        IndexModel([("token", ASCENDING)], name="token_unique", unique=True),
+        IndexModel([("used_at", ASCENDING)], name="used_at_ttl",
+                   expireAfterSeconds=RESET_TOKEN_RETENTION_SECONDS),
+    ],
+}
+
+
+async def ensure_indexes(build: bool = True) -> dict:
+    """Create every declared index that does not exist yet.
+
+    Index creation is idempotent: indexes are matched by name and only missing
+    ones are built, so this is safe to run on every startup.
+
+    Args:
+        build (bool): Whether to build missing indexes or only report them.
+
+    Returns:
+        dict: The ``present``, ``missing``, ``created`` and ``failed`` indexes,
+        each labelled as ``<collection>.<index name>``.
+    """
+    report = {"present": [], "missing": [], "created": [], "failed": []}
+
+    for collection_name, indexes in INDEXES.items():
+        collection = database[collection_name]
+        existing = await collection.index_information()
+
+        for index in indexes:
+            name = index.document["name"]
+            label = f"{collection_name}.{name}"
+            if name in existing:
+                report["present"].append(label)
+                continue
+
+            report["missing"].append(label)
+            if not build:
+                continue
+
+            try:
+                await collection.create_indexes([index])
+                report["created"].append(label)
+            except PyMongoError as e:
+                # e.g. duplicate emails preventing the unique index
+                report["failed"].append({"index": label, "error": str(e)})
+
+    return report
+
+
+def print_report(report: dict):
+    """Print an index report in a human readable form."""
+    for key in ("present", "missing", "created"):
+        print(f"{key} ({len(report[key])}):")
+        for label in report[key]:
+            print(f"  {label}")
+    print(f"failed ({len(report['failed'])}):")
+    for failure in report["failed"]:
+        print(f"  {failure['index']}: {failure['error']}")
+
+
+async def ensure_indexes_on_startup():
+    """Build missing indexes on app startup without blocking it on failures."""
+    if os.getenv("ensure_indexes_on_startup", "true").lower() != "true":
+        return
+    try:
+        report = await ensure_indexes()
+        if report["created"] or report["failed"]:
+            print_report(report)
+    except Exception:
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    # Usage: python -m server.configs.indexes [--check]
+    result = asyncio.run(ensure_indexes(build="--check" not in sys.argv))
+    print_report(result)
+    sys.exit(1 if result["failed"] else 0)
@@ -0,0 +1,27 @@
+import os
+import time
+from typing import Optional
+
+_loaded_at: Optional[float] = None
+
+
+def load_settings() -> bool:
+    """Load the ``.env`` file into the environment once per process.
+
+    Modules reading settings call this instead of ``load_dotenv()`` so the
+    file is located, read and parsed a single time however many modules
+    import it. Values already set in the environment (e.g. by Lambda) win.
+
+    Returns:
+        bool: True if the file was loaded by this call.
+    """
+    global _loaded_at
+    if _loaded_at is not None:
+        return False
+
+    # Lambda passes its settings as environment variables, skip the file lookup there
+    if os.getenv("skip_dotenv", "false").lower() != "true":
+        from dotenv import load_dotenv
+        load_dotenv()
+    _loaded_at = time.time()
+    return True
@@ -1,8 +1,7 @@
 import os
-from dotenv import load_dotenv
-from fastapi_mail import ConnectionConfig
+from server.configs.settings import load_settings
 
-load_dotenv()
+load_settings()
 
 ORIGINS = [
     'https://project-management.cosbe.inc',
@@ -20,13 +19,33 @@ REFERRERS = [
     'http://localhost:5173/'
     ]
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("mail_username"),
-    MAIL_PASSWORD=os.getenv("mail_password"),
-    MAIL_PORT=465,
-    MAIL_SERVER=os.getenv("mail_server"),
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    MAIL_FROM=os.getenv("mail_from")
-)
\ No newline at end of file
+_conf = None
+
+
+def get_mail_config():
+    """Return the mail settings, building them on first use.
+
+    fastapi_mail is only imported once an email is actually sent.
+    """
+    global _conf
+    if _conf is None:
+        from fastapi_mail import ConnectionConfig
+        _conf = ConnectionConfig(
+            MAIL_USERNAME=os.getenv("mail_username"),
+            MAIL_PASSWORD=os.getenv("mail_password"),
+            MAIL_PORT=int(os.getenv("mail_port", "465")),
+            MAIL_SERVER=os.getenv("mail_server"),
+            MAIL_STARTTLS=False,
+            # Set mail_ssl_tls=false to use the local SMTP stand-in
+            MAIL_SSL_TLS=os.getenv("mail_ssl_tls", "true").lower() == "true",
+            USE_CREDENTIALS=True,
+            MAIL_FROM=os.getenv("mail_from")
+        )
+    return _conf
+
+
+def __getattr__(name):
+    # Keep ``from server.constants.auth import conf`` working
+    if name == "conf":
+        return get_mail_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,36 +1,57 @@
 import os
+import time
 from typing import Dict
 from datetime import datetime, timedelta
 from typing import Optional
 from server.constants.auth import ORIGINS, REFERRERS
 from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import OAuth2, OAuth2PasswordBearer
-from passlib.context import CryptContext
-from jose import jwt, JWTError
 from fastapi.openapi.models import OAuthFlows as OAuthFlowsModel
-from Crypto.Cipher import AES
-from dotenv import load_dotenv
+from server.configs.settings import load_settings
 from server.configs.db import users_collection
-from jinja2 import Template
-from fastapi_mail import FastMail, MessageSchema
-from server.constants.auth import conf
+from server.dependencies.templates import render_template
+from server.dependencies.send_emails import send_email
+from server.dependencies.cache import TTLCache
+from server.dependencies.crypto_executor import crypto_executor, CryptoExecutorBusy
+from server.dependencies.session_binding import create_session_binding, is_legacy_binding, verify_session_binding, flag_session_reissue
+from server.dependencies.lazy_imports import lazy_import
 
-load_dotenv()
+load_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Loaded on first use to keep them off the cold start path
+jwt = lazy_import("jose.jwt")
+AES = lazy_import("Crypto.Cipher.AES")
+passlib_context = lazy_import("passlib.context")
+
+_pwd_context = None
+
+
+def get_pwd_context():
+    """Return the bcrypt context, creating it on first use."""
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = passlib_context.CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Sessions whose cookie binding already passed the bcrypt check, keyed on the
+# (csrf_cookie, sessionID) pair so repeat requests skip the expensive verify
+verified_sessions = TTLCache(
+    max_size=int(os.getenv("session_cache_max_size", "10000")),
+    ttl_seconds=float(os.getenv("session_cache_ttl_seconds", "300")),
+)
 
-def verify_password(plain_password, hashed_password):
-    """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password(plain_password, hashed_password):
+    """Verify a plain password against a hashed password on the crypto pool."""
+    return await crypto_executor.run(get_pwd_context().verify, plain_password, hashed_password)
 
-def get_password_hash(password):
-    """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+
+async def get_password_hash(password):
+    """Hash a password using bcrypt on the crypto pool."""
+    return await crypto_executor.run(get_pwd_context().hash, password)
 
 
 async def get_user(email: str):
@@ -67,7 +88,7 @@ async def authenticate_user(email: str, password: str):
     user = await get_user(email)
     if not user:
         return False
-    if not verify_password(password, user["hashed_password"]):
+    if not await verify_password(password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="パスワードが間違っています。",
@@ -86,8 +107,67 @@ def create_csrf_token(data: dict, secret_key: str, expires_delta: Optional[timed
     return jwt.encode(to_encode, secret_key, algorithm=ALGORITHM)
 
 
-def create_session_id_hash(csrf_token):
-    return pwd_context.hash(csrf_token)
+def create_session_id_hash(session_id_token):
+    """Create the sessionID cookie value binding the cookie to the session."""
+    return create_session_binding(session_id_token)
+
+
+async def verify_session_id_hash(session_id_token, session_cookie):
+    """Check the sessionID cookie against the session token.
+
+    Cookies issued before the HMAC binding hold a bcrypt hash, which is still
+    accepted and checked on the crypto pool.
+    """
+    if is_legacy_binding(session_cookie):
+        return await crypto_executor.run(get_pwd_context().verify, session_id_token, session_cookie)
+    return verify_session_binding(session_id_token, session_cookie)
+
+
+def get_verified_session(csrf_cookie: Optional[str], session_cookie: Optional[str]) -> Optional[dict]:
+    """Return the cached JWT subjects of an already verified session.
+
+    Args:
+        csrf_cookie (str): The encrypted CSRF token cookie.
+        session_cookie (str): The session ID cookie.
+
+    Returns:
+        dict: The decoded JWT subjects, or None if the session is not cached.
+    """
+    if not csrf_cookie or not session_cookie:
+        return None
+    return verified_sessions.get((csrf_cookie, session_cookie))
+
+
+def cache_verified_session(csrf_cookie: str, session_cookie: str, decoded_subjects: dict):
+    """Remember a session that passed verification until its token expires.
+
+    Args:
+        csrf_cookie (str): The encrypted CSRF token cookie.
+        session_cookie (str): The session ID cookie.
+        decoded_subjects (dict): The decoded JWT subjects of the session.
+    """
+    expires_at = None
+    if decoded_subjects.get("exp"):
+        # Convert the JWT wall-clock expiry into a monotonic deadline
+        expires_at = time.monotonic() + (decoded_subjects["exp"] - time.time())
+    verified_sessions.set((csrf_cookie, session_cookie),
+                          decoded_subjects, expires_at)
+
+
+def invalidate_session(csrf_cookie: Optional[str], session_cookie: Optional[str]):
+    """Drop a single session from the verified-session cache (e.g. on logout)."""
+    if csrf_cookie and session_cookie:
+        verified_sessions.pop((csrf_cookie, session_cookie))
+
+
+def invalidate_user_sessions(email: str) -> int:
+    """Drop every cached session of a user (e.g. after a password reset).
+
+    Returns:
+        int: The number of sessions removed from the cache.
+    """
+    return verified_sessions.pop_where(
+        lambda key, subjects: subjects.get("email") == email)
 
 
 def unpad(s): return s[:-ord(s[len(s) - 1:])]
@@ -118,7 +198,11 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
 
             csrf_cookie = request.cookies.get("__HOST_csrf_token")
             session_cookie = request.cookies.get("sessionID")
-            csrf_header_token = request.headers["X-CSRF-TOKEN"]
+            if request.scope["type"] == "websocket":
+                # Browsers cannot set headers on WebSocket handshakes
+                csrf_header_token = request.query_params["csrf_token"]
+            else:
+                csrf_header_token = request.headers["X-CSRF-TOKEN"]
 
             if request.headers["origin"] in origins:
 
@@ -126,6 +210,14 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
                     # Security Level 1(If any of the below argument not found in respective place, then it's
                     # unauthorized)
                     if csrf_cookie and bool(csrf_header_token) and session_cookie:
+                        # Skip decryption and the bcrypt check for sessions verified recently
+                        cached_subjects = get_verified_session(
+                            csrf_cookie, session_cookie)
+                        if cached_subjects and cached_subjects["_id"] == csrf_header_token:
+                            flag_session_reissue(
+                                request, cached_subjects["email"] + cached_subjects["_id"], session_cookie)
+                            return cached_subjects
+
                         cipher = AES.new(KEY, AES.MODE_CBC, IV)
                         try:
                             # Security Level 2(If decryption fail because of cookie tamper, then it's unauthorized)
@@ -148,9 +240,14 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
                                     try:
                                         # Security Level 5(if token is not tied to respective session(i.e use of
                                         # someone cookie in someone's browser),then it's unauthorized)
-                                        if pwd_context.verify(hash_sub, session_cookie):
+                                        if await verify_session_id_hash(hash_sub, session_cookie):
                                             print(
                                                 "CSRF verified and session matched")
+                                            cache_verified_session(
+                                                csrf_cookie, session_cookie, decoded_subjects)
+                                            # Replace bcrypt cookies with the HMAC binding
+                                            flag_session_reissue(
+                                                request, hash_sub, session_cookie)
                                             return decoded_subjects
                                         else:
                                             raise HTTPException(
@@ -159,6 +256,9 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
                                                 headers={
                                                     "WWW-Authenticate": "Bearer"},
                                             )
+                                    except CryptoExecutorBusy:
+                                        # Let the 503 through instead of reporting a failed session match
+                                        raise
                                     except Exception as e:
                                         print(e)
                                         raise HTTPException(
@@ -175,6 +275,8 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
                                         headers={"WWW-Authenticate": "Bearer"},
                                     )
 
+                            except CryptoExecutorBusy:
+                                raise
                             except Exception as e:
                                 print(e)
                                 raise HTTPException(
@@ -182,6 +284,8 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
                                     detail="Not authenticated",
                                     headers={"WWW-Authenticate": "Bearer"},
                                 )
+                        except CryptoExecutorBusy:
+                            raise
                         except Exception as e:
                             print(e)
                             raise HTTPException(
@@ -189,6 +293,8 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
                                 detail="Not authenticated",
                                 headers={"WWW-Authenticate": "Bearer"},
                             )
+                except CryptoExecutorBusy:
+                    raise
                 except Exception as e:
                     print(e)
                     raise HTTPException(
@@ -199,10 +305,25 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
 
         except KeyError as e:
 
+            if request.scope["type"] == "websocket":
+                # The referer fallback trusts cookies alone, WebSockets must send the CSRF token
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="All auth parmater not found",
+                    headers={"WWW-Authenticate": "Bearer"},
+                ) from e
+
             if e:
 
                 if request.headers["referer"] in referers:
 
+                    cached_subjects = get_verified_session(
+                        csrf_cookie, session_cookie)
+                    if cached_subjects:
+                        flag_session_reissue(
+                            request, cached_subjects["email"] + cached_subjects["_id"], session_cookie)
+                        return cached_subjects
+
                     try:
                         cipher = AES.new(KEY, AES.MODE_CBC, IV)
                         plainText = unpad(cipher.decrypt(
@@ -214,20 +335,30 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
                             hash_sub = decoded_subjects["email"] + \
                                 decoded_subjects["_id"]
 
-                            if pwd_context.verify(hash_sub, session_cookie):
+                            if await verify_session_id_hash(hash_sub, session_cookie):
                                 print("CSRF verified and session matched")
+                                cache_verified_session(
+                                    csrf_cookie, session_cookie, decoded_subjects)
+                                # Replace bcrypt cookies with the HMAC binding
+                                flag_session_reissue(
+                                    request, hash_sub, session_cookie)
                                 return decoded_subjects
                             else:
                                 raise HTTPException(
                                     status_code=status.HTTP_401_UNAUTHORIZED,
                                     detail="Session Match Failed",
                                     headers={"WWW-Authenticate": "Bearer"}, )
+                        except CryptoExecutorBusy:
+                            # Let the 503 through instead of reporting a failed session match
+                            raise
                         except Exception as e:
                             print(e)
                             raise HTTPException(
                                 status_code=status.HTTP_401_UNAUTHORIZED,
                                 detail="Session Match Failed",
                                 headers={"WWW-Authenticate": "Bearer"}, )
+                    except CryptoExecutorBusy:
+                        raise
                     except Exception as e:
                         print(e)
                         raise HTTPException(
@@ -247,15 +378,6 @@ async def send_forgot_password_email(recipient_email: str, reset_link: str, link
         link_expiration (dict): Dictionary containing link expiration details.
     """
     try:
-        # Get the current working directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Construct the path to the email template file
-        template_path = os.path.join(
-            current_dir, "../templates/forgot_password.html")
-
-        with open(template_path, "r", encoding="utf-8") as file:
-            template = Template(file.read())
-
         # Prepare template context
         context = {
             "reset_link": reset_link,
@@ -263,22 +385,13 @@ async def send_forgot_password_email(recipient_email: str, reset_link: str, link
         }
 
         # Render the template
-        body = template.render(**context)
+        body = render_template("forgot_password.html", **context)
 
         # Set subject
         subject = "パスワードリセットのお知らせ"
 
-        # Send email using FastMail with proper encoding
-        fm = FastMail(conf)
-        await fm.send_message(
-            MessageSchema(
-                subject=subject,
-                recipients=[recipient_email],
-                body=body,
-                subtype="html",
-                charset="utf-8"
-            )
-        )
+        # Send email over the pooled SMTP connection
+        await send_email([recipient_email], subject, body, "html")
 
     except Exception as e:
         print(f"Error sending forgot password email: {str(e)}")
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """A bounded in-process cache with per-entry expiry and LRU eviction.
+
+    Entries expire ``ttl_seconds`` after they are stored (or earlier, if the
+    caller passes an explicit ``expires_at``). When the cache is full the least
+    recently used entry is evicted. Hit, miss and eviction counters are kept so
+    the cache effectiveness can be monitored.
+
+    Args:
+        max_size (int): Maximum number of entries kept in memory.
+        ttl_seconds (float): Default lifetime of an entry in seconds.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._store: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key`` or None if missing or expired."""
+        entry = self._store.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._store[key]
+            self.misses += 1
+            return None
+
+        # Mark the entry as most recently used
+        self._store.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Store ``value`` under ``key``.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to cache.
+            expires_at (float, optional): Absolute ``time.monotonic()`` deadline.
+                The entry never outlives the cache TTL, even if this is later.
+        """
+        deadline = time.monotonic() + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+
+        self._store[key] = (value, deadline)
+        self._store.move_to_end(key)
+
+        # Evict the least recently used entries once the cache is full
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Remove ``key`` from the cache and return its value if present."""
+        entry = self._store.pop(key, None)
+        return entry[0] if entry else None
+
+    def pop_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Remove every entry for which ``predicate(key, value)`` is true.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        keys = [key for key, (value, _) in self._store.items()
+                if predicate(key, value)]
+        for key in keys:
+            del self._store[key]
+        return len(keys)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        self._store.clear()
+
+    def __len__(self):
+        return len(self._store)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters."""
+        return {
+            "size": len(self._store),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime
+from pymongo import ReplaceOne
+from server.configs.db import tasks_collection, comments_collection
+
+# Comments upserted per bulk write when moving an embedded array
+COMMENT_BATCH_SIZE = 1000
+
+
+def comment_document(task: dict, comment: dict, index: int) -> dict:
+    """Convert the ``index``-th embedded comment of a task into a ``comments`` document.
+
+    Comments without an ID get one derived from the task and position, so
+    repeated moves upsert the same document.
+    """
+    created_at = comment.get("created_at")
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return {
+        "_id": comment.get("id") or str(uuid.uuid5(uuid.NAMESPACE_URL, f"{task['_id']}/comments/{index}")),
+        "task_id": task["_id"],
+        "project_id": task.get("project_id"),
+        "content": comment.get("content"),
+        "created_at": created_at,
+        "created_by": comment.get("created_by"),
+    }
+
+
+async def migrate_task_comments(task: dict) -> int:
+    """Move the embedded ``comments`` array of one task into the comments collection.
+
+    Comments are upserted by ID and the array is only removed once they are
+    copied, so this is safe to repeat. The task ends up with a
+    ``comment_count`` matching its stored comments.
+
+    Args:
+        task (dict): The task with its ``_id``, ``project_id`` and ``comments``.
+
+    Returns:
+        int: The number of copied comments.
+    """
+    requests = [
+        ReplaceOne({"_id": document["_id"]}, document, upsert=True)
+        for document in (comment_document(task, comment, index)
+                         for index, comment in enumerate(task.get("comments") or []))
+    ]
+
+    for i in range(0, len(requests), COMMENT_BATCH_SIZE):
+        await comments_collection.bulk_write(
+            requests[i:i + COMMENT_BATCH_SIZE], ordered=False)
+
+    # Count what is stored, so comments added by a re-run are not counted twice
+    comment_count = await comments_collection.count_documents({"task_id": task["_id"]})
+    await tasks_collection.update_one(
+        {"_id": task["_id"]},
+        {"$set": {"comment_count": comment_count}, "$unset": {"comments": ""}}
+    )
+    return len(requests)
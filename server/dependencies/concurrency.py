@@ -0,0 +1,54 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter, ValidationError
+
+# Increments the optimistic concurrency version of a document
+INCREMENT_VERSION = {"version": 1}
+
+_VERSION_ADAPTER = TypeAdapter(Optional[int])
+
+
+def parse_version(value) -> Optional[int]:
+    """Validate a ``version`` read from an untyped request body, like a model field would."""
+    try:
+        return _VERSION_ADAPTER.validate_python(value)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="version must be an integer."
+        ) from e
+
+
+def version_filter(expected: Optional[int]) -> dict:
+    """Match a document only at the ``version`` the client last read.
+
+    Documents written before versioning have no ``version`` and count as
+    version 0. Without an expected version any version matches.
+    """
+    if expected is None:
+        return {}
+    if expected == 0:
+        return {"$or": [{"version": 0}, {"version": {"$exists": False}}]}
+    return {"version": expected}
+
+
+def version_conflict(document: dict) -> HTTPException:
+    """The 409 returned when a document changed since the client read it."""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "This item was changed by someone else. Reload it and try again.",
+            "version": document.get("version", 0)
+        }
+    )
+
+
+async def missing_or_conflict(collection, document_id: str, not_found_detail: str) -> HTTPException:
+    """Explain why a conditional write matched no document: 404 if it is gone, 409 otherwise."""
+    document = await collection.find_one({"_id": document_id}, {"version": 1})
+    if not document:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=not_found_detail
+        )
+    return version_conflict(document)
@@ -0,0 +1,98 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from fastapi import HTTPException, status
+
+
+class CryptoExecutorBusy(HTTPException):
+    """Raised when too many hashing jobs are already queued."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again later.",
+            headers={"Retry-After": "1"},
+        )
+
+
+class CryptoExecutor:
+    """A dedicated, bounded thread pool for password and session hashing.
+
+    bcrypt releases the GIL while hashing, so running it on worker threads
+    keeps the event loop free to serve other requests. At most ``max_pending``
+    jobs may be queued or running; further jobs are rejected with a 503 instead
+    of piling up behind a login burst. Queue wait and run times are tracked.
+
+    Args:
+        max_workers (int): Number of hashing threads.
+        max_pending (int): Maximum number of queued and running jobs.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="crypto")
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.max_run_ms = 0.0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run ``fn(*args)`` on the pool and return its result.
+
+        Raises:
+            CryptoExecutorBusy: If ``max_pending`` jobs are already queued.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise CryptoExecutorBusy()
+
+        def timed():
+            started = time.perf_counter()
+            return fn(*args), started, time.perf_counter()
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self._executor, timed)
+        finally:
+            self.pending -= 1
+
+        wait_ms = (started - submitted) * 1000
+        run_ms = (finished - started) * 1000
+        self.calls += 1
+        self.total_wait_ms += wait_ms
+        self.total_run_ms += run_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.max_run_ms = max(self.max_run_ms, run_ms)
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Return the pool counters and timings."""
+        return {
+            "max_workers": self.max_workers,
+            "pending": self.pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait_ms / self.calls if self.calls else 0.0,
+            "avg_run_ms": self.total_run_ms / self.calls if self.calls else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+            "max_run_ms": self.max_run_ms,
+        }
+
+    def shutdown(self):
+        """Stop the worker threads once queued jobs are done."""
+        self._executor.shutdown(wait=False)
+
+
+crypto_executor = CryptoExecutor(
+    max_workers=int(os.getenv("crypto_pool_size", "2")),
+    max_pending=int(os.getenv("crypto_pool_max_pending", "32")),
+)
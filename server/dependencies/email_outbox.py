@@ -0,0 +1,293 @@
+import os
+import uuid
+import random
+import asyncio
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from pymongo import ReturnDocument, ASCENDING
+from server.configs.db import email_outbox_collection
+from server.dependencies.smtp_pool import smtp_pool
+from server.dependencies.send_emails import (
+    send_task_creation_email,
+    send_assignee_change_email,
+    send_task_start_email,
+    send_task_completion_email,
+    send_task_digest_email,
+    send_task_update_digest_email
+)
+
+# Email kinds the outbox can deliver, mapped to the function sending them
+EMAIL_SENDERS = {
+    "task_creation": send_task_creation_email,
+    "assignee_change": send_assignee_change_email,
+    "task_start": send_task_start_email,
+    "task_completion": send_task_completion_email,
+    "task_digest": send_task_digest_email,
+    "task_update_digest": send_task_update_digest_email,
+}
+
+# Task fields used by the notification templates
+EMAIL_TASK_FIELDS = ("text", "task_description", "start", "end", "assignee", "progress")
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+
+def email_task_data(task: dict) -> dict:
+    """Keep only the task fields the notification templates need."""
+    return {field: task.get(field) for field in EMAIL_TASK_FIELDS}
+
+
+class EmailOutbox:
+    """A persistent email queue drained by a bounded pool of async workers.
+
+    Jobs are stored in the ``email_outbox`` collection, so request handlers
+    only pay for one insert. Workers claim jobs with ``find_one_and_update``,
+    so several processes can drain the same outbox. Failed jobs are retried
+    with exponential backoff and moved to the ``dead`` state after
+    ``max_attempts``. Jobs claimed by a worker that died are picked up again
+    once their lease expires.
+
+    Args:
+        concurrency (int): Number of worker tasks.
+        max_attempts (int): Delivery attempts before a job is dead-lettered.
+        backoff_seconds (float): Delay before the first retry, doubled on each retry.
+        lease_seconds (float): How long a claimed job is reserved for its
+            worker, renewed before each send of a batch.
+        poll_seconds (float): How often idle workers look for due retries.
+        batch_size (int): Jobs a worker claims at once and sends over one SMTP session.
+    """
+
+    def __init__(
+            self,
+            concurrency: int = 4,
+            max_attempts: int = 5,
+            backoff_seconds: float = 30,
+            lease_seconds: float = 120,
+            poll_seconds: float = 10,
+            batch_size: int = 10,
+            collection=email_outbox_collection,
+    ):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.collection = collection
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def enqueue(self, kind: str, *args, **kwargs) -> str:
+        """Persist an email job and wake up the workers.
+
+        Args:
+            kind (str): One of the ``EMAIL_SENDERS`` keys.
+            *args: Positional arguments of the sender function.
+            **kwargs: Keyword arguments of the sender function.
+
+        Returns:
+            str: The ID of the queued job.
+        """
+        if kind not in EMAIL_SENDERS:
+            raise ValueError(f"Unknown email kind: {kind}")
+
+        now = datetime.now()
+        job = {
+            "_id": str(uuid.uuid4()),
+            "kind": kind,
+            "args": list(args),
+            "kwargs": kwargs,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        await self.collection.insert_one(job)
+        if self._wakeup:
+            self._wakeup.set()
+        return job["_id"]
+
+    async def claim(self) -> Optional[dict]:
+        """Reserve the next due job for the calling worker."""
+        now = datetime.now()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                    # Jobs left behind by a worker that stopped mid-delivery
+                    {"status": SENDING, "locked_until": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": SENDING,
+                    "locked_until": now + timedelta(seconds=self.lease_seconds)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def claim_batch(self) -> List[dict]:
+        """Reserve up to ``batch_size`` due jobs for the calling worker."""
+        jobs = []
+        while len(jobs) < self.batch_size:
+            job = await self.claim()
+            if not job:
+                break
+            jobs.append(job)
+        return jobs
+
+    async def renew(self, job_ids: List[str]):
+        """Extend the lease of claimed jobs still waiting to be sent."""
+        await self.collection.update_many(
+            {"_id": {"$in": job_ids}, "status": SENDING},
+            {"$set": {"locked_until": datetime.now() + timedelta(seconds=self.lease_seconds)}}
+        )
+
+    async def deliver_batch(self, jobs: List[dict]) -> dict:
+        """Send claimed jobs over a single SMTP session.
+
+        The leases of the jobs still waiting are renewed before each send, so
+        a slow batch is not claimed again by another worker. If the session
+        cannot be opened (e.g. SMTP connect or login fails), every job not
+        attempted yet is recorded as a failed attempt.
+
+        Returns:
+            dict: The number of ``sent`` and ``failed`` jobs.
+        """
+        result = {"sent": 0, "failed": 0}
+        waiting = list(jobs)
+        try:
+            async with smtp_pool.session():
+                while waiting:
+                    await self.renew([job["_id"] for job in waiting])
+                    job = waiting.pop(0)
+                    if await self.deliver(job):
+                        result["sent"] += 1
+                    else:
+                        result["failed"] += 1
+        except Exception as e:
+            traceback.print_exc()
+            for job in waiting:
+                await self.fail(job, e)
+                result["failed"] += 1
+        return result
+
+    async def fail(self, job: dict, e: Exception):
+        """Record a failed attempt, retrying the job with backoff or dead-lettering it."""
+        error = getattr(e, "detail", None) or str(e)
+        if job["attempts"] >= self.max_attempts:
+            print(f"Email job {job['_id']} dead-lettered: {error}")
+            update = {"status": DEAD, "last_error": error}
+        else:
+            delay = self.backoff_seconds * 2 ** (job["attempts"] - 1)
+            update = {
+                "status": PENDING,
+                "last_error": error,
+                "next_attempt_at": datetime.now() + timedelta(
+                    seconds=delay * random.uniform(1, 1.25))
+            }
+        await self.collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": update, "$unset": {"locked_until": ""}}
+        )
+
+    async def deliver(self, job: dict) -> bool:
+        """Send a claimed job and record the outcome.
+
+        Returns:
+            bool: True if the email was sent.
+        """
+        try:
+            sender = EMAIL_SENDERS[job["kind"]]
+            await sender(*job.get("args", []), **job.get("kwargs", {}))
+        except Exception as e:
+            await self.fail(job, e)
+            return False
+
+        # sent_at is TTL-indexed, and TTL indexes compare UTC dates
+        await self.collection.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {"status": SENT, "sent_at": datetime.now(timezone.utc)},
+                "$unset": {"locked_until": "", "last_error": ""}
+            }
+        )
+        return True
+
+    async def drain(self) -> dict:
+        """Deliver every due job once, without starting the worker pool.
+
+        Returns:
+            dict: The number of ``sent`` and ``failed`` jobs.
+        """
+        result = {"sent": 0, "failed": 0}
+        while True:
+            jobs = await self.claim_batch()
+            if not jobs:
+                return result
+            batch_result = await self.deliver_batch(jobs)
+            result["sent"] += batch_result["sent"]
+            result["failed"] += batch_result["failed"]
+
+    async def _work(self):
+        while True:
+            try:
+                # Clear before claiming so jobs queued meanwhile wake us up again
+                self._wakeup.clear()
+                jobs = await self.claim_batch()
+                if jobs:
+                    await self.deliver_batch(jobs)
+                    continue
+
+                # Sleep until a new job is queued or a retry may be due
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        """Start the worker pool on the running event loop."""
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work())
+                         for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Stop the worker pool. Claimed jobs are retried after their lease expires."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+
+
+email_outbox = EmailOutbox(
+    concurrency=int(os.getenv("email_outbox_workers", "4")),
+    max_attempts=int(os.getenv("email_outbox_max_attempts", "5")),
+    backoff_seconds=float(os.getenv("email_outbox_backoff_seconds", "30")),
+    batch_size=int(os.getenv("email_outbox_batch_size", "10")),
+)
+
+
+async def enqueue_email(kind: str, *args, **kwargs) -> str:
+    """Queue an email for background delivery. See ``EmailOutbox.enqueue``."""
+    return await email_outbox.enqueue(kind, *args, **kwargs)
+
+
+if __name__ == "__main__":
+    # Usage: python -m server.dependencies.email_outbox
+    # Delivers every due job once, e.g. from a scheduled task
+    print(asyncio.run(email_outbox.drain()))
@@ -0,0 +1,280 @@
+import os
+import asyncio
+import traceback
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from pymongo.errors import OperationFailure
+from server.configs.db import database, tasks_collection
+from server.dependencies.links import link_store, to_link, EdgeLinkStore
+from server.dependencies.tasks import TASK_LIST_PROJECTION, format_task_fields
+from server.dependencies.versions import get_versions, project_version_key
+
+# Collections whose changes are pushed to subscribers
+WATCHED_COLLECTIONS = ("tasks", "links", "task_links")
+
+# Error codes of servers without change streams (standalone mongod)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+
+
+def task_event(task: dict) -> dict:
+    """Build the upsert event of a task document."""
+    fields = {field: task[field] for field in TASK_LIST_PROJECTION
+              if field in task and field != "_id"}
+    return {"type": "task", "op": "upsert", "id": task["_id"], "task": format_task_fields(fields)}
+
+
+class Subscription:
+    """The event queue of one connected client.
+
+    The queue is bounded: when a client falls behind, its backlog is dropped
+    and replaced by a single ``resync`` event telling it to refetch the
+    project, so a slow client never holds more than ``max_size`` events.
+
+    Args:
+        project_id (str): The ID of the watched project.
+        max_size (int): The most events kept for the client.
+    """
+
+    def __init__(self, project_id: str, max_size: int):
+        self.project_id = project_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = 0
+
+    def push(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Wait for the next event, or return None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ChangeFeed:
+    """Fans task and link changes out to the clients watching their project.
+
+    A single watcher runs per process while at least one client is
+    subscribed. It follows a MongoDB change stream over the tasks and links
+    collections; when the server has no change streams (standalone mongod)
+    it falls back to polling: the project version stamps are read for every
+    watched project at once, and only projects whose stamp moved are queried
+    for tasks by ``updated_at``.
+
+    Events are compact deltas:
+
+    - ``{"type": "task", "op": "upsert", "id", "task"}`` with the list fields
+    - ``{"type": "task", "op": "update", "id", "changes"}`` with the changed fields
+    - ``{"type": "task", "op": "delete", "id"}``
+    - ``{"type": "link", "op": "upsert", "link"}`` / ``{"type": "link", "op": "delete", "id"}``
+    - ``{"type": "links", "op": "replace", "links"}`` for the legacy links array
+    - ``{"type": "resync"}`` when the client must refetch the project
+
+    Change stream delete events do not carry the project of the removed
+    document, so they are sent to every subscriber; clients ignore IDs they
+    do not know.
+
+    Args:
+        mode (str): ``auto``, ``change_stream`` or ``polling``.
+        queue_size (int): The most events kept per client.
+        poll_seconds (float): The polling interval of the fallback.
+        poll_overlap_seconds (float): How far back each poll looks, so writes
+            that land while a poll runs are not missed.
+    """
+
+    def __init__(self, mode: str, queue_size: int, poll_seconds: float, poll_overlap_seconds: float):
+        self.requested_mode = mode
+        self.queue_size = queue_size
+        self.poll_seconds = poll_seconds
+        self.poll_overlap = timedelta(seconds=poll_overlap_seconds)
+        self.mode: Optional[str] = None
+        self.subscriptions: Dict[str, Set[Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+
+    def subscribe(self, project_id: str) -> Subscription:
+        """Start receiving the events of a project, starting the watcher if needed."""
+        subscription = Subscription(project_id, self.queue_size)
+        self.subscriptions.setdefault(project_id, set()).add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop receiving events, stopping the watcher after the last client leaves."""
+        subscriptions = self.subscriptions.get(subscription.project_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.project_id]
+        if not self.subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, project_id: Optional[str], event: dict):
+        """Queue an event for a project's subscribers, or for everyone if the project is unknown."""
+        if project_id is None:
+            targets = [s for subscriptions in self.subscriptions.values() for s in subscriptions]
+        else:
+            targets = list(self.subscriptions.get(project_id, ()))
+        for subscription in targets:
+            subscription.push(event)
+
+    async def stop(self):
+        """Stop the watcher."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        subscriptions = [s for group in self.subscriptions.values() for s in group]
+        return {
+            "mode": self.mode,
+            "projects": len(self.subscriptions),
+            "subscribers": len(subscriptions),
+            "queued_events": sum(s.queue.qsize() for s in subscriptions),
+            "dropped_events": sum(s.dropped for s in subscriptions),
+        }
+
+    async def _run(self):
+        while self.subscriptions:
+            try:
+                if self.requested_mode != "polling":
+                    try:
+                        await self._watch()
+                        continue
+                    except (OperationFailure, NotImplementedError) as e:
+                        unsupported = isinstance(e, NotImplementedError) or e.code in CHANGE_STREAMS_UNSUPPORTED
+                        if not unsupported or self.requested_mode == "change_stream":
+                            raise
+                        print("Change streams are not available, polling for task changes")
+                        self.requested_mode = "polling"
+                await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                # Events may have been lost while the watcher was down
+                self.publish(None, {"type": "resync"})
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _watch(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(WATCHED_COLLECTIONS)},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        async with database.watch(
+                pipeline, full_document="updateLookup", resume_after=self._resume_token) as stream:
+            self.mode = "change_stream"
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                self._dispatch(change)
+                if not self.subscriptions:
+                    return
+
+    def _dispatch(self, change: dict):
+        collection = change["ns"]["coll"]
+        operation = change["operationType"]
+        document_id = change["documentKey"]["_id"]
+        document = change.get("fullDocument")
+
+        if operation == "delete":
+            if collection != "links":
+                event_type = "task" if collection == "tasks" else "link"
+                self.publish(None, {"type": event_type, "op": "delete", "id": document_id})
+            return
+        if document is None:
+            # Deleted before the lookup, its delete event follows
+            return
+
+        project_id = document.get("project_id")
+        if collection == "tasks":
+            if operation == "update":
+                changes = {field: value
+                           for field, value in change["updateDescription"]["updatedFields"].items()
+                           if field in TASK_LIST_PROJECTION}
+                if changes:
+                    self.publish(project_id, {"type": "task", "op": "update", "id": document_id,
+                                              "changes": format_task_fields(changes)})
+            else:
+                self.publish(project_id, task_event(document))
+        elif collection == "task_links":
+            self.publish(project_id, {"type": "link", "op": "upsert",
+                                      "link": EdgeLinkStore.from_document(document)})
+        else:
+            self.publish(project_id, {"type": "links", "op": "replace",
+                                      "links": [to_link(link) for link in document.get("links") or []]})
+
+    async def _poll(self):
+        self.mode = "polling"
+        versions: Dict[str, int] = {}
+        since: Dict[str, datetime] = {}
+        task_ids: Dict[str, Set[str]] = {}
+        links: Dict[str, List[dict]] = {}
+
+        while self.subscriptions:
+            started = datetime.now()
+            project_ids = list(self.subscriptions)
+            current = await get_versions(project_version_key(project_id) for project_id in project_ids)
+
+            for project_id in project_ids:
+                version = current[project_version_key(project_id)]
+                if project_id not in versions:
+                    # Clients fetch the project when they subscribe, start from there
+                    task_ids[project_id] = await self._task_ids(project_id)
+                    links[project_id] = await link_store.get_links(project_id)
+                elif version != versions[project_id]:
+                    await self._poll_project(project_id, since[project_id], task_ids, links)
+                versions[project_id] = version
+                since[project_id] = started - self.poll_overlap
+
+            # Forget projects nobody watches anymore
+            for state in (versions, since, task_ids, links):
+                for project_id in set(state) - set(self.subscriptions):
+                    del state[project_id]
+
+            await asyncio.sleep(self.poll_seconds)
+
+    @staticmethod
+    async def _task_ids(project_id: str) -> Set[str]:
+        return {task["_id"] async for task in tasks_collection.find({"project_id": project_id}, {"_id": 1})}
+
+    async def _poll_project(self, project_id: str, since: datetime,
+                            task_ids: Dict[str, Set[str]], links: Dict[str, List[dict]]):
+        current_ids = await self._task_ids(project_id)
+        added = list(current_ids - task_ids[project_id])
+        for removed in task_ids[project_id] - current_ids:
+            self.publish(project_id, {"type": "task", "op": "delete", "id": removed})
+        task_ids[project_id] = current_ids
+
+        changed = tasks_collection.find(
+            {"project_id": project_id,
+             "$or": [{"updated_at": {"$gte": since}}, {"_id": {"$in": added}}]},
+            TASK_LIST_PROJECTION
+        )
+        async for task in changed:
+            self.publish(project_id, task_event(task))
+
+        current_links = await link_store.get_links(project_id)
+        if current_links != links[project_id]:
+            links[project_id] = current_links
+            self.publish(project_id, {"type": "links", "op": "replace",
+                                      "links": [to_link(link) for link in current_links]})
+
+
+change_feed = ChangeFeed(
+    mode=os.getenv("change_feed_mode", "auto").lower(),
+    queue_size=int(os.getenv("change_feed_queue_size", "256")),
+    poll_seconds=float(os.getenv("change_feed_poll_seconds", "2")),
+    poll_overlap_seconds=float(os.getenv("change_feed_poll_overlap_seconds", "30")),
+)
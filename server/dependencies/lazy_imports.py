@@ -0,0 +1,42 @@
+import time
+import importlib
+from types import ModuleType
+from typing import Dict, Optional
+
+# Time (ms) spent importing each lazily loaded module, in load order
+lazy_import_timings: Dict[str, float] = {}
+
+
+class LazyModule:
+    """A module that is imported on first attribute access.
+
+    Heavy libraries used only by some requests (encryption, JWT, bcrypt,
+    templating, SMTP) are bound through this proxy so a cold start does not
+    pay for importing them until a request needs them.
+
+    Args:
+        name (str): The dotted module name, e.g. ``jose.jwt``.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            lazy_import_timings[self._name] = (time.perf_counter() - started) * 1000
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a proxy importing the module ``name`` on first use."""
+    return LazyModule(name)
@@ -0,0 +1,274 @@
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+from pymongo import InsertOne, DeleteMany, ReplaceOne
+from server.configs.db import links_collection, task_links_collection
+
+# Fields every stored link exposes to the API
+LINK_FIELDS = ("id", "source", "target", "type")
+
+
+def to_link(link: dict) -> dict:
+    """Keep only the API fields of a link."""
+    return {field: link.get(field) for field in LINK_FIELDS}
+
+
+def edge_key(link: dict) -> tuple:
+    """Identify a link by its endpoints and type, independently of its ID."""
+    return (str(link["source"]), str(link["target"]), str(link["type"]))
+
+
+def new_link(link: dict) -> dict:
+    """Build a link with a freshly generated ID."""
+    return {
+        "id": str(uuid.uuid4()),
+        "source": link["source"],
+        "target": link["target"],
+        "type": link["type"]
+    }
+
+
+def diff_links(existing: List[dict], desired: List[dict]) -> Tuple[List[dict], List[str]]:
+    """Compute the changes turning the ``existing`` links into the ``desired`` ones.
+
+    Links are matched by source, target and type, so links present on both
+    sides keep their stored ID.
+
+    Args:
+        existing (List[dict]): The stored links.
+        desired (List[dict]): The complete set of links the project should have.
+
+    Returns:
+        tuple: The links to add (with new IDs) and the IDs of the links to remove.
+    """
+    desired_keys = {}
+    for link in desired:
+        desired_keys.setdefault(edge_key(link), link)
+
+    kept = set()
+    removed = []
+    for link in existing:
+        key = edge_key(link)
+        # Links no longer wanted, and duplicates of an already kept edge
+        if key in desired_keys and key not in kept:
+            kept.add(key)
+        else:
+            removed.append(link["id"])
+
+    added = [new_link(link)
+             for key, link in desired_keys.items() if key not in kept]
+    return added, removed
+
+
+class LinkStore(ABC):
+    """Storage interface for the dependency links between a project's tasks.
+
+    Links are dictionaries with ``id``, ``source``, ``target`` and ``type``.
+    """
+
+    @abstractmethod
+    async def get_links(self, project_id: str) -> List[dict]:
+        """Return every link of a project."""
+
+    @abstractmethod
+    async def replace_links(self, project_id: str, links: List[dict]):
+        """Replace every link of a project."""
+
+    @abstractmethod
+    async def add_links(self, project_id: str, links: List[dict]):
+        """Add links to a project."""
+
+    @abstractmethod
+    async def remove_links(self, project_id: str, link_ids: List[str]):
+        """Remove links from a project by ID."""
+
+    @abstractmethod
+    async def remove_task_links(self, project_id: str, task_id: str):
+        """Remove every link starting or ending at a task."""
+
+    @abstractmethod
+    async def get_successor_ids(self, project_id: str, task_id: str) -> List[str]:
+        """Return the IDs of the tasks linked after a task."""
+
+    async def apply_diff(self, project_id: str, added: List[dict], removed_ids: List[str]):
+        """Add and remove links in as few writes as the storage allows."""
+        await self.remove_links(project_id, removed_ids)
+        await self.add_links(project_id, added)
+
+    async def sync_links(self, project_id: str, desired: List[dict]) -> Tuple[List[dict], List[str]]:
+        """Make the stored links of a project match ``desired`` by writing only the delta.
+
+        Returns:
+            tuple: The added links and the IDs of the removed links.
+        """
+        existing = await self.get_links(project_id)
+        added, removed_ids = diff_links(existing, desired)
+        if added or removed_ids:
+            await self.apply_diff(project_id, added, removed_ids)
+        return added, removed_ids
+
+
+class ProjectDocumentLinkStore(LinkStore):
+    """Legacy storage keeping all links of a project in one ``links`` array document."""
+
+    def __init__(self, collection=links_collection):
+        self.collection = collection
+
+    async def get_links(self, project_id):
+        links_doc = await self.collection.find_one(
+            {"project_id": project_id},
+            {"_id": 1, "links": 1}
+        )
+        if not links_doc or "links" not in links_doc:
+            return []
+        return links_doc["links"]
+
+    async def replace_links(self, project_id, links):
+        await self.collection.update_one(
+            {"project_id": project_id},
+            {
+                "$set": {"links": [to_link(link) for link in links]},
+                "$setOnInsert": {"_id": str(uuid.uuid4())}
+            },
+            upsert=True
+        )
+
+    async def add_links(self, project_id, links):
+        if not links:
+            return
+        await self.collection.update_one(
+            {"project_id": project_id},
+            {
+                "$push": {"links": {"$each": [to_link(link) for link in links]}},
+                "$setOnInsert": {"_id": str(uuid.uuid4())}
+            },
+            upsert=True
+        )
+
+    async def remove_links(self, project_id, link_ids):
+        if not link_ids:
+            return
+        await self.collection.update_one(
+            {"project_id": project_id},
+            {"$pull": {"links": {"id": {"$in": list(link_ids)}}}}
+        )
+
+    async def remove_task_links(self, project_id, task_id):
+        # Let the server filter the array instead of rewriting it from Python
+        await self.collection.update_one(
+            {"project_id": project_id},
+            {"$pull": {"links": {"$or": [{"source": task_id}, {"target": task_id}]}}}
+        )
+
+    async def get_successor_ids(self, project_id, task_id):
+        links = await self.get_links(project_id)
+        return [link["target"] for link in links if link["source"] == task_id]
+
+
+class EdgeLinkStore(LinkStore):
+    """Storage keeping every link in its own document.
+
+    Documents are ``{_id: <link id>, project_id, source, target, type}`` and
+    are indexed on ``(project_id, source)`` and ``(project_id, target)``, so
+    edits touch single edges and successor lookups are indexed queries.
+    """
+
+    def __init__(self, collection=task_links_collection):
+        self.collection = collection
+
+    @staticmethod
+    def to_document(project_id: str, link: dict) -> dict:
+        return {
+            "_id": link.get("id") or str(uuid.uuid4()),
+            "project_id": project_id,
+            "source": link["source"],
+            "target": link["target"],
+            "type": link["type"]
+        }
+
+    @staticmethod
+    def from_document(document: dict) -> dict:
+        return {
+            "id": document["_id"],
+            "source": document["source"],
+            "target": document["target"],
+            "type": document["type"]
+        }
+
+    async def get_links(self, project_id):
+        documents = self.collection.find(
+            {"project_id": project_id},
+            {"_id": 1, "source": 1, "target": 1, "type": 1}
+        )
+        return [self.from_document(document) async for document in documents]
+
+    async def replace_links(self, project_id, links):
+        documents = [self.to_document(project_id, link) for link in links]
+        requests = [ReplaceOne({"_id": document["_id"], "project_id": project_id},
+                               document, upsert=True)
+                    for document in documents]
+        # Write the new links before dropping the others, so readers never see none
+        requests.append(DeleteMany({
+            "project_id": project_id,
+            "_id": {"$nin": [document["_id"] for document in documents]}
+        }))
+        await self.collection.bulk_write(requests, ordered=True)
+
+    async def add_links(self, project_id, links):
+        if not links:
+            return
+        await self.collection.bulk_write(
+            [InsertOne(self.to_document(project_id, link)) for link in links],
+            ordered=False
+        )
+
+    async def remove_links(self, project_id, link_ids):
+        if not link_ids:
+            return
+        await self.collection.delete_many(
+            {"project_id": project_id, "_id": {"$in": list(link_ids)}})
+
+    async def remove_task_links(self, project_id, task_id):
+        await self.collection.delete_many({
+            "project_id": project_id,
+            "$or": [{"source": task_id}, {"target": task_id}]
+        })
+
+    async def apply_diff(self, project_id, added, removed_ids):
+        requests = []
+        if removed_ids:
+            requests.append(DeleteMany(
+                {"project_id": project_id, "_id": {"$in": list(removed_ids)}}))
+        requests.extend(
+            InsertOne(self.to_document(project_id, link)) for link in added)
+        if requests:
+            # Deletes run first since the batch groups operations by type in order
+            await self.collection.bulk_write(requests, ordered=True)
+
+    async def get_successor_ids(self, project_id, task_id):
+        documents = self.collection.find(
+            {"project_id": project_id, "source": task_id},
+            {"_id": 0, "target": 1}
+        )
+        return [document["target"] async for document in documents]
+
+
+def create_link_store(mode: str = None) -> LinkStore:
+    """Create the link store selected by the ``links_storage`` setting.
+
+    Args:
+        mode (str, optional): ``document`` (default) or ``edges``.
+
+    Returns:
+        LinkStore: The link store for the requested mode.
+    """
+    mode = (mode or os.getenv("links_storage", "document")).lower()
+    if mode == "edges":
+        return EdgeLinkStore()
+    if mode == "document":
+        return ProjectDocumentLinkStore()
+    raise ValueError(f"Unknown links_storage mode: {mode}")
+
+
+link_store = create_link_store()
@@ -0,0 +1,40 @@
+from collections import defaultdict
+from typing import Dict, List
+from server.dependencies.email_outbox import enqueue_email, email_task_data
+
+
+class NotificationBatch:
+    """Collects the task notifications of a bulk change, coalesced per recipient.
+
+    A recipient with a single notification gets the usual email of its kind,
+    one with several gets a single ``task_update_digest`` listing them all.
+    Supported kinds are ``task_start``, ``task_completion`` and
+    ``assignee_change``, with the extra arguments of their sender.
+    """
+
+    def __init__(self):
+        self._notifications: Dict[str, List[dict]] = defaultdict(list)
+
+    def add(self, recipient: str, kind: str, task: dict, *args):
+        """Queue a notification about ``task`` for ``recipient``, ignoring invalid addresses."""
+        if recipient and "@" in recipient:
+            self._notifications[recipient].append(
+                {"kind": kind, "task": email_task_data(task), "args": list(args)})
+
+    async def send(self) -> int:
+        """Queue one email per recipient and return the number of queued emails."""
+        queued = 0
+        for recipient, notifications in self._notifications.items():
+            try:
+                if len(notifications) == 1:
+                    notification = notifications[0]
+                    await enqueue_email(
+                        notification["kind"], recipient, notification["task"], *notification["args"])
+                else:
+                    await enqueue_email("task_update_digest", recipient, notifications)
+                queued += 1
+            except Exception as e:
+                # Log the error but don't fail the update
+                print(f"Failed to queue task notification email: {str(e)}")
+        self._notifications.clear()
+        return queued
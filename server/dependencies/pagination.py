@@ -0,0 +1,83 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, List, Sequence
+from fastapi import HTTPException, status
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key values of the last returned document as an opaque cursor.
+
+    Args:
+        values (Sequence[Any]): The sort key values, in sort order.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    encoded = [
+        {"$date": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(encoded, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str): The opaque cursor string.
+
+    Returns:
+        list: The sort key values stored in the cursor.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list):
+            raise ValueError("cursor is not a list")
+        return [
+            datetime.fromisoformat(value["$date"])
+            if isinstance(value, dict) and "$date" in value else value
+            for value in values
+        ]
+    except (ValueError, TypeError, KeyError, binascii.Error, UnicodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        ) from e
+
+
+def keyset_filter(fields: Sequence[str], values: Sequence[Any]) -> dict:
+    """Build a filter matching documents that sort after ``values``.
+
+    For ascending sort fields ``(a, b)`` this yields
+    ``a > va OR (a == va AND b > vb)``, which the index on the sort fields can
+    answer without skipping over the previous pages.
+
+    Args:
+        fields (Sequence[str]): The ascending sort fields.
+        values (Sequence[Any]): The sort key values of the last seen document.
+
+    Returns:
+        dict: A MongoDB filter.
+
+    Raises:
+        HTTPException: If the cursor does not match the sort fields.
+    """
+    if len(fields) != len(values):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    branches = []
+    for i, field in enumerate(fields):
+        branch = {fields[j]: values[j] for j in range(i)}
+        branch[field] = {"$gt": values[i]}
+        branches.append(branch)
+    return {"$or": branches}
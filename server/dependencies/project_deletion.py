@@ -0,0 +1,315 @@
+import os
+import sys
+import time
+import asyncio
+import traceback
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import ReturnDocument, ASCENDING
+from server.configs.db import (
+    project_deletions_collection,
+    tasks_collection,
+    comments_collection,
+    task_links_collection,
+    links_collection,
+    summaries_collection
+)
+from server.dependencies.versions import bump_project_version
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+
+# Collections holding a deleted project's data, emptied in this order. The
+# summary goes last so reads during the deletion do not rebuild it.
+CASCADE_COLLECTIONS = {
+    "comments": comments_collection,
+    "task_links": task_links_collection,
+    "tasks": tasks_collection,
+    "links": links_collection,
+    "summaries": summaries_collection,
+}
+
+# Summaries are keyed by project ID, the other collections carry a project_id field
+PROJECT_KEYS = {"summaries": "_id"}
+
+
+def deletion_progress(job: dict) -> dict:
+    """Format a deletion job for API responses."""
+    return {
+        "project_id": job["_id"],
+        "status": job["status"],
+        "step": job.get("step"),
+        "total": job.get("total", {}),
+        "deleted": job.get("deleted", {}),
+        "requested_by": job.get("requested_by"),
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at"),
+        "finished_at": job.get("finished_at"),
+        "last_error": job.get("last_error"),
+    }
+
+
+class ProjectDeletions:
+    """Removes the data of deleted projects in the background.
+
+    Deleting a project only removes its document and queues a job in the
+    ``project_deletions`` collection, keyed by project ID. Workers claim jobs
+    with ``find_one_and_update`` and empty the project's comments, links,
+    tasks and summary in chunks of ``chunk_size`` documents, recording the
+    progress after every chunk. Each chunk renews the job's lease, so a
+    worker that died mid-job (e.g. a frozen Lambda container) leaves it to
+    the next worker once the lease expires. Chunk deletes are idempotent, so
+    a resumed job simply carries on. Failed jobs are retried after
+    ``retry_seconds``.
+
+    On Lambda the container is frozen once the 202 response is sent, so the
+    in-process worker only advances while some other invocation runs.
+    Deployments there should also invoke ``scheduled_handler`` on a schedule
+    (e.g. an EventBridge rule every minute), or run
+    ``python -m server.dependencies.project_deletion``. Both drain due jobs
+    until shortly before the invocation's time limit, handing unfinished
+    jobs back for the next run.
+
+    Args:
+        chunk_size (int): Documents removed per ``delete_many``.
+        lease_seconds (float): How long a claimed job is reserved for its worker.
+        poll_seconds (float): How often idle workers look for jobs to resume.
+        retry_seconds (float): Delay before a failed job is retried.
+    """
+
+    def __init__(
+            self,
+            chunk_size: int = 1000,
+            lease_seconds: float = 120,
+            poll_seconds: float = 30,
+            retry_seconds: float = 60,
+            collection=project_deletions_collection,
+    ):
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.collection = collection
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def enqueue(self, project_id: str, requested_by: str) -> dict:
+        """Queue the deletion of a project's data and wake up the worker.
+
+        Args:
+            project_id (str): The ID of the deleted project.
+            requested_by (str): The email of the user deleting the project.
+
+        Returns:
+            dict: The queued job.
+        """
+        now = datetime.now()
+        total = {
+            name: await collection.count_documents({PROJECT_KEYS.get(name, "project_id"): project_id})
+            for name, collection in CASCADE_COLLECTIONS.items()
+        }
+        job = await self.collection.find_one_and_update(
+            {"_id": project_id},
+            {
+                "$set": {
+                    "status": PENDING,
+                    "total": total,
+                    "deleted": {name: 0 for name in CASCADE_COLLECTIONS},
+                    "requested_by": requested_by,
+                    "next_attempt_at": now,
+                    "updated_at": now,
+                },
+                "$setOnInsert": {"created_at": now},
+                "$unset": {"step": "", "locked_until": "", "finished_at": "", "last_error": ""}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    async def get(self, project_id: str) -> Optional[dict]:
+        """Return the deletion job of a project, if any."""
+        return await self.collection.find_one({"_id": project_id})
+
+    async def claim(self) -> Optional[dict]:
+        """Reserve the next due job for the calling worker."""
+        now = datetime.now()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                    # Jobs left behind by a worker that stopped mid-deletion
+                    {"status": RUNNING, "locked_until": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "locked_until": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                }
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _delete_chunk(self, name: str, project_id: str) -> int:
+        collection = CASCADE_COLLECTIONS[name]
+        key = PROJECT_KEYS.get(name, "project_id")
+        ids = [document["_id"] async for document in collection.find(
+            {key: project_id}, {"_id": 1}).limit(self.chunk_size)]
+        if not ids:
+            return 0
+        result = await collection.delete_many({"_id": {"$in": ids}})
+        return result.deleted_count
+
+    async def run(self, job: dict, deadline: Optional[float] = None) -> bool:
+        """Empty every collection of a claimed job, one chunk at a time.
+
+        Args:
+            job (dict): The claimed job.
+            deadline (float, optional): ``time.monotonic()`` time after which
+                no new chunk is started and the job is handed back as pending.
+
+        Returns:
+            bool: True if the job finished.
+        """
+        project_id = job["_id"]
+        try:
+            for name in CASCADE_COLLECTIONS:
+                while True:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        await self.collection.update_one(
+                            {"_id": project_id},
+                            {
+                                "$set": {"status": PENDING, "next_attempt_at": datetime.now()},
+                                "$unset": {"locked_until": ""}
+                            }
+                        )
+                        return False
+                    deleted = await self._delete_chunk(name, project_id)
+                    if not deleted:
+                        break
+                    if name == "tasks":
+                        # Let task list ETags and the change feed see the removals
+                        await bump_project_version(project_id)
+                    now = datetime.now()
+                    await self.collection.update_one(
+                        {"_id": project_id},
+                        {
+                            "$set": {
+                                "step": name,
+                                "locked_until": now + timedelta(seconds=self.lease_seconds),
+                                "updated_at": now
+                            },
+                            "$inc": {f"deleted.{name}": deleted}
+                        }
+                    )
+        except Exception as e:
+            traceback.print_exc()
+            await self.collection.update_one(
+                {"_id": project_id},
+                {
+                    "$set": {
+                        "status": PENDING,
+                        "last_error": str(e),
+                        "next_attempt_at": datetime.now() + timedelta(seconds=self.retry_seconds)
+                    },
+                    "$unset": {"locked_until": ""}
+                }
+            )
+            return False
+
+        now = datetime.now()
+        await self.collection.update_one(
+            {"_id": project_id},
+            {
+                "$set": {"status": DONE, "finished_at": now, "updated_at": now},
+                "$unset": {"step": "", "locked_until": "", "last_error": ""}
+            }
+        )
+        print(f"Deleted the data of project {project_id}")
+        return True
+
+    async def drain(self, max_seconds: Optional[float] = None) -> int:
+        """Run every due job once, without starting the worker.
+
+        Args:
+            max_seconds (float, optional): Stop starting new chunks after this
+                long; the job in progress is handed back and resumed later.
+
+        Returns:
+            int: The number of jobs run.
+        """
+        deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+        jobs = 0
+        while deadline is None or time.monotonic() < deadline:
+            job = await self.claim()
+            if not job:
+                break
+            await self.run(job, deadline)
+            jobs += 1
+        return jobs
+
+    async def _work(self):
+        while True:
+            try:
+                # Clear before claiming so jobs queued meanwhile wake us up again
+                self._wakeup.clear()
+                if await self.drain():
+                    continue
+
+                # Sleep until a deletion is queued or a lease or retry may be due
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        """Start the worker on the running event loop, resuming unfinished jobs."""
+        if self._worker:
+            return
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._work())
+
+    async def stop(self):
+        """Stop the worker. A claimed job is resumed after its lease expires."""
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self._wakeup = None
+
+
+project_deletions = ProjectDeletions(
+    chunk_size=int(os.getenv("project_deletion_chunk_size", "1000")),
+    lease_seconds=float(os.getenv("project_deletion_lease_seconds", "120")),
+    poll_seconds=float(os.getenv("project_deletion_poll_seconds", "30")),
+)
+
+
+def scheduled_handler(event, context) -> dict:
+    """Lambda entry point for a scheduled rule draining the project deletions.
+
+    Stops starting new chunks ``project_deletion_handler_margin_seconds``
+    before the invocation times out.
+    """
+    margin = float(os.getenv("project_deletion_handler_margin_seconds", "10"))
+    max_seconds = None
+    if context is not None:
+        max_seconds = max(0.0, context.get_remaining_time_in_millis() / 1000 - margin)
+    return {"jobs": asyncio.run(project_deletions.drain(max_seconds))}
+
+
+if __name__ == "__main__":
+    # Usage: python -m server.dependencies.project_deletion [max seconds]
+    # Runs every due deletion once, e.g. from a scheduled task
+    print(asyncio.run(project_deletions.drain(float(sys.argv[1]) if len(sys.argv) > 1 else None)))
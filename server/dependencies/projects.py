@@ -0,0 +1,91 @@
+import os
+from typing import Dict, Iterable
+from server.configs.db import projects_collection, tasks_collection
+from server.dependencies.cache import TTLCache
+from server.dependencies.links import link_store
+from server.dependencies.scheduling import critical_path
+from server.dependencies.versions import get_project_version
+
+# Project names change rarely, so keep them in-process and share them between
+# every handler that decorates tasks with the name of their project
+project_names = TTLCache(
+    max_size=int(os.getenv("project_name_cache_max_size", "5000")),
+    ttl_seconds=float(os.getenv("project_name_cache_ttl_seconds", "60")),
+)
+
+
+async def get_project_names(project_ids: Iterable[str]) -> Dict[str, str]:
+    """Resolve project names for a set of project IDs.
+
+    Cached names are served from memory and all remaining IDs are resolved
+    with a single ``$in`` query, regardless of how many IDs are requested.
+
+    Args:
+        project_ids (Iterable[str]): The project IDs to resolve.
+
+    Returns:
+        dict: A mapping of project ID to project name. Unknown projects are omitted.
+    """
+    names = {}
+    missing = []
+    for project_id in set(project_ids):
+        if not project_id:
+            continue
+        name = project_names.get(project_id)
+        if name is None:
+            missing.append(project_id)
+        else:
+            names[project_id] = name
+
+    if missing:
+        async for project in projects_collection.find(
+            {"_id": {"$in": missing}},
+            {"project_name": 1}
+        ):
+            name = project.get("project_name", "Unknown Project")
+            names[project["_id"]] = name
+            project_names.set(project["_id"], name)
+
+    return names
+
+
+def invalidate_project_name(project_id: str):
+    """Drop a project's cached name after it has been renamed or deleted."""
+    project_names.pop(project_id)
+
+
+# Critical path analyses keyed on (project ID, project version). Task and
+# link writes bump the version, so stale entries are never served and simply
+# age out of the cache
+critical_paths = TTLCache(
+    max_size=int(os.getenv("critical_path_cache_max_size", "100")),
+    ttl_seconds=float(os.getenv("critical_path_cache_ttl_seconds", "3600")),
+)
+
+
+async def get_critical_path(project_id: str) -> dict:
+    """Return the critical path analysis of a project's current schedule.
+
+    Args:
+        project_id (str): The ID of the project.
+
+    Returns:
+        dict: The result of ``critical_path`` with the project ``version`` it was computed for.
+
+    Raises:
+        ScheduleCycleError: If the project's links contain a cycle.
+    """
+    version = await get_project_version(project_id)
+    cached = critical_paths.get((project_id, version))
+    if cached is not None:
+        return cached
+
+    tasks = await tasks_collection.find(
+        {"project_id": project_id, "start": {"$type": "date"}, "end": {"$type": "date"}},
+        {"_id": 1, "text": 1, "start": 1, "end": 1}
+    ).to_list(length=None)
+    links = await link_store.get_links(project_id)
+
+    result = {"version": version, **critical_path(tasks, links)}
+    critical_paths.set((project_id, version), result)
+    return result
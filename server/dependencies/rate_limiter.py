@@ -1,71 +1,260 @@
 from fastapi import HTTPException, status
-from fastapi.responses import JSONResponse
+import os
+import math
 import time
-from typing import Dict, Tuple
+import traceback
 import asyncio
-from datetime import datetime, timedelta
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, NamedTuple
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+from server.configs.db import rate_limits_collection
 
-# In-memory storage for rate limiting
-# In production, you should use Redis or another distributed cache
-rate_limit_store: Dict[str, Tuple[int, float]] = {}
 
-async def rate_limit(key: str, max_requests: int = 5, window_seconds: int = 60) -> bool:
+class RateLimitResult(NamedTuple):
+    """Outcome of a rate limit check.
+
+    Attributes:
+        allowed (bool): Whether the request may proceed.
+        limit (int): Maximum number of requests in the window.
+        remaining (int): Requests left in the current window.
+        reset_at (float): Unix timestamp at which the current window ends.
+    """
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_at: float
+
+
+def sliding_window_estimate(previous_count: int, current_count: int, window_start: float,
+                            window_seconds: int, now: float) -> float:
+    """Estimate the requests made in the last ``window_seconds``.
+
+    The previous fixed window is weighted by how much of it still overlaps the
+    sliding window, which smooths the burst allowed at window boundaries.
+    """
+    overlap = max(0.0, 1 - (now - window_start) / window_seconds)
+    return previous_count * overlap + current_count
+
+
+class RateLimiterBackend(ABC):
+    """Interface of the rate limiter storage backends."""
+
+    name = "base"
+
+    @abstractmethod
+    async def hit(self, key: str, max_requests: int, window_seconds: int) -> RateLimitResult:
+        """Count a request for ``key`` and tell whether it is allowed."""
+
+
+class InMemoryRateLimiter(RateLimiterBackend):
+    """Per-process sliding window counters with bounded, expiring storage.
+
+    Each key keeps the counts of the current and previous fixed windows.
+    Keys unused for two windows are pruned, and the least recently used keys
+    are evicted once ``max_keys`` is reached, so memory stays bounded however
+    many distinct clients are seen.
+
+    Args:
+        max_keys (int): Maximum number of tracked keys.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        # key -> (window index, current count, previous count, window seconds)
+        self._store: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _prune(self, now: float):
+        # Entries are kept in last-use order, so expired ones sit at the front
+        while self._store:
+            key, (window_index, _, _, window_seconds) = next(iter(self._store.items()))
+            if (window_index + 2) * window_seconds > now:
+                break
+            del self._store[key]
+        while len(self._store) > self.max_keys:
+            self._store.popitem(last=False)
+
+    async def hit(self, key, max_requests, window_seconds):
+        now = time.time()
+        window_index = int(now // window_seconds)
+        stored_index, current_count, previous_count, _ = self._store.get(
+            key, (window_index, 0, 0, window_seconds))
+
+        # Roll the counters forward to the current window
+        if stored_index == window_index - 1:
+            previous_count, current_count = current_count, 0
+        elif stored_index != window_index:
+            previous_count, current_count = 0, 0
+
+        window_start = window_index * window_seconds
+        estimate = sliding_window_estimate(
+            previous_count, current_count, window_start, window_seconds, now)
+        allowed = estimate < max_requests
+        if allowed:
+            current_count += 1
+            estimate += 1
+
+        self._store[key] = (window_index, current_count, previous_count, window_seconds)
+        self._store.move_to_end(key)
+        self._prune(now)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=max_requests,
+            remaining=max(0, math.floor(max_requests - estimate)),
+            reset_at=window_start + window_seconds,
+        )
+
+    def __len__(self):
+        return len(self._store)
+
+
+class MongoRateLimiter(RateLimiterBackend):
+    """Sliding window counters shared by every worker through MongoDB.
+
+    Every fixed window of a key is one document incremented atomically with
+    ``$inc``. Its ``expires_at`` field is TTL-indexed, so old windows are
+    removed by the server. Rejected requests are counted too, so clients
+    that keep retrying stay limited.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection=rate_limits_collection):
+        self.collection = collection
+
+    async def hit(self, key, max_requests, window_seconds):
+        now = time.time()
+        window_index = int(now // window_seconds)
+        expires_at = datetime.fromtimestamp(
+            (window_index + 2) * window_seconds, timezone.utc)
+
+        current, previous = await asyncio.gather(
+            self.collection.find_one_and_update(
+                {"_id": f"{key}:{window_index}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            ),
+            self.collection.find_one({"_id": f"{key}:{window_index - 1}"}),
+        )
+
+        window_start = window_index * window_seconds
+        estimate = sliding_window_estimate(
+            previous["count"] if previous else 0, current["count"],
+            window_start, window_seconds, now)
+
+        return RateLimitResult(
+            allowed=estimate <= max_requests,
+            limit=max_requests,
+            remaining=max(0, math.floor(max_requests - estimate)),
+            reset_at=window_start + window_seconds,
+        )
+
+
+class RateLimiterMetrics:
+    """Latency and rejection counters of the rate limiter."""
+
+    def __init__(self):
+        self.checks = 0
+        self.rejections = 0
+        self.errors = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def record(self, elapsed_ms: float, allowed: bool):
+        self.checks += 1
+        self.total_latency_ms += elapsed_ms
+        self.max_latency_ms = max(self.max_latency_ms, elapsed_ms)
+        if not allowed:
+            self.rejections += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "checks": self.checks,
+            "rejections": self.rejections,
+            "errors": self.errors,
+            "avg_latency_ms": self.total_latency_ms / self.checks if self.checks else 0.0,
+            "max_latency_ms": self.max_latency_ms,
+        }
+
+
+def create_rate_limiter(backend: str = None) -> RateLimiterBackend:
+    """Create the backend selected by the ``rate_limit_backend`` setting.
+
+    Args:
+        backend (str, optional): ``memory`` (default, per process) or ``mongo`` (shared).
+
+    Returns:
+        RateLimiterBackend: The rate limiter backend.
+    """
+    backend = (backend or os.getenv("rate_limit_backend", "memory")).lower()
+    if backend == "mongo":
+        return MongoRateLimiter()
+    if backend == "memory":
+        return InMemoryRateLimiter(
+            max_keys=int(os.getenv("rate_limit_max_keys", "10000")))
+    raise ValueError(f"Unknown rate_limit_backend: {backend}")
+
+
+rate_limiter = create_rate_limiter()
+# Used when the shared backend is unavailable, so limits still apply per process
+fallback_rate_limiter = InMemoryRateLimiter(
+    max_keys=int(os.getenv("rate_limit_max_keys", "10000")))
+rate_limiter_metrics = RateLimiterMetrics()
+
+
+async def rate_limit(key: str, max_requests: int = 5, window_seconds: int = 60) -> RateLimitResult:
     """
     Rate limit requests based on a key.
-    
+
     Args:
         key: The key to rate limit (e.g., IP address or user identifier)
         max_requests: Maximum number of requests allowed in the time window
         window_seconds: Time window in seconds
-        
+
     Returns:
-        bool: True if request is allowed, False if rate limited
+        RateLimitResult: Whether the request is allowed and the remaining quota
     """
-    current_time = time.time()
-    
-    # Get the current count and window start time for this key
-    count, window_start = rate_limit_store.get(key, (0, current_time))
-    
-    # If the window has expired, reset the counter
-    if current_time - window_start > window_seconds:
-        count = 0
-        window_start = current_time
-    
-    # If we've hit the rate limit, return False
-    if count >= max_requests:
-        return False
-    
-    # Increment the counter and update the store
-    count += 1
-    rate_limit_store[key] = (count, window_start)
-    
-    return True
-
-def get_rate_limit_headers(key: str, max_requests: int = 5, window_seconds: int = 60) -> Dict[str, str]:
+    started = time.perf_counter()
+    try:
+        result = await rate_limiter.hit(key, max_requests, window_seconds)
+    except Exception:
+        traceback.print_exc()
+        rate_limiter_metrics.errors += 1
+        result = await fallback_rate_limiter.hit(key, max_requests, window_seconds)
+
+    rate_limiter_metrics.record(
+        (time.perf_counter() - started) * 1000, result.allowed)
+    return result
+
+
+def get_rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
     """
     Get rate limit headers for the response.
-    
+
     Args:
-        key: The key being rate limited
-        max_requests: Maximum number of requests allowed
-        window_seconds: Time window in seconds
-        
+        result: The outcome of the rate limit check
+
     Returns:
         Dict[str, str]: Headers to include in the response
     """
-    count, window_start = rate_limit_store.get(key, (0, time.time()))
-    reset_time = datetime.fromtimestamp(window_start + window_seconds)
-    
+    reset_time = datetime.fromtimestamp(result.reset_at)
+
     return {
-        "X-RateLimit-Limit": str(max_requests),
-        "X-RateLimit-Remaining": str(max(0, max_requests - count)),
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
         "X-RateLimit-Reset": reset_time.isoformat()
     }
 
+
 async def check_rate_limit(request, key_prefix: str = "default"):
     """
     Check rate limit for a request and raise an exception if exceeded.
-    
+
     Args:
         request: The FastAPI request object
         key_prefix: Prefix for the rate limit key
@@ -73,11 +262,11 @@ async def check_rate_limit(request, key_prefix: str = "default"):
     # Use IP address as the key for rate limiting
     client_ip = request.client.host
     key = f"{key_prefix}:{client_ip}"
-    
-    if not await rate_limit(key):
-        headers = get_rate_limit_headers(key)
+
+    result = await rate_limit(key)
+    if not result.allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many requests. Please try again later.",
-            headers=headers
-        ) 
\ No newline at end of file
+            headers=get_rate_limit_headers(result)
+        )
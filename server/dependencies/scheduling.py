@@ -0,0 +1,266 @@
+from collections import deque
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+# Link types as sent by the Gantt chart ("0".."3") and their common aliases
+LINK_TYPES = {
+    "0": "FS", "fs": "FS", "e2s": "FS", "finish_to_start": "FS",
+    "1": "SS", "ss": "SS", "s2s": "SS", "start_to_start": "SS",
+    "2": "FF", "ff": "FF", "e2e": "FF", "finish_to_finish": "FF",
+    "3": "SF", "sf": "SF", "s2e": "SF", "start_to_finish": "SF",
+}
+
+
+class ScheduleCycleError(ValueError):
+    """Raised when the task links contain a cycle."""
+
+    def __init__(self, task_ids: List[str]):
+        super().__init__("Task links contain a cycle")
+        self.task_ids = task_ids
+
+
+def link_type(value) -> str:
+    """Normalize a link type to FS, SS, FF or SF (FS when unknown)."""
+    return LINK_TYPES.get(str(value).strip().lower(), "FS")
+
+
+def task_days(task: dict) -> Tuple[date, int]:
+    """Return the first day and the duration in days of a task.
+
+    Tasks end at the end of their last day, so a task starting and ending on
+    the same date lasts one day.
+    """
+    start = task["start"].date()
+    end = task["end"].date()
+    return start, max(1, (end - start).days + 1)
+
+
+class TaskGraph:
+    """Adjacency lists of a project's tasks and links, in topological order.
+
+    Links whose source or target is not a task of the project are skipped
+    and counted in ``ignored_links``.
+
+    Args:
+        tasks (List[dict]): Tasks with ``_id``, ``start`` and ``end``.
+        links (List[dict]): Links with ``id``, ``source``, ``target`` and ``type``.
+
+    Raises:
+        ScheduleCycleError: If the links contain a cycle.
+    """
+
+    def __init__(self, tasks: List[dict], links: List[dict]):
+        self.tasks: Dict[str, dict] = {str(task["_id"]): task for task in tasks}
+        # task ID -> [(other task ID, link type, link ID)]
+        self.successors: Dict[str, List[tuple]] = {task_id: [] for task_id in self.tasks}
+        self.predecessors: Dict[str, List[tuple]] = {task_id: [] for task_id in self.tasks}
+        self.ignored_links = 0
+
+        for link in links:
+            source, target = str(link["source"]), str(link["target"])
+            if source not in self.tasks or target not in self.tasks or source == target:
+                self.ignored_links += 1
+                continue
+            kind = link_type(link.get("type"))
+            self.successors[source].append((target, kind, link.get("id")))
+            self.predecessors[target].append((source, kind, link.get("id")))
+
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        # Kahn's algorithm, starting from the tasks without predecessors
+        in_degree = {task_id: len(preds) for task_id, preds in self.predecessors.items()}
+        ready = deque(task_id for task_id, degree in in_degree.items() if degree == 0)
+        order = []
+        while ready:
+            task_id = ready.popleft()
+            order.append(task_id)
+            for successor, _, _ in self.successors[task_id]:
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    ready.append(successor)
+
+        if len(order) != len(self.tasks):
+            raise ScheduleCycleError(
+                [task_id for task_id, degree in in_degree.items() if degree > 0])
+        return order
+
+
+def critical_path(tasks: List[dict], links: List[dict]) -> dict:
+    """Run the critical path method over a project's tasks and links.
+
+    Tasks cannot start before their planned start. The forward pass pushes
+    each task after its predecessors according to the link type (FS, SS, FF
+    or SF), the backward pass pulls the latest dates back from the project
+    finish. Both passes visit every task and link once.
+
+    Args:
+        tasks (List[dict]): Tasks with ``_id``, ``start`` and ``end``.
+        links (List[dict]): Links with ``id``, ``source``, ``target`` and ``type``.
+
+    Returns:
+        dict: The project start and finish, the schedule of every task
+        (early/late start and finish, slack in days), the critical path in
+        topological order and the critical link IDs.
+
+    Raises:
+        ScheduleCycleError: If the links contain a cycle.
+    """
+    graph = TaskGraph(tasks, links)
+    if not graph.tasks:
+        return {"project_start": None, "project_finish": None, "duration_days": 0,
+                "tasks": [], "critical_path": [], "critical_links": [], "ignored_links": 0}
+
+    # Day offsets are counted from the earliest planned start
+    planned = {task_id: task_days(task) for task_id, task in graph.tasks.items()}
+    origin = min(start for start, _ in planned.values())
+    duration = {task_id: days for task_id, (_, days) in planned.items()}
+
+    # Forward pass: early start (ES) and early finish (EF, exclusive)
+    early_start: Dict[str, int] = {}
+    for task_id in graph.order:
+        es = (planned[task_id][0] - origin).days
+        dur = duration[task_id]
+        for pred, kind, _ in graph.predecessors[task_id]:
+            if kind == "FS":
+                es = max(es, early_start[pred] + duration[pred])
+            elif kind == "SS":
+                es = max(es, early_start[pred])
+            elif kind == "FF":
+                es = max(es, early_start[pred] + duration[pred] - dur)
+            else:  # SF
+                es = max(es, early_start[pred] - dur)
+        early_start[task_id] = es
+
+    finish = max(early_start[task_id] + duration[task_id] for task_id in graph.order)
+
+    # Backward pass: late finish (LF, exclusive) bounded by the project finish
+    late_finish: Dict[str, int] = {}
+    for task_id in reversed(graph.order):
+        lf = finish
+        dur = duration[task_id]
+        for succ, kind, _ in graph.successors[task_id]:
+            succ_ls = late_finish[succ] - duration[succ]
+            if kind == "FS":
+                lf = min(lf, succ_ls)
+            elif kind == "SS":
+                lf = min(lf, succ_ls + dur)
+            elif kind == "FF":
+                lf = min(lf, late_finish[succ])
+            else:  # SF
+                lf = min(lf, late_finish[succ] + dur)
+        late_finish[task_id] = lf
+
+    def day(offset: int) -> str:
+        return (origin + timedelta(days=offset)).isoformat()
+
+    schedule = []
+    critical = set()
+    for task_id in graph.order:
+        es = early_start[task_id]
+        lf = late_finish[task_id]
+        dur = duration[task_id]
+        slack = lf - dur - es
+        if slack <= 0:
+            critical.add(task_id)
+        schedule.append({
+            "id": task_id,
+            "text": graph.tasks[task_id].get("text"),
+            "duration_days": dur,
+            "early_start": day(es),
+            "early_finish": day(es + dur - 1),
+            "late_start": day(lf - dur),
+            "late_finish": day(lf - 1),
+            "slack_days": slack,
+            "critical": slack <= 0,
+        })
+
+    # A link is critical when it joins two critical tasks and leaves no gap
+    critical_links = []
+    for task_id in graph.order:
+        if task_id not in critical:
+            continue
+        for succ, kind, link_id in graph.successors[task_id]:
+            if succ not in critical:
+                continue
+            if _gap(kind, early_start[task_id], duration[task_id],
+                    early_start[succ], duration[succ]) == 0:
+                critical_links.append(link_id)
+
+    return {
+        "project_start": day(0),
+        "project_finish": day(finish - 1),
+        "duration_days": finish,
+        "tasks": schedule,
+        "critical_path": [task_id for task_id in graph.order if task_id in critical],
+        "critical_links": critical_links,
+        "ignored_links": graph.ignored_links,
+    }
+
+
+def _gap(kind: str, pred_es: int, pred_dur: int, succ_es: int, succ_dur: int) -> int:
+    """Days between a link's constraint and the successor's early dates."""
+    if kind == "FS":
+        return succ_es - (pred_es + pred_dur)
+    if kind == "SS":
+        return succ_es - pred_es
+    if kind == "FF":
+        return (succ_es + succ_dur) - (pred_es + pred_dur)
+    return (succ_es + succ_dur) - pred_es
+
+
+def propagate_dates(tasks: List[dict], links: List[dict],
+                    moved: Dict[str, Tuple[date, int]]) -> Dict[str, Tuple[date, int]]:
+    """Shift the successors of moved tasks so every link is satisfied again.
+
+    Only tasks reachable from the moved tasks are visited, in topological
+    order, so each affected task and link is looked at once. Successors are
+    pushed later when a link requires it and never pulled earlier, keeping
+    slack the user left on purpose.
+
+    Args:
+        tasks (List[dict]): The project's tasks with ``_id``, ``start`` and ``end``.
+        links (List[dict]): The project's links.
+        moved (dict): The new first day and duration of the tasks that moved.
+
+    Returns:
+        dict: The new first day and duration of every task that has to shift,
+        excluding the moved tasks themselves.
+
+    Raises:
+        ScheduleCycleError: If the links contain a cycle.
+    """
+    graph = TaskGraph(tasks, links)
+    days = {task_id: task_days(task) for task_id, task in graph.tasks.items()}
+    days.update(moved)
+
+    # Tasks downstream of a moved task
+    affected = set()
+    pending = [task_id for task_id in moved if task_id in graph.tasks]
+    while pending:
+        for succ, _, _ in graph.successors[pending.pop()]:
+            if succ not in affected and succ not in moved:
+                affected.add(succ)
+                pending.append(succ)
+
+    shifted = {}
+    for task_id in graph.order:
+        if task_id not in affected:
+            continue
+        start, dur = days[task_id]
+        earliest = start
+        for pred, kind, _ in graph.predecessors[task_id]:
+            pred_start, pred_dur = days[pred]
+            if kind == "FS":
+                bound = pred_start + timedelta(days=pred_dur)
+            elif kind == "SS":
+                bound = pred_start
+            elif kind == "FF":
+                bound = pred_start + timedelta(days=pred_dur - dur)
+            else:  # SF
+                bound = pred_start - timedelta(days=dur)
+            earliest = max(earliest, bound)
+        if earliest != start:
+            days[task_id] = shifted[task_id] = (earliest, dur)
+
+    return shifted
@@ -1,33 +1,26 @@
 import os
 import traceback
 from fastapi import HTTPException, status
-from fastapi_mail import FastMail, MessageSchema
-from server.constants.auth import conf
-from jinja2 import Template
-import smtplib
+from server.dependencies.smtp_pool import smtp_pool, build_message, aiosmtplib
+from server.dependencies.templates import render_template
 from datetime import datetime
 
 
 async def send_email(recipient_email, subject, body, body_type):
-    """Send an email to the recipient.
+    """Send an email to the recipient over a pooled SMTP connection.
 
     Args:
-        recipient_email (str): The email address of the recipient.
+        recipient_email (list): The email addresses of the recipients.
         subject (str): The subject of the email.
+        body (str): The body of the email.
+        body_type (str): The body subtype, e.g. ``html``.
     """
 
     try:
-        fm = FastMail(conf)
-        await fm.send_message(
-            MessageSchema(
-                subject=subject,
-                recipients=recipient_email,
-                body=body,
-                subtype=body_type,
-            )
-        )
+        await smtp_pool.send_message(
+            build_message(recipient_email, subject, body, body_type))
 
-    except (smtplib.SMTPException, smtplib.SMTPRecipientsRefused) as e:
+    except aiosmtplib.SMTPException as e:
         # Handle email-related exceptions
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -48,16 +41,8 @@ async def send_invitation_email(recipient_email, setup_link, link_expiration):
         setup_link (str): The link to set up the account password.
     """
     try:
-        # Get the current working directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Construct the path to the email template file
-        template_path = os.path.join(
-            current_dir, "../templates/invitation_email.html")
-
-        with open(template_path, "r", encoding="utf-8") as file:
-            template = Template(file.read())
-
-        body = template.render(
+        body = render_template(
+            "invitation_email.html",
             setup_link=setup_link, link_expiration_format=link_expiration["format"], link_expiration_value=link_expiration['value'])
         subject = "アカウント作成のご案内"
         await send_email([recipient_email], subject, body, "html")
@@ -77,15 +62,6 @@ async def send_task_creation_email(recipient_email, task_data):
         task_data (dict): The task data containing task details.
     """
     try:
-        # Get the current working directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Construct the path to the email template file
-        template_path = os.path.join(
-            current_dir, "../templates/task_creation_email.html")
-
-        with open(template_path, "r", encoding="utf-8") as file:
-            template = Template(file.read())
-
         # Format dates for display
         start_date = task_data["start"].strftime(
             "%Y-%m-%d") if isinstance(task_data["start"], datetime) else task_data["start"]
@@ -93,7 +69,8 @@ async def send_task_creation_email(recipient_email, task_data):
             "%Y-%m-%d") if isinstance(task_data["end"], datetime) else task_data["end"]
 
         # Render the template with task data
-        body = template.render(
+        body = render_template(
+            "task_creation_email.html",
             task_name=task_data["text"],
             task_description=task_data["task_description"],
             start_date=start_date,
@@ -124,15 +101,6 @@ async def send_assignee_change_email(recipient_email, task_data, old_assignee, n
         new_assignee (str): The new assignee's email.
     """
     try:
-        # Get the current working directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Construct the path to the email template file
-        template_path = os.path.join(
-            current_dir, "../templates/assignee_change_email.html")
-
-        with open(template_path, "r", encoding="utf-8") as file:
-            template = Template(file.read())
-
         # Format dates for display
         start_date = task_data["start"].strftime(
             "%Y-%m-%d") if isinstance(task_data["start"], datetime) else task_data["start"]
@@ -140,7 +108,8 @@ async def send_assignee_change_email(recipient_email, task_data, old_assignee, n
             "%Y-%m-%d") if isinstance(task_data["end"], datetime) else task_data["end"]
 
         # Render the template with task data
-        body = template.render(
+        body = render_template(
+            "assignee_change_email.html",
             task_name=task_data["text"],
             task_description=task_data["task_description"],
             start_date=start_date,
@@ -170,15 +139,6 @@ async def send_task_start_email(recipient_email, task_data):
         task_data (dict): The task data containing task details.
     """
     try:
-        # Get the current working directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Construct the path to the email template file
-        template_path = os.path.join(
-            current_dir, "../templates/task_start_email.html")
-
-        with open(template_path, "r", encoding="utf-8") as file:
-            template = Template(file.read())
-
         # Format dates for display
         start_date = task_data["start"].strftime(
             "%Y-%m-%d") if isinstance(task_data["start"], datetime) else task_data["start"]
@@ -186,7 +146,8 @@ async def send_task_start_email(recipient_email, task_data):
             "%Y-%m-%d") if isinstance(task_data["end"], datetime) else task_data["end"]
 
         # Render the template with task data
-        body = template.render(
+        body = render_template(
+            "task_start_email.html",
             task_name=task_data["text"],
             task_description=task_data["task_description"],
             start_date=start_date,
@@ -215,15 +176,6 @@ async def send_task_completion_email(recipient_email, task_data, is_next_task=Fa
         is_next_task (bool): Whether this is a notification for the next task.
     """
     try:
-        # Get the current working directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Construct the path to the email template file
-        template_path = os.path.join(
-            current_dir, "../templates/task_completion_email.html")
-
-        with open(template_path, "r", encoding="utf-8") as file:
-            template = Template(file.read())
-
         # Format dates for display
         start_date = task_data["start"].strftime(
             "%Y-%m-%d") if isinstance(task_data["start"], datetime) else task_data["start"]
@@ -231,7 +183,8 @@ async def send_task_completion_email(recipient_email, task_data, is_next_task=Fa
             "%Y-%m-%d") if isinstance(task_data["end"], datetime) else task_data["end"]
 
         # Render the template with task data
-        body = template.render(
+        body = render_template(
+            "task_completion_email.html",
             task_name=task_data["text"],
             task_description=task_data["task_description"],
             start_date=start_date,
@@ -250,3 +203,87 @@ async def send_task_completion_email(recipient_email, task_data, is_next_task=Fa
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         ) from e
+
+
+async def send_task_digest_email(recipient_email, project_name, tasks, task_count=None):
+    """Send one notification listing every task assigned to the recipient by a bulk import.
+
+    Args:
+        recipient_email (str): The email address of the recipient.
+        project_name (str): The name of the project the tasks were created in.
+        tasks (list): The task data of the tasks to list.
+        task_count (int, optional): The number of created tasks, when more
+            were created than are listed.
+    """
+    try:
+        # Format dates for display
+        task_rows = [{
+            "task_name": task["text"],
+            "start_date": task["start"].strftime(
+                "%Y-%m-%d") if isinstance(task["start"], datetime) else task["start"],
+            "end_date": task["end"].strftime(
+                "%Y-%m-%d") if isinstance(task["end"], datetime) else task["end"],
+        } for task in tasks]
+
+        body = render_template(
+            "task_digest_email.html",
+            project_name=project_name,
+            tasks=task_rows,
+            task_count=task_count or len(task_rows),
+            task_link=os.getenv("FRONTEND_URL")
+        )
+
+        subject = f"新規タスク一括作成のお知らせ（{task_count or len(task_rows)}件）"
+        await send_email([recipient_email], subject, body, "html")
+
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        ) from e
+
+
+def describe_task_update(kind, args):
+    """Describe a coalesced notification in a digest email."""
+    if kind == "task_start":
+        return "タスク開始"
+    if kind == "task_completion":
+        return "前のタスクが完了" if args and args[0] else "タスク完了"
+    if kind == "assignee_change":
+        return f"担当者変更（{args[0]} → {args[1]}）"
+    return kind
+
+
+async def send_task_update_digest_email(recipient_email, notifications):
+    """Send one email listing several task notifications for the recipient.
+
+    Args:
+        recipient_email (str): The email address of the recipient.
+        notifications (list): The notifications, each with the ``kind`` of
+            the email it replaces, the ``task`` data and the sender ``args``.
+    """
+    try:
+        # Format dates for display
+        updates = [{
+            "event": describe_task_update(notification["kind"], notification["args"]),
+            "task_name": notification["task"]["text"],
+            "start_date": notification["task"]["start"].strftime(
+                "%Y-%m-%d") if isinstance(notification["task"]["start"], datetime) else notification["task"]["start"],
+            "end_date": notification["task"]["end"].strftime(
+                "%Y-%m-%d") if isinstance(notification["task"]["end"], datetime) else notification["task"]["end"],
+        } for notification in notifications]
+
+        body = render_template(
+            "task_update_digest_email.html",
+            updates=updates,
+            task_link=os.getenv("FRONTEND_URL")
+        )
+
+        subject = f"タスク更新のお知らせ（{len(updates)}件）"
+        await send_email([recipient_email], subject, body, "html")
+
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        ) from e
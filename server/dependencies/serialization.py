@@ -0,0 +1,47 @@
+from decimal import Decimal
+from typing import Any
+import orjson
+from bson import ObjectId, Decimal128
+from fastapi.responses import JSONResponse
+
+# Dict keys may be non-strings (e.g. ints in aggregation results)
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    """Encode the BSON and Python types orjson does not handle natively."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize Mongo documents to JSON.
+
+    ``datetime``, ``date`` and ``UUID`` values are encoded natively as ISO
+    8601 strings, so documents can be returned as read from the database.
+
+    Args:
+        content (Any): The content to serialize.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON.
+    """
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSON response rendering Mongo documents with ``dumps``.
+
+    Returning it from a handler also skips FastAPI's ``jsonable_encoder``
+    pass over the content.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
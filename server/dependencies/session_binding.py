@@ -0,0 +1,134 @@
+import os
+import hmac
+import base64
+import hashlib
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from server.configs.settings import load_settings
+
+# Version tag of the session binding format, bumped if the scheme ever changes
+SESSION_BINDING_VERSION = "hs1"
+
+SESSION_COOKIE_MAX_AGE = 7776000  # 90 days
+
+
+def load_binding_keys() -> Tuple[str, Dict[str, bytes]]:
+    """Load the session binding keys.
+
+    ``session_binding_keys`` holds comma separated ``<key id>:<secret>``
+    pairs. The first key signs new cookies and every listed key is accepted,
+    so a key can be rotated by prepending the new one and dropping the old
+    one once its cookies were re-issued. Without the setting, a key is
+    derived from ``csrf_token_secrete_key``.
+
+    Returns:
+        tuple: The current key ID and a mapping of key ID to key.
+
+    Raises:
+        RuntimeError: If neither setting is configured.
+    """
+    load_settings()
+    keys = {}
+    current = None
+    for entry in os.getenv("session_binding_keys", "").split(","):
+        if ":" not in entry:
+            continue
+        key_id, secret = entry.strip().split(":", 1)
+        keys[key_id] = secret.encode("utf-8")
+        current = current or key_id
+
+    if not keys:
+        secret = os.getenv("csrf_token_secrete_key")
+        if not secret:
+            # A key derived from an empty secret could be computed by anyone
+            raise RuntimeError(
+                "Set session_binding_keys or csrf_token_secrete_key to sign session cookies")
+        secret = secret.encode("utf-8")
+        current = "k0"
+        keys[current] = hmac.new(secret, b"session-binding", hashlib.sha256).digest()
+
+    return current, keys
+
+
+_binding_keys: Optional[Tuple[str, Dict[str, bytes]]] = None
+
+
+def binding_keys() -> Tuple[str, Dict[str, bytes]]:
+    """Return the session binding keys, loading them on first use. See ``load_binding_keys``."""
+    global _binding_keys
+    if _binding_keys is None:
+        _binding_keys = load_binding_keys()
+    return _binding_keys
+
+
+def _sign(key: bytes, session_id_token: str) -> str:
+    digest = hmac.new(key, session_id_token.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def create_session_binding(session_id_token: str) -> str:
+    """Bind a session token (email + session ID) to a cookie value.
+
+    Returns:
+        str: ``hs1.<key id>.<HMAC-SHA256>`` signed with the current key.
+    """
+    current_key_id, keys = binding_keys()
+    mac = _sign(keys[current_key_id], session_id_token)
+    return f"{SESSION_BINDING_VERSION}.{current_key_id}.{mac}"
+
+
+def is_legacy_binding(session_cookie: str) -> bool:
+    """Whether the cookie holds a bcrypt hash from before the HMAC scheme."""
+    return session_cookie.startswith("$2")
+
+
+def verify_session_binding(session_id_token: str, session_cookie: str) -> bool:
+    """Check an HMAC session binding in constant time.
+
+    Returns:
+        bool: True if the cookie was signed for this session token by a known key.
+    """
+    parts = session_cookie.split(".")
+    if len(parts) != 3 or parts[0] != SESSION_BINDING_VERSION:
+        return False
+    key = binding_keys()[1].get(parts[1])
+    if key is None:
+        return False
+    return hmac.compare_digest(_sign(key, session_id_token), parts[2])
+
+
+def needs_reissue(session_cookie: str) -> bool:
+    """Whether the cookie should be replaced by one in the current format and key."""
+    if is_legacy_binding(session_cookie):
+        return True
+    current_key_id, _ = binding_keys()
+    return not session_cookie.startswith(f"{SESSION_BINDING_VERSION}.{current_key_id}.")
+
+
+def flag_session_reissue(request: Request, session_id_token: str, session_cookie: str):
+    """Ask ``reissue_session_cookie`` to replace an outdated session cookie."""
+    if needs_reissue(session_cookie):
+        request.state.reissued_session_cookie = create_session_binding(session_id_token)
+
+
+def set_session_cookie(response, value: str):
+    """Set the sessionID cookie on a response."""
+    response.set_cookie(
+        key="sessionID",
+        value=value,
+        max_age=SESSION_COOKIE_MAX_AGE,
+        httponly=True,
+        samesite="Strict",
+        secure=True,
+        domain=".cosbe.inc",
+        path="/"
+    )
+
+
+async def reissue_session_cookie(request: Request, call_next):
+    """HTTP middleware sending the re-issued session cookie of a verified request."""
+    response = await call_next(request)
+    reissued: Optional[str] = getattr(request.state, "reissued_session_cookie", None)
+    if reissued and response.status_code < 400:
+        set_session_cookie(response, reissued)
+    return response
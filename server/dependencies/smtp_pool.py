@@ -0,0 +1,226 @@
+import os
+import time
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
+from server.constants.auth import get_mail_config
+from server.dependencies.lazy_imports import lazy_import
+
+# Loaded on first use to keep it off the cold start path
+aiosmtplib = lazy_import("aiosmtplib")
+
+
+def connection_errors() -> tuple:
+    """Errors after which a connection is dropped and the send retried on a new one."""
+    return (
+        aiosmtplib.SMTPServerDisconnected,
+        aiosmtplib.SMTPConnectError,
+        aiosmtplib.SMTPTimeoutError,
+        ConnectionError,
+        OSError,
+    )
+
+
+class _PinnedConnection:
+    """The connection shared by every send inside ``SMTPConnectionPool.session``."""
+
+    def __init__(self, client: "aiosmtplib.SMTP"):
+        self.client = client
+
+
+_pinned_connection: contextvars.ContextVar[Optional[_PinnedConnection]] = \
+    contextvars.ContextVar("smtp_pinned_connection", default=None)
+
+
+class SMTPConnectionPool:
+    """A pool of authenticated keep-alive SMTP connections.
+
+    Connections are opened lazily up to ``size``, reused LIFO and health
+    checked with ``NOOP`` when they have been idle for a while. Connections
+    that failed or sat idle too long are closed and replaced. Sends that fail
+    on a broken connection are retried once on a fresh connection.
+
+    Args:
+        size (int): Maximum number of open connections.
+        health_check_seconds (float): Idle time after which a connection is checked before reuse.
+        max_idle_seconds (float): Idle time after which a connection is closed instead of reused.
+    """
+
+    def __init__(self, size: int = 2, health_check_seconds: float = 10, max_idle_seconds: float = 60):
+        self.size = size
+        self.health_check_seconds = health_check_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: List[Tuple["aiosmtplib.SMTP", float]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.connects = 0
+        self.reconnects = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        return self._semaphore
+
+    async def _connect(self) -> "aiosmtplib.SMTP":
+        conf = get_mail_config()
+        client = aiosmtplib.SMTP(
+            hostname=conf.MAIL_SERVER,
+            port=conf.MAIL_PORT,
+            use_tls=conf.MAIL_SSL_TLS,
+            start_tls=conf.MAIL_STARTTLS,
+            validate_certs=conf.VALIDATE_CERTS,
+            timeout=conf.TIMEOUT,
+        )
+        await client.connect()
+        if conf.USE_CREDENTIALS:
+            await client.login(conf.MAIL_USERNAME, conf.MAIL_PASSWORD.get_secret_value())
+        self.connects += 1
+        return client
+
+    @staticmethod
+    async def _close(client: "aiosmtplib.SMTP"):
+        try:
+            if client.is_connected:
+                await client.quit()
+        except Exception:
+            client.close()
+
+    async def _healthy(self, client: "aiosmtplib.SMTP", idle_for: float) -> bool:
+        if not client.is_connected or idle_for > self.max_idle_seconds:
+            return False
+        if idle_for > self.health_check_seconds:
+            try:
+                await client.noop()
+            except Exception:
+                return False
+        return True
+
+    async def acquire(self) -> "aiosmtplib.SMTP":
+        """Take a healthy connection from the pool, opening one if needed."""
+        await self._get_semaphore().acquire()
+        try:
+            while self._idle:
+                client, last_used = self._idle.pop()
+                if await self._healthy(client, time.monotonic() - last_used):
+                    return client
+                await self._close(client)
+            return await self._connect()
+        except BaseException:
+            self._get_semaphore().release()
+            raise
+
+    async def release(self, client: "aiosmtplib.SMTP", healthy: bool = True):
+        """Return a connection to the pool, or close it if it is broken."""
+        try:
+            if healthy and client.is_connected:
+                self._idle.append((client, time.monotonic()))
+            else:
+                await self._close(client)
+        finally:
+            self._get_semaphore().release()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection for the duration of the block."""
+        client = await self.acquire()
+        healthy = True
+        try:
+            yield client
+        except connection_errors():
+            healthy = False
+            raise
+        finally:
+            await self.release(client, healthy)
+
+    @asynccontextmanager
+    async def session(self):
+        """Send every message of the block over one connection.
+
+        Used to batch several recipients' messages, e.g. the notification
+        fan-out when a task with many successors is completed. Nested sessions
+        reuse the outer connection.
+        """
+        if _pinned_connection.get() is not None:
+            yield
+            return
+
+        client = await self.acquire()
+        pinned = _PinnedConnection(client)
+        token = _pinned_connection.set(pinned)
+        healthy = True
+        try:
+            yield
+        except connection_errors():
+            healthy = False
+            raise
+        finally:
+            _pinned_connection.reset(token)
+            # The connection may have been replaced after a failure
+            if pinned.client is not client:
+                await self._close(client)
+            await self.release(pinned.client, healthy)
+
+    async def send_message(self, message: EmailMessage):
+        """Send a message on a pooled (or the session's) connection."""
+        pinned = _pinned_connection.get()
+        if pinned is not None:
+            try:
+                await pinned.client.send_message(message)
+            except connection_errors():
+                self.reconnects += 1
+                await self._close(pinned.client)
+                pinned.client = await self._connect()
+                await pinned.client.send_message(message)
+            return
+
+        try:
+            async with self.connection() as client:
+                await client.send_message(message)
+        except connection_errors():
+            # The pooled connection went stale, retry once on a new one
+            self.reconnects += 1
+            async with self.connection() as client:
+                await client.send_message(message)
+
+    async def close(self):
+        """Close every idle connection."""
+        idle, self._idle = self._idle, []
+        for client, _ in idle:
+            await self._close(client)
+
+    def stats(self) -> dict:
+        """Return the pool counters."""
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+        }
+
+
+def build_message(recipients: List[str], subject: str, body: str, body_type: str) -> EmailMessage:
+    """Build a MIME message from the configured sender.
+
+    Args:
+        recipients (List[str]): The recipient email addresses.
+        subject (str): The subject of the email.
+        body (str): The body of the email.
+        body_type (str): The body subtype, e.g. ``html`` or ``plain``.
+
+    Returns:
+        EmailMessage: The message ready to be sent.
+    """
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = get_mail_config().MAIL_FROM
+    message["To"] = ", ".join(recipients)
+    message.set_content(body, subtype=body_type, charset="utf-8")
+    return message
+
+
+smtp_pool = SMTPConnectionPool(
+    size=int(os.getenv("mail_pool_size", "2")),
+    health_check_seconds=float(os.getenv("mail_pool_health_check_seconds", "10")),
+    max_idle_seconds=float(os.getenv("mail_pool_max_idle_seconds", "60")),
+)
@@ -0,0 +1,143 @@
+import base64
+import asyncio
+import argparse
+from email import message_from_bytes
+from email.policy import default as default_policy
+from typing import List, Optional
+
+
+class LocalSMTPServer:
+    """A minimal in-process SMTP server capturing messages instead of sending them.
+
+    It speaks enough plain-text ESMTP (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT,
+    DATA, RSET, NOOP, QUIT) for fastapi-mail and aiosmtplib clients. Any
+    credentials are accepted. Point the app at it with ``mail_server=127.0.0.1``,
+    ``mail_port=<port>`` and ``mail_ssl_tls=false``.
+
+    Args:
+        host (str): The interface to listen on.
+        port (int): The port to listen on, 0 picks a free port.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.messages: List[dict] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._received = asyncio.Condition()
+
+    async def start(self):
+        """Start listening and resolve the actual port."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Stop listening and close the server."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def wait_for_messages(self, count: int, timeout: float = 5) -> List[dict]:
+        """Wait until at least ``count`` messages were received."""
+        async with self._received:
+            await asyncio.wait_for(
+                self._received.wait_for(lambda: len(self.messages) >= count), timeout)
+        return self.messages
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode("utf-8"))
+            await writer.drain()
+
+        mail_from = None
+        rcpt_tos = []
+        await reply("220 localhost ESMTP stand-in ready")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                command = line.split(" ", 1)[0].upper()
+
+                if command == "EHLO":
+                    writer.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n")
+                    await reply("250 SMTPUTF8")
+                elif command == "HELO":
+                    await reply("250 localhost")
+                elif command == "AUTH":
+                    if line.upper().startswith("AUTH LOGIN"):
+                        # Username and password prompts, both accepted as is
+                        for prompt in ("Username:", "Password:"):
+                            await reply("334 " + base64.b64encode(prompt.encode()).decode())
+                            await reader.readline()
+                    await reply("235 Authentication successful")
+                elif command == "MAIL":
+                    mail_from = line.split(":", 1)[1].strip().strip("<>").split(">")[0]
+                    rcpt_tos = []
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    rcpt_tos.append(line.split(":", 1)[1].strip().strip("<>").split(">")[0])
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        # Undo dot-stuffing
+                        if data_line.startswith(b".."):
+                            data_line = data_line[1:]
+                        lines.append(data_line)
+                    data = b"".join(lines)
+                    async with self._received:
+                        self.messages.append({
+                            "mail_from": mail_from,
+                            "rcpt_tos": rcpt_tos,
+                            "data": data,
+                            "message": message_from_bytes(data, policy=default_policy),
+                        })
+                        self._received.notify_all()
+                    await reply("250 OK: queued")
+                elif command == "RSET":
+                    mail_from, rcpt_tos = None, []
+                    await reply("250 OK")
+                elif command == "NOOP":
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int):
+    server = await LocalSMTPServer(host, port).start()
+    print(f"SMTP stand-in listening on {host}:{server.port}")
+    seen = 0
+    while True:
+        await server.wait_for_messages(seen + 1, timeout=None)
+        for message in server.messages[seen:]:
+            print(f"From {message['mail_from']} to {', '.join(message['rcpt_tos'])}: "
+                  f"{message['message']['Subject']}")
+        seen = len(server.messages)
+
+
+if __name__ == "__main__":
+    # Usage: python -m server.dependencies.smtp_stub [--host 127.0.0.1] [--port 1025]
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    options = parser.parse_args()
+    asyncio.run(serve(options.host, options.port))
@@ -0,0 +1,183 @@
+import os
+import math
+import traceback
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from pymongo.errors import DuplicateKeyError
+from server.configs.db import tasks_collection, summaries_collection
+
+# Fields of a task a summary depends on
+SUMMARY_TASK_FIELDS = {"status": 1, "type": 1, "priority": 1, "progress": 1, "start": 1, "end": 1}
+
+# Rebuild summaries whose overdue count is older than this, since tasks
+# become overdue as time passes without any write
+SUMMARY_OVERDUE_REFRESH_SECONDS = int(os.getenv("summary_overdue_refresh_seconds", "3600"))
+
+DAY_MS = 86400000
+
+
+def summary_key(value) -> str:
+    """Make a status, type or priority usable as a field name."""
+    if value is None or value == "":
+        return "none"
+    return str(value).replace(".", "_").lstrip("$") or "none"
+
+
+def task_weight(task: dict) -> int:
+    """Weight of a task in the project progress: its duration in days."""
+    start, end = task.get("start"), task.get("end")
+    if not isinstance(start, datetime) or not isinstance(end, datetime):
+        return 1
+    return max(1, math.ceil((end - start) / timedelta(days=1)))
+
+
+def is_overdue(task: dict, now: datetime) -> bool:
+    end = task.get("end")
+    return isinstance(end, datetime) and end < now and task.get("status") != "completed"
+
+
+def task_contribution(task: Optional[dict], now: datetime) -> Dict[str, float]:
+    """The counters a single task adds to its project summary."""
+    if not task:
+        return {}
+    weight = task_weight(task)
+    return {
+        "total": 1,
+        f"by_status.{summary_key(task.get('status'))}": 1,
+        f"by_type.{summary_key(task.get('type'))}": 1,
+        f"by_priority.{summary_key(task.get('priority'))}": 1,
+        "progress_weight": weight,
+        "progress_weighted_sum": weight * (task.get("progress") or 0),
+        "overdue": 1 if is_overdue(task, now) else 0,
+    }
+
+
+async def rebuild_summary(project_id: str) -> dict:
+    """Recompute a project summary with a single ``$facet`` aggregation and store it.
+
+    Every delta and stale mark bumps the summary ``revision``. The rebuilt
+    summary only replaces the stored one if its revision did not move while
+    the aggregation ran, so a concurrent ``$inc`` is never overwritten; the
+    stored summary then stays as it is and the next read rebuilds it if it
+    is still out of date.
+
+    Args:
+        project_id (str): The ID of the project.
+
+    Returns:
+        dict: The stored summary document.
+    """
+    stored = await summaries_collection.find_one({"_id": project_id}, {"revision": 1})
+    revision = stored.get("revision") if stored else None
+    now = datetime.now()
+    weight = {"$max": [1, {"$ceil": {"$divide": [{"$subtract": ["$end", "$start"]}, DAY_MS]}}]}
+    pipeline = [
+        {"$match": {"project_id": project_id}},
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "by_type": [{"$group": {"_id": "$type", "count": {"$sum": 1}}}],
+            "by_priority": [{"$group": {"_id": "$priority", "count": {"$sum": 1}}}],
+            "totals": [{"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "progress_weight": {"$sum": weight},
+                "progress_weighted_sum": {
+                    "$sum": {"$multiply": [weight, {"$ifNull": ["$progress", 0]}]}},
+            }}],
+            "overdue": [
+                {"$match": {"end": {"$lt": now}, "status": {"$ne": "completed"}}},
+                {"$count": "count"},
+            ],
+        }},
+    ]
+    facets = (await tasks_collection.aggregate(pipeline).to_list(length=1))[0]
+    totals = facets["totals"][0] if facets["totals"] else {}
+
+    summary = {
+        "_id": project_id,
+        "total": totals.get("total", 0),
+        "by_status": {summary_key(g["_id"]): g["count"] for g in facets["by_status"]},
+        "by_type": {summary_key(g["_id"]): g["count"] for g in facets["by_type"]},
+        "by_priority": {summary_key(g["_id"]): g["count"] for g in facets["by_priority"]},
+        "progress_weight": totals.get("progress_weight", 0),
+        "progress_weighted_sum": totals.get("progress_weighted_sum", 0),
+        "overdue": facets["overdue"][0]["count"] if facets["overdue"] else 0,
+        "overdue_as_of": now,
+        "stale": False,
+        "revision": revision or 0,
+        "updated_at": now,
+    }
+    try:
+        # A missing revision also matches summaries stored before revisions existed
+        await summaries_collection.replace_one(
+            {"_id": project_id, "revision": revision}, summary, upsert=True)
+    except DuplicateKeyError:
+        # The summary changed meanwhile, keep the stored one
+        pass
+    return summary
+
+
+async def get_summary(project_id: str) -> dict:
+    """Return a project summary, rebuilding it only when missing or out of date.
+
+    Returns:
+        dict: Task counts by status, type and priority, the duration weighted
+        progress (0-100) and the number of overdue tasks.
+    """
+    summary = await summaries_collection.find_one({"_id": project_id})
+    refresh_before = datetime.now() - timedelta(seconds=SUMMARY_OVERDUE_REFRESH_SECONDS)
+    if not summary or summary.get("stale") or summary["overdue_as_of"] < refresh_before:
+        summary = await rebuild_summary(project_id)
+
+    weight = summary.get("progress_weight") or 0
+    return {
+        "project_id": project_id,
+        "total": summary.get("total", 0),
+        "by_status": {k: v for k, v in summary.get("by_status", {}).items() if v},
+        "by_type": {k: v for k, v in summary.get("by_type", {}).items() if v},
+        "by_priority": {k: v for k, v in summary.get("by_priority", {}).items() if v},
+        "progress": round(summary.get("progress_weighted_sum", 0) / weight, 2) if weight else 0,
+        "overdue": summary.get("overdue", 0),
+        "updated_at": summary.get("updated_at"),
+    }
+
+
+async def update_summary(project_id: str, old_task: Optional[dict], new_task: Optional[dict]):
+    """Apply the change of one task to its project summary with ``$inc``.
+
+    Pass ``old_task=None`` for a created task and ``new_task=None`` for a
+    deleted one. Projects without a stored summary are skipped, their
+    summary is built on the next read. The overdue count is adjusted as of
+    the summary's ``overdue_as_of``, when it was counted, so tasks that
+    became overdue since are not subtracted from it. Failures are logged,
+    not raised.
+    """
+    if not project_id:
+        return
+    try:
+        summary = await summaries_collection.find_one({"_id": project_id}, {"overdue_as_of": 1})
+        if not summary:
+            return
+        as_of = summary.get("overdue_as_of") or datetime.now()
+        delta = task_contribution(new_task, as_of)
+        for field, value in task_contribution(old_task, as_of).items():
+            delta[field] = delta.get(field, 0) - value
+        delta = {field: value for field, value in delta.items() if value}
+        if delta:
+            result = await summaries_collection.update_one(
+                {"_id": project_id, "overdue_as_of": summary.get("overdue_as_of")},
+                {"$inc": {**delta, "revision": 1}, "$set": {"updated_at": datetime.now()}})
+            if not result.matched_count:
+                # Rebuilt meanwhile as of another time, let the next read rebuild it
+                await mark_summary_stale(project_id)
+    except Exception:
+        traceback.print_exc()
+
+
+async def mark_summary_stale(project_id: str):
+    """Have the next read rebuild a summary, after changes too wide for deltas."""
+    try:
+        await summaries_collection.update_one(
+            {"_id": project_id}, {"$set": {"stale": True}, "$inc": {"revision": 1}})
+    except Exception:
+        traceback.print_exc()
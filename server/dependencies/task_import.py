@@ -0,0 +1,325 @@
+import io
+import os
+import csv
+import uuid
+import codecs
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Set
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from server.configs.db import tasks_collection
+from server.modals.tasks import BulkTaskRowModel
+from server.dependencies.links import link_store, new_link
+from server.dependencies.scheduling import LINK_TYPES, link_type, TaskGraph, ScheduleCycleError
+from server.dependencies.email_outbox import enqueue_email, email_task_data
+
+# Rows validated and inserted together
+BULK_TASK_CHUNK_SIZE = int(os.getenv("bulk_task_chunk_size", "500"))
+BULK_TASK_MAX_ROWS = int(os.getenv("bulk_task_max_rows", "5000"))
+# Tasks listed in one digest email, the rest are only counted
+DIGEST_MAX_TASKS = int(os.getenv("digest_max_tasks", "100"))
+
+# Link types as stored by the Gantt chart
+GANTT_LINK_TYPES = {"FS": "0", "SS": "1", "FF": "2", "SF": "3"}
+
+# Separator of the values of list columns in CSV files
+CSV_LIST_SEPARATOR = ";"
+
+
+def complete_records_end(text: str) -> int:
+    """Return the end of the last complete CSV record in ``text`` (0 if none).
+
+    Newlines inside quoted values do not end a record.
+    """
+    end = 0
+    quoted = False
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif char == "\n" and not quoted:
+            end = i + 1
+    return end
+
+
+def csv_row(values: Dict[str, str]) -> dict:
+    """Convert a CSV record to a task row, leaving empty cells to the defaults."""
+    row = {key.strip(): value for key, value in values.items() if key and value != ""}
+    if "predecessors" in row:
+        row["predecessors"] = [
+            item.strip() for item in row["predecessors"].split(CSV_LIST_SEPARATOR) if item.strip()]
+    return row
+
+
+async def iter_csv_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+    """Parse a CSV upload with a header row as it streams in.
+
+    Only the record being received is buffered, so large files are never
+    held in memory as a whole. Blank lines are skipped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    header = None
+
+    def records(text: str):
+        nonlocal header
+        for values in csv.reader(io.StringIO(text)):
+            if not values or not any(value.strip() for value in values):
+                continue
+            if header is None:
+                header = values
+                continue
+            yield csv_row(dict(zip(header, values)))
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        end = complete_records_end(pending)
+        if end:
+            for row in records(pending[:end]):
+                yield row
+            pending = pending[end:]
+
+    pending += decoder.decode(b"", final=True)
+    for row in records(pending):
+        yield row
+
+
+async def iter_json_rows(rows: list) -> AsyncIterator[dict]:
+    for row in rows:
+        yield row
+
+
+def row_errors(error: ValidationError) -> List[str]:
+    """Format the errors of a row as ``<field>: <message>``."""
+    return [
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" if item["loc"] else item["msg"]
+        for item in error.errors()
+    ]
+
+
+def parse_predecessor(value: str):
+    """Split ``<row key or task ID>[:<link type>]`` into the source and the Gantt link type."""
+    source, separator, kind = value.rpartition(":")
+    if not separator or kind.strip().lower() not in LINK_TYPES:
+        source, kind = value, "FS"
+    return source.strip(), GANTT_LINK_TYPES[link_type(kind)]
+
+
+class TaskImport:
+    """Imports the rows of a bulk task upload into a project.
+
+    Rows are validated and inserted in chunks with unordered ``insert_many``
+    batches, so a bad row only fails itself. Links are created once every
+    row is inserted, since predecessors may refer to later rows, and each
+    assignee gets a single digest email for all their new tasks.
+
+    Args:
+        project_id (str): The ID of the project to import into.
+        project_name (str): The project name used in the digest emails.
+        created_by (str): The email of the importing user.
+    """
+
+    def __init__(self, project_id: str, project_name: str, created_by: str):
+        self.project_id = project_id
+        self.project_name = project_name
+        self.created_by = created_by
+        self.rows = 0
+        self.truncated = False
+        self.created: List[dict] = []
+        self.errors: List[dict] = []
+        self.ids_by_ref: Dict[str, str] = {}
+        self._predecessors: List[tuple] = []
+        self._digests: Dict[str, List[dict]] = defaultdict(list)
+        self._digest_counts: Dict[str, int] = defaultdict(int)
+        self.links = 0
+
+    def _error(self, row_number: int, errors: List[str]):
+        self.errors.append({"row": row_number, "errors": errors})
+
+    async def run(self, rows: AsyncIterable) -> dict:
+        """Import every row and return the import report."""
+        chunk = []
+        async for row in rows:
+            if self.rows >= BULK_TASK_MAX_ROWS:
+                self.truncated = True
+                self._error(self.rows + 1, [
+                    f"More than {BULK_TASK_MAX_ROWS} rows, this row and the following ones were not imported"])
+                break
+            self.rows += 1
+            chunk.append((self.rows, row))
+            if len(chunk) >= BULK_TASK_CHUNK_SIZE:
+                await self._insert_chunk(chunk)
+                chunk = []
+        await self._insert_chunk(chunk)
+        await self._create_links()
+        await self._send_digests()
+        return self.report()
+
+    def _build_task(self, row_number: int, row, chunk_refs: Set[str]) -> Optional[tuple]:
+        try:
+            task = BulkTaskRowModel.model_validate(row)
+        except ValidationError as e:
+            self._error(row_number, row_errors(e))
+            return None
+        if task.end < task.start:
+            self._error(row_number, ["end: Task ends before it starts"])
+            return None
+        if task.ref is not None:
+            # Keys are only taken once their row is inserted
+            if task.ref in self.ids_by_ref or task.ref in chunk_refs:
+                self._error(row_number, [f"ref: Duplicate row key {task.ref}"])
+                return None
+            chunk_refs.add(task.ref)
+
+        now = datetime.now()
+        start = datetime.combine(task.start, datetime.min.time())
+        end = datetime.combine(task.end, datetime.max.time())
+        document = {
+            "_id": str(uuid.uuid4()),
+            "project_id": self.project_id,
+            "text": task.text,
+            "task_description": task.task_description,
+            "start": start,
+            "end": end,
+            "base_start": start,
+            "base_end": end,
+            "assignee": task.assignee,
+            "parent": task.parent,
+            "progress": task.progress,
+            "classification": task.classification,
+            "type": task.type,
+            "open": task.open,
+            "created_at": now,
+            "updated_at": now,
+            "status": "not_started",
+            "created_by": self.created_by,
+            "priority": task.priority,
+            "version": 0
+        }
+        return document, task
+
+    async def _insert_chunk(self, chunk: List[tuple]):
+        built = []
+        chunk_refs = set()
+        for row_number, row in chunk:
+            result = self._build_task(row_number, row, chunk_refs)
+            if result:
+                built.append((row_number, *result))
+        if not built:
+            return
+
+        failed = {}
+        try:
+            await tasks_collection.insert_many(
+                [document for _, document, _ in built], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+
+        for index, (row_number, document, task) in enumerate(built):
+            if index in failed:
+                self._error(row_number, [failed[index]])
+                continue
+            self.created.append({"row": row_number, "ref": task.ref, "id": document["_id"]})
+            if task.ref is not None:
+                self.ids_by_ref[task.ref] = document["_id"]
+            for predecessor in task.predecessors:
+                self._predecessors.append((row_number, predecessor, document["_id"]))
+            if task.assignee:
+                self._digest_counts[task.assignee] += 1
+                if len(self._digests[task.assignee]) < DIGEST_MAX_TASKS:
+                    self._digests[task.assignee].append(email_task_data(document))
+
+    async def _create_links(self):
+        if not self._predecessors:
+            return
+
+        # Predecessors that are not rows of the upload must be tasks of the project
+        parsed = [(row_number, *parse_predecessor(value), target)
+                  for row_number, value, target in self._predecessors]
+        task_ids = {source for _, source, _, _ in parsed if source not in self.ids_by_ref}
+        existing = set()
+        if task_ids:
+            existing = {task["_id"] async for task in tasks_collection.find(
+                {"_id": {"$in": list(task_ids)}, "project_id": self.project_id}, {"_id": 1})}
+
+        links = []
+        for row_number, source, kind, target in parsed:
+            source_id = self.ids_by_ref.get(source) or (source if source in existing else None)
+            if source_id is None:
+                self._error(row_number, [f"predecessors: Unknown row key or task {source}"])
+                continue
+            if source_id == target:
+                self._error(row_number, ["predecessors: A task cannot precede itself"])
+                continue
+            links.append((row_number, source, new_link({"source": source_id, "target": target, "type": kind})))
+
+        links = await self._reject_cycles(links)
+        await link_store.add_links(self.project_id, links)
+        self.links = len(links)
+
+    async def _reject_cycles(self, links: List[tuple]) -> List[dict]:
+        """Drop the new links that would close a cycle, reporting them on their row.
+
+        The project's links plus the new ones are checked with ``TaskGraph``
+        at once. Only if that finds a cycle are the new links added one by
+        one, skipping each link whose target already leads to its source.
+        """
+        existing_links = await link_store.get_links(self.project_id)
+        endpoints = {str(task_id) for link in existing_links for task_id in (link["source"], link["target"])}
+        task_ids = {task["_id"] async for task in tasks_collection.find(
+            {"_id": {"$in": list(endpoints)}, "project_id": self.project_id}, {"_id": 1})}
+        task_ids.update(created["id"] for created in self.created)
+        existing_links = [link for link in existing_links
+                          if str(link["source"]) in task_ids and str(link["target"]) in task_ids]
+        new_links = [link for _, _, link in links]
+        task_ids.update(link["source"] for link in new_links)
+
+        try:
+            TaskGraph([{"_id": task_id} for task_id in task_ids], existing_links + new_links)
+            return new_links
+        except ScheduleCycleError:
+            pass
+
+        successors: Dict[str, Set[str]] = defaultdict(set)
+        for link in existing_links:
+            successors[str(link["source"])].add(str(link["target"]))
+
+        def reaches(start: str, goal: str) -> bool:
+            seen, stack = {start}, [start]
+            while stack:
+                task_id = stack.pop()
+                if task_id == goal:
+                    return True
+                for successor in successors[task_id] - seen:
+                    seen.add(successor)
+                    stack.append(successor)
+            return False
+
+        accepted = []
+        for row_number, source, link in links:
+            if reaches(link["target"], link["source"]):
+                self._error(row_number, [f"predecessors: {source} would create a cycle"])
+                continue
+            successors[link["source"]].add(link["target"])
+            accepted.append(link)
+        return accepted
+
+    async def _send_digests(self):
+        for assignee, tasks in self._digests.items():
+            try:
+                await enqueue_email(
+                    "task_digest", assignee, self.project_name, tasks, self._digest_counts[assignee])
+            except Exception as e:
+                # Log the error but don't fail the import
+                print(f"Failed to queue task digest email: {str(e)}")
+
+    def report(self) -> dict:
+        self.errors.sort(key=lambda error: error["row"])
+        return {
+            "rows": self.rows,
+            "inserted": len(self.created),
+            "links": self.links,
+            "truncated": self.truncated,
+            "tasks": self.created,
+            "errors": self.errors,
+        }
@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+from pymongo import UpdateOne
+from server.configs.db import tasks_collection
+from server.dependencies.links import link_store
+from server.dependencies.scheduling import propagate_dates
+
+# Fields returned by the task list endpoints
+TASK_LIST_PROJECTION = {
+    "_id": 1,
+    "text": 1,
+    "task_description": 1,
+    "start": 1,
+    "base_start": 1,
+    "end": 1,
+    "base_end": 1,
+    "parent": 1,
+    "assignee": 1,
+    "progress": 1,
+    "created_at": 1,
+    "created_by": 1,
+    "type": 1,
+    "classification": 1,
+    "status": 1,
+    "open": 1,
+    "project_id": 1,
+    "comment_count": 1,
+    "version": 1
+}
+
+# Task dates sent as calendar days, and those sent at the end of their day
+TASK_DAY_FIELDS = ("start", "base_start", "created_at")
+TASK_END_FIELDS = ("end", "base_end")
+
+
+def format_task_fields(fields: dict) -> dict:
+    """Convert the task dates present in ``fields`` into the API representation."""
+    for field in TASK_DAY_FIELDS:
+        if isinstance(fields.get(field), datetime):
+            fields[field] = fields[field].date()
+    for field in TASK_END_FIELDS:
+        if isinstance(fields.get(field), datetime):
+            fields[field] = datetime.combine(fields[field].date(), datetime.max.time())
+    return fields
+
+
+def task_dates(start: date, days: int) -> Tuple[datetime, datetime]:
+    """Turn a first day and a duration into the stored start and end datetimes."""
+    return (datetime.combine(start, datetime.min.time()),
+            datetime.combine(start + timedelta(days=days - 1), datetime.max.time()))
+
+
+async def reschedule_tasks(project_id: str, moved: Dict[str, Tuple[date, int]],
+                           updated_by: str, write_moved: bool = True) -> List[dict]:
+    """Move tasks and shift their successors in a single bulk write.
+
+    The project's tasks and links are read once, the new dates of every
+    affected task are computed in memory and all of them are written with
+    one unordered ``bulk_write``.
+
+    Args:
+        project_id (str): The ID of the project the tasks belong to.
+        moved (dict): The new first day and duration of the moved tasks, by task ID.
+        updated_by (str): The email of the user making the change.
+        write_moved (bool): Whether to write the moved tasks too, or only
+            their successors when the caller already saved the moved tasks.
+
+    Returns:
+        List[dict]: The ``id``, start date and ``end`` of every task written,
+        moved tasks first.
+
+    Raises:
+        ScheduleCycleError: If the project's links contain a cycle.
+    """
+    tasks = await tasks_collection.find(
+        {"project_id": project_id, "start": {"$type": "date"}, "end": {"$type": "date"}},
+        {"_id": 1, "start": 1, "end": 1}
+    ).to_list(length=None)
+    links = await link_store.get_links(project_id)
+    shifted = propagate_dates(tasks, links, moved)
+
+    now = datetime.now()
+    changes = []
+    operations = []
+    for task_id, (start, days) in [*(moved.items() if write_moved else ()), *shifted.items()]:
+        start_at, end_at = task_dates(start, days)
+        changes.append({"id": task_id, "start": start, "end": end_at})
+        operations.append(UpdateOne(
+            {"_id": task_id},
+            {"$set": {"start": start_at, "end": end_at,
+                      "updated_at": now, "updated_by": updated_by},
+             "$inc": {"version": 1}}
+        ))
+
+    if operations:
+        await tasks_collection.bulk_write(operations, ordered=False)
+    return changes
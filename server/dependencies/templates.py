@@ -0,0 +1,105 @@
+import os
+import time
+import tempfile
+import traceback
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    # jinja2 itself is imported on first render, off the cold start path
+    import jinja2
+
+TEMPLATES_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../templates"))
+
+
+def create_bytecode_cache():
+    """Create the on-disk bytecode cache, or None if the directory is not writable."""
+    cache_dir = os.getenv("template_bytecode_cache_dir") or os.path.join(
+        tempfile.gettempdir(), "jinja2_bytecode_cache")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        from jinja2 import FileSystemBytecodeCache
+        return FileSystemBytecodeCache(cache_dir)
+    except OSError:
+        traceback.print_exc()
+        return None
+
+
+class TemplateRegistry:
+    """Compiled email templates shared by every sender.
+
+    Templates are loaded once through a single ``jinja2.Environment`` and kept
+    compiled in memory, so rendering does no file I/O. Compiled bytecode is
+    also cached on disk to speed up compilation in fresh processes. Render
+    counts and timings are tracked per template.
+
+    Args:
+        environment (jinja2.Environment): The environment used to load the templates.
+    """
+
+    def __init__(self, environment):
+        self.environment = environment
+        self._templates: Dict[str, "jinja2.Template"] = {}
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def warm_up(self):
+        """Compile every HTML template up front."""
+        for name in self.environment.list_templates(extensions=["html"]):
+            self.get(name)
+
+    def get(self, name: str) -> "jinja2.Template":
+        """Return the compiled template ``name``, compiling it on first use."""
+        template = self._templates.get(name)
+        if template is None:
+            template = self.environment.get_template(name)
+            self._templates[name] = template
+        return template
+
+    def render(self, name: str, **context) -> str:
+        """Render the template ``name`` with ``context`` and record the render time."""
+        template = self.get(name)
+        started = time.perf_counter()
+        body = template.render(**context)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        metrics = self._metrics.setdefault(
+            name, {"renders": 0, "total_ms": 0.0, "max_ms": 0.0})
+        metrics["renders"] += 1
+        metrics["total_ms"] += elapsed_ms
+        metrics["max_ms"] = max(metrics["max_ms"], elapsed_ms)
+        return body
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Return render count, total, average and maximum time (ms) per template."""
+        return {
+            name: {**values, "avg_ms": values["total_ms"] / values["renders"]}
+            for name, values in self._metrics.items()
+        }
+
+
+_template_registry: Optional[TemplateRegistry] = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Return the shared registry, compiling every template on first use.
+
+    jinja2 is only imported once an email is rendered, not on cold start.
+    """
+    global _template_registry
+    if _template_registry is None:
+        from jinja2 import Environment, FileSystemLoader
+        registry = TemplateRegistry(Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            bytecode_cache=create_bytecode_cache(),
+            # Templates never change at runtime, skip the up-to-date checks
+            auto_reload=False,
+            cache_size=-1,
+        ))
+        registry.warm_up()
+        _template_registry = registry
+    return _template_registry
+
+
+def render_template(name: str, **context) -> str:
+    """Render an email template from the shared registry."""
+    return get_template_registry().render(name, **context)
@@ -0,0 +1,51 @@
+from typing import Dict, Iterable
+from pymongo import UpdateOne
+from server.configs.db import versions_collection
+
+# Collection-wide version stamps
+PROJECTS_VERSION = "collection:projects"
+TASKS_VERSION = "collection:tasks"
+USERS_VERSION = "collection:users"
+
+
+def project_version_key(project_id: str) -> str:
+    return f"project:{project_id}"
+
+
+async def bump_versions(*keys: str):
+    """Increment version stamps in a single round-trip.
+
+    Args:
+        *keys (str): The stamps to bump; empty keys are ignored.
+    """
+    operations = [
+        UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True)
+        for key in dict.fromkeys(keys) if key
+    ]
+    if operations:
+        await versions_collection.bulk_write(operations, ordered=False)
+
+
+async def bump_project_version(project_id: str):
+    """Record a change to a project's tasks or links.
+
+    Args:
+        project_id (str): The ID of the changed project.
+    """
+    if project_id:
+        await bump_versions(project_version_key(project_id), TASKS_VERSION)
+
+
+async def get_versions(keys: Iterable[str]) -> Dict[str, int]:
+    """Return the current version of each stamp (0 if never bumped) with one query."""
+    keys = list(keys)
+    versions = dict.fromkeys(keys, 0)
+    async for stamp in versions_collection.find({"_id": {"$in": keys}}):
+        versions[stamp["_id"]] = stamp["version"]
+    return versions
+
+
+async def get_project_version(project_id: str) -> int:
+    """Return the current version of a project's tasks and links (0 if never changed)."""
+    stamp = await versions_collection.find_one({"_id": project_version_key(project_id)})
+    return stamp["version"] if stamp else 0
@@ -0,0 +1 @@
+# Data migrations, runnable with python -m server.migrations.<name>
@@ -0,0 +1,35 @@
+import asyncio
+from server.configs.db import tasks_collection
+from server.configs.indexes import ensure_indexes
+from server.dependencies.comments import migrate_task_comments
+
+
+async def migrate_comments_to_collection() -> dict:
+    """Move every embedded task ``comments`` array into the comments collection.
+
+    The comment endpoints migrate a task's array the first time they touch
+    the task, so deploying the API before running this is safe. This
+    backfills the tasks nobody opened, so task lists show their
+    ``comment_count``. It is idempotent and can be re-run after a failure.
+
+    Returns:
+        dict: The number of migrated tasks and comments.
+    """
+    await ensure_indexes()
+
+    tasks = 0
+    comments = 0
+    async for task in tasks_collection.find(
+            {"comments": {"$exists": True}}, {"project_id": 1, "comments": 1}):
+        migrated = await migrate_task_comments(task)
+        tasks += 1
+        comments += migrated
+        print(f"Migrated {migrated} comments of task {task['_id']}")
+
+    return {"tasks": tasks, "comments": comments}
+
+
+if __name__ == "__main__":
+    # Usage: python -m server.migrations.comments_to_collection
+    result = asyncio.run(migrate_comments_to_collection())
+    print(f"Migrated {result['comments']} comments of {result['tasks']} tasks")
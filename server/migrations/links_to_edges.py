@@ -0,0 +1,79 @@
+import sys
+import asyncio
+import uuid
+from pymongo import ReplaceOne
+from server.configs.db import links_collection, task_links_collection
+from server.configs.indexes import ensure_indexes
+from server.dependencies.links import EdgeLinkStore
+
+BATCH_SIZE = 1000
+
+
+def edge_id(project_id: str, link: dict, taken: set) -> str:
+    """Pick the edge ID of a legacy link, stable across re-runs.
+
+    Link IDs are only unique within a project: IDs already used by another
+    project, and missing IDs, are replaced by one derived from the project
+    and the link, so re-runs upsert the same edge.
+    """
+    link_id = link.get("id")
+    if link_id and link_id not in taken:
+        return link_id
+    name = f"{project_id}/{link_id}" if link_id else \
+        f"{project_id}/{link['source']}/{link['target']}/{link['type']}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+
+
+async def migrate_links_to_edges(drop_source: bool = False) -> dict:
+    """Copy every per-project ``links`` array into per-edge documents.
+
+    The migration is idempotent: edges are upserted by project and link ID,
+    so it can be re-run until the ``links_storage=edges`` mode is switched
+    on. Links without an ID, or whose ID another project already uses, get
+    a deterministic one assigned.
+
+    Args:
+        drop_source (bool): Whether to delete the array documents once copied.
+
+    Returns:
+        dict: The number of migrated projects and edges.
+    """
+    await ensure_indexes()
+
+    projects = 0
+    edges = 0
+    async for links_doc in links_collection.find({}, {"project_id": 1, "links": 1}):
+        project_id = links_doc.get("project_id")
+        links = links_doc.get("links") or []
+
+        # Link IDs stored as edges of another project
+        link_ids = [link["id"] for link in links if link.get("id")]
+        taken = {document["_id"] async for document in task_links_collection.find(
+            {"_id": {"$in": link_ids}, "project_id": {"$ne": project_id}}, {"_id": 1})}
+
+        requests = []
+        for link in links:
+            document = EdgeLinkStore.to_document(
+                project_id, {**link, "id": edge_id(project_id, link, taken)})
+            requests.append(ReplaceOne(
+                {"_id": document["_id"], "project_id": project_id}, document, upsert=True))
+
+        for i in range(0, len(requests), BATCH_SIZE):
+            await task_links_collection.bulk_write(
+                requests[i:i + BATCH_SIZE], ordered=False)
+
+        if drop_source:
+            await links_collection.delete_one({"_id": links_doc["_id"]})
+
+        projects += 1
+        edges += len(requests)
+        print(f"Migrated {len(requests)} links of project {project_id}")
+
+    return {"projects": projects, "edges": edges}
+
+
+if __name__ == "__main__":
+    # Usage: python -m server.migrations.links_to_edges [--drop-source]
+    result = asyncio.run(migrate_links_to_edges(
+        drop_source="--drop-source" in sys.argv))
+    print(f"Migrated {result['edges']} links of {result['projects']} projects")
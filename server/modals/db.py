@@ -1,12 +1,11 @@
-import os
 import traceback
 from typing import Optional
 
-import motor.motor_asyncio
 from fastapi import HTTPException 
-from dotenv import load_dotenv
+from server.configs.db import db_manager
+from server.configs.settings import load_settings
 
-load_dotenv()
+load_settings()
 
 
 class ConnectMongoDB:
@@ -14,8 +13,8 @@ class ConnectMongoDB:
     @staticmethod
     def get_connection():
         try:
-            mongo_url = os.getenv('db_url')
-            return motor.motor_asyncio.AsyncIOMotorClient(mongo_url)
+            # Share the managed client instead of opening a new pool per call
+            return db_manager.client
 
         except Exception as e:
             traceback.print_exc()
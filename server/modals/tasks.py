@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Union
+from datetime import date, datetime
 
 
 class TaskBase(BaseModel):
@@ -37,6 +37,38 @@ class CreateTaskInputDataModel(TaskBase):
     priority: str
 
 
+class BulkTaskRowModel(BaseModel):
+    ref: Optional[str] = Field(
+        None, description="Row key the predecessors of other rows can refer to")
+    text: str = Field(..., description="Task name")
+    task_description: str = Field("", description="Task description")
+    start: date = Field(..., description="Task start date")
+    end: date = Field(..., description="Task end date")
+    assignee: Optional[str] = Field(None, description="Task assignee email")
+    parent: int = Field(0, description="Parent task ID")
+    progress: int = Field(0, description="Task progress percentage")
+    type: str = Field("task", description="Task type")
+    open: bool = Field(True, description="Whether task is open")
+    classification: Optional[str] = Field(
+        None, description="Task classification")
+    priority: Optional[str] = Field(None, description="Task priority")
+    predecessors: List[str] = Field(
+        [], description="Row keys or task IDs this task follows, optionally suffixed with :<link type>")
+
+
+class BulkTaskChangesModel(BaseModel):
+    status: Optional[str] = Field(None, description="Task status")
+    progress: Optional[int] = Field(
+        None, description="Task progress percentage")
+    assignee: Optional[str] = Field(None, description="Task assignee email")
+
+
+class BulkUpdateTasksModel(BaseModel):
+    task_ids: List[str] = Field(..., description="IDs of the tasks to update")
+    changes: BulkTaskChangesModel = Field(
+        ..., description="Field changes applied to every task")
+
+
 class UpdateTaskInputDataModel(TaskBase):
     id: str = Field(..., description="Task ID")
 
@@ -62,6 +94,22 @@ class ProjectLinksInputDataModel(BaseModel):
     links: List[dict] = Field(..., description="List of task links")
 
 
+class LinkEdgeModel(BaseModel):
+    id: Optional[str] = Field(None, description="Link ID")
+    source: Union[str, int] = Field(..., description="Source task ID")
+    target: Union[str, int] = Field(..., description="Target task ID")
+    type: Union[str, int] = Field(..., description="Link type")
+
+
+class PatchLinksInputDataModel(BaseModel):
+    added: Optional[List[LinkEdgeModel]] = Field(
+        None, description="Links to add")
+    removed: Optional[List[Union[str, LinkEdgeModel]]] = Field(
+        None, description="Link IDs or links to remove")
+    links: Optional[List[LinkEdgeModel]] = Field(
+        None, description="Complete set of links, diffed against the stored links")
+
+
 class ManualInputDataModel(BaseModel):
     id: str = Field(..., description="Task ID")
     manual: str = Field(..., description="Task manual content")
@@ -80,6 +128,8 @@ class UpdateTaskModel(BaseModel):
         None, description="Task object with updated fields")
     links: Optional[List[dict]] = Field(
         None, description="Array of task links")
+    version: Optional[int] = Field(
+        None, description="Version of the task the change is based on, rejected with 409 if outdated")
 
 
 class CommentInputDataModel(BaseModel):